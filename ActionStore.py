@@ -0,0 +1,319 @@
+# ActionStore.py - Read the Action File (the worksheet of prior actions, by Request ID) - through a cache file kept next to the workbook.
+
+# The Action worksheet is read with openpyxl only when the workbook has changed since the cache file was written - judged by the workbook's modification time and size.
+# The cache file (<Action File name>.cache, in the same folder) holds the header row and the cell values of the Action worksheet, in pickle form.
+# The cache file can be deleted at any time; it is rebuilt on the next read.
+#
+# Used by MySource.py.  (Mario.py and Apply.py append to the Action File with openpyxl - which changes the modification time, so the next read refreshes the cache.)
+#
+# SqlActionStore - Optional SQLite database in place of the Action File.  Specify "actionstore <database path>" in the Control File of MySource.py, Apply.py, and Mario.py.
+# Each row is appended (and committed) as it is added - instead of re-saving the whole workbook.  Request IDs are indexed, for quick lookup.
+# Use ActionSync.py to import the Action worksheet into the database, and to export the database back to a workbook.
+#
+# ActionJournal - Append-only journal of the rows Apply.py adds to the Action File (<Action File name>.journal), kept until they are saved in the workbook.  See the class.
+
+import os
+import pickle
+import sqlite3
+from datetime import datetime
+import CacheFile
+
+cache_version = 1   # Increment if the content of the cache file changes - older cache files are then ignored.
+
+
+class ActionStore:
+
+    def __init__(self, action_path, use_cache=True):
+        self.action_path = action_path
+        self.cache_path = action_path + ".cache"
+        self.use_cache = use_cache
+        self.header = []        # Values of the first (header) row.
+        self.rows = []          # Tuples of cell values, for the rows after the header row.
+        self.sheet_title = None
+        self.from_cache = False
+        self.error = None       # Message, if the Action File could not be read.
+
+    #   fileStamp() - Modification time and size of the Action File.  A change in either invalidates the cache file.
+    def fileStamp(self):
+        return CacheFile.fileStamp(self.action_path)
+
+    #   load() - Read the Action worksheet (from the cache file, if it is current).  Returns True if successful, otherwise sets self.error.
+    def load(self):
+        try:
+            file_stamp = self.fileStamp()
+        except FileNotFoundError:
+            self.error = f"File {self.action_path} not found."
+            return False
+
+        if self.use_cache and self.readCache(file_stamp) :
+            self.from_cache = True
+            return True
+
+        try:
+            from openpyxl import load_workbook
+            actbook  = load_workbook(self.action_path, read_only=True)
+            actsheet = actbook.active  # Get the active (only) worksheet.
+            self.sheet_title = actsheet.title
+            sheet_rows = list(actsheet.iter_rows(min_row=1, values_only=True))
+            actbook.close()
+        except Exception as err:
+            self.error = f"Could not open the file: {err}"
+            return False
+
+        if len(sheet_rows) > 0 :
+            self.header = list(sheet_rows[0])
+            self.rows = sheet_rows[1:]
+        if self.use_cache :
+            self.writeCache(file_stamp)
+        return True
+
+    def readCache(self, file_stamp):
+        cache_content = CacheFile.readPickle(self.cache_path, version=cache_version, stamp=file_stamp)
+        if cache_content is None :
+            return False
+        self.header = cache_content['header']
+        self.rows = cache_content['rows']
+        self.sheet_title = cache_content.get('sheet_title')
+        return True
+
+    def writeCache(self, file_stamp):
+        CacheFile.writePickle(self.cache_path, {'version': cache_version, 'stamp': file_stamp, 'header': self.header, 'rows': self.rows, 'sheet_title': self.sheet_title})
+
+
+#   ActionJournal - Each new Action row is written to the journal (and forced to disk, with fsync) as it is entered - a small append, instead of saving the whole workbook.
+#   So a crash, or a save that fails (the workbook is open in Excel), loses nothing: the rows not yet saved are read back (readPending) and added again by the next run.
+#   After each successful save of the workbook, a "saved" record is written and the journal emptied.  (If the run ends between the two, the "saved" record shows that
+#   the rows before it are already in the workbook.)  Each record is a pickle - a record cut short by a crash is ignored, with the records before it used.
+#   Before each save, a ("saving", <number of rows>) record is written:  if the run ends during the save - or after it, before the "saved" record - the rows may or may not
+#   be in the workbook.  The next run compares them with the last rows of the workbook (savedCount) - so they are not added a second time.
+class ActionJournal:
+
+    def __init__(self, action_path):
+        self.journal_path = action_path + ".journal"
+        self.journal_file = None
+        self.pending = 0        # Rows written since the last save.
+        self.saving = 0         # Rows pending at the last "saving" record (not followed by a "saved" record) - see readPending.
+        self.error = None
+
+    #   readPending() - Rows in the journal that are not yet saved in the workbook - list of (row values, column types).
+    #   If a save was started and not recorded as done, self.saving is the number of (the first) pending rows it was saving.
+    def readPending(self):
+        pending_rows = []
+        self.saving = 0
+        try:
+            with open(self.journal_path, "rb") as journal_file :
+                while True :
+                    try:
+                        journal_record = pickle.load(journal_file)
+                    except Exception:       # End of the journal - or a record cut short.
+                        break
+                    if journal_record[0] == "saved" :
+                        pending_rows = []
+                        self.saving = 0
+                    elif journal_record[0] == "saving" :
+                        self.saving = journal_record[1]
+                    elif journal_record[0] == "row" :
+                        pending_rows.append((journal_record[1], journal_record[2]))
+        except FileNotFoundError:
+            return []
+        except OSError as err:
+            self.error = f"Could not read the journal {self.journal_path}: {err}"
+        self.pending = len(pending_rows)
+        return pending_rows
+
+    #   open() - Start the journal with the rows not yet saved (from readPending), and open it for appending.  Returns True if successful, otherwise sets self.error.
+    #   The journal is rewritten through a temporary file - so a record cut short by a crash is dropped, and the journal is never left partly written.
+    def open(self, pending_rows=()):
+        def writeRows(temp_path) :
+            with open(temp_path, "wb") as journal_file :
+                for new_row, col_types in pending_rows :
+                    pickle.dump(("row", new_row, col_types), journal_file, protocol=pickle.HIGHEST_PROTOCOL)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+        try:
+            CacheFile.writeReplace(self.journal_path, writeRows)
+            self.journal_file = open(self.journal_path, "ab")
+        except OSError as err:
+            self.error = f"Could not open the journal {self.journal_path}: {err}"
+            return False
+        self.pending = len(pending_rows)
+        self.saving = 0
+        return True
+
+    #   append() - Write rows - list of (row values, column types) - to the journal, and force them to disk.
+    def append(self, new_rows):
+        for new_row, col_types in new_rows :
+            pickle.dump(("row", new_row, col_types), self.journal_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.sync()
+        self.pending += len(new_rows)
+
+    #   savedCount() - Number of the pending rows (from readPending) that an interrupted save already put in the workbook:  self.saving, if the last rows of the workbook
+    #   (last_rows - lists of cell values) are the same as the first self.saving pending rows.  Otherwise 0.
+    def savedCount(self, pending_rows, last_rows):
+        if self.saving <= 0 or self.saving > len(pending_rows) or len(last_rows) < self.saving :
+            return 0
+        for (new_row, col_types), saved_row in zip(pending_rows[:self.saving], last_rows[len(last_rows) - self.saving:]) :
+            if not sameRow(new_row, saved_row) :
+                return 0
+        return self.saving
+
+    #   markSaving() - The workbook is about to be saved, with the rows written since the last save.
+    def markSaving(self):
+        pickle.dump(("saving", self.pending), self.journal_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.sync()
+
+    #   markSaved() - The workbook has been saved: record it, then empty the journal.
+    def markSaved(self):
+        pickle.dump(("saved",), self.journal_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.sync()
+        self.journal_file.truncate(0)
+        self.sync()
+        self.pending = 0
+
+    def sync(self):
+        self.journal_file.flush()
+        os.fsync(self.journal_file.fileno())
+
+    #   close() - Close the journal - and remove it, if all of its rows are saved.
+    def close(self):
+        if self.journal_file is not None :
+            self.journal_file.close()
+            self.journal_file = None
+        if self.pending == 0 :
+            try:
+                os.remove(self.journal_path)
+            except OSError:
+                pass
+
+
+#   sameRow() - True if a journaled row has the same values as a row read back from the workbook.  An empty string is read back as None, and a date and time to the
+#   millisecond - so those are taken as the same.
+def sameRow(new_row, saved_row) :
+    saved_row = list(saved_row) + [None] * (len(new_row) - len(saved_row))
+    for new_value, saved_value in zip(new_row, saved_row) :
+        if new_value == "" :
+            new_value = None
+        if saved_value == "" :
+            saved_value = None
+        if isinstance(new_value, datetime) and isinstance(saved_value, datetime) :
+            if abs((new_value - saved_value).total_seconds()) >= 0.001 :
+                return False
+        elif new_value != saved_value :
+            return False
+    return all(saved_value is None or saved_value == "" for saved_value in saved_row[len(new_row):])
+
+
+#   SqlActionStore - Same load() interface and header/rows attributes as ActionStore.
+#   The database holds the header row, the name of the key (Request ID) column, and one record per Action row.  The cell values of each row are kept in pickle form, so that
+#   dates and numbers come back as the same Python objects that openpyxl returns.  The key value is also kept in its own (indexed) column.
+class SqlActionStore:
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = None
+        self.header = []
+        self.rows = []
+        self.sheet_title = None
+        self.key_column = None
+        self.key_ix = -1
+        self.from_cache = False
+        self.error = None
+
+    def open(self):
+        if self.connection is not None :
+            return True
+        try:
+            self.connection = sqlite3.connect(self.db_path)
+            with self.connection :
+                self.connection.execute("CREATE TABLE IF NOT EXISTS store_info (name TEXT PRIMARY KEY, value)")
+                self.connection.execute("CREATE TABLE IF NOT EXISTS action_header (col_ix INTEGER PRIMARY KEY, col_title)")
+                self.connection.execute("CREATE TABLE IF NOT EXISTS action_rows (row_seq INTEGER PRIMARY KEY AUTOINCREMENT, request_id, row_values BLOB)")
+                self.connection.execute("CREATE INDEX IF NOT EXISTS action_request_ix ON action_rows (request_id)")
+        except sqlite3.Error as err:
+            self.error = f"Could not open the database {self.db_path}: {err}"
+            self.connection = None
+            return False
+
+        self.header = [col_title for (col_title,) in self.connection.execute("SELECT col_title FROM action_header ORDER BY col_ix")]
+        key_row = self.connection.execute("SELECT value FROM store_info WHERE name = 'key_column'").fetchone()
+        if key_row is not None :
+            self.setKeyColumn(key_row[0])
+        title_row = self.connection.execute("SELECT value FROM store_info WHERE name = 'sheet_title'").fetchone()
+        if title_row is not None :
+            self.sheet_title = title_row[0]
+        return True
+
+    def close(self):
+        if self.connection is not None :
+            self.connection.close()
+            self.connection = None
+
+    def setKeyColumn(self, key_column):
+        self.key_column = key_column
+        self.key_ix = -1
+        for col_ix, header_value in enumerate(self.header) :
+            if isinstance(header_value, str) and header_value.strip() == key_column :
+                self.key_ix = col_ix
+
+    #   load() - Read all of the Action rows, in the order added.  Returns True if successful, otherwise sets self.error.
+    def load(self):
+        if not self.open() :
+            return False
+        if len(self.header) == 0 :
+            self.error = f"No Action rows in {self.db_path}.  (Use ActionSync.py to import the Action worksheet.)"
+            return False
+        self.rows = [pickle.loads(row_values) for (row_values,) in self.connection.execute("SELECT row_values FROM action_rows ORDER BY row_seq")]
+        return True
+
+    #   hasRequest() - Test if there is an Action row for the Request ID.  (Uses the index - does not read the rows.)
+    def hasRequest(self, request_id):
+        return self.connection.execute("SELECT 1 FROM action_rows WHERE request_id = ? LIMIT 1", (request_id,)).fetchone() is not None
+
+    #   requestIds() - Set of the Request IDs in the store.
+    def requestIds(self):
+        return {request_id for (request_id,) in self.connection.execute("SELECT request_id FROM action_rows")}
+
+    #   appendRows() - Add Action rows (lists of cell values, in header order) in a single transaction.
+    def appendRows(self, new_rows):
+        with self.connection :
+            self.insertRows(new_rows)
+
+    #   updateRows() - Set column values in the Action rows of Request IDs (the last row added, if there are several) - list of (Request ID, {column index: value}) -
+    #   in a single transaction.
+    def updateRows(self, row_updates):
+        with self.connection :
+            for request_id, col_values in row_updates :
+                stored_row = self.connection.execute("SELECT row_seq, row_values FROM action_rows WHERE request_id = ? ORDER BY row_seq DESC LIMIT 1", (request_id,)).fetchone()
+                if stored_row is None or len(col_values) == 0 :
+                    continue
+                row_values = list(pickle.loads(stored_row[1]))
+                row_values += [None] * (max(col_values) + 1 - len(row_values))
+                for col_ix, col_value in col_values.items() :
+                    row_values[col_ix] = col_value
+                self.connection.execute("UPDATE action_rows SET row_values = ? WHERE row_seq = ?",
+                                        (pickle.dumps(tuple(row_values), protocol=pickle.HIGHEST_PROTOCOL), stored_row[0]))
+
+    def insertRows(self, new_rows):
+        self.connection.executemany("INSERT INTO action_rows (request_id, row_values) VALUES (?, ?)",
+                                    [(self.rowKey(new_row), pickle.dumps(tuple(new_row), protocol=pickle.HIGHEST_PROTOCOL)) for new_row in new_rows])
+
+    def rowKey(self, row_values):
+        if self.key_ix < 0 or self.key_ix >= len(row_values) :
+            return None
+        key_value = row_values[self.key_ix]
+        if isinstance(key_value, (int, float, str)) or key_value is None :
+            return key_value
+        return str(key_value)
+
+    #   importSheet() - Replace the content of the store with the header and rows of an Action worksheet.  key_column is the header of the Request ID column.
+    def importSheet(self, header, rows, key_column, sheet_title=None):
+        self.header = list(header)
+        self.sheet_title = sheet_title
+        self.setKeyColumn(key_column)
+        with self.connection :
+            self.connection.execute("DELETE FROM action_header")
+            self.connection.execute("DELETE FROM action_rows")
+            self.connection.executemany("INSERT INTO action_header (col_ix, col_title) VALUES (?, ?)", list(enumerate(self.header)))
+            self.connection.execute("INSERT OR REPLACE INTO store_info (name, value) VALUES ('key_column', ?)", (key_column,))
+            self.connection.execute("INSERT OR REPLACE INTO store_info (name, value) VALUES ('sheet_title', ?)", (sheet_title,))
+            self.insertRows(rows)
@@ -0,0 +1,118 @@
+# ActionSync.py - Copy the Action worksheet into the SQLite action store (import), or the action store back out to the Action worksheet (export).  See ActionStore.SqlActionStore.
+
+# Control File parameters:
+#   actionstore <database path>     - SQLite action store (also specified in the MySource.py, Apply.py, and Mario.py Control Files, to read and write through the store).
+#   actionsheet <workbook path>     - Action File (workbook).
+#   key_column  <column header>     - Request ID column of the Action worksheet.  (Indexed in the action store.)
+#   messagdir   <directory>
+#
+# Suggested Enhancements:
+#   Merge (rather than replace) on import.
+
+import sys
+from datetime import datetime
+import ReadControl
+import ActionStore
+
+arguments = sys.argv[0:]  # List of all arguments.  arguments[0] = <script name>  arguments[1] = <Control File name>   arguments[2] = import | export
+now_time = datetime.now()
+start_message = "Python script " + arguments[0] + " started at " + now_time.strftime("%Y-%m-%d %H:%M:%S")
+
+if len(arguments) < 3 or arguments[2] not in ("import", "export") :
+    print("Missing required command line parameters.")
+    print(arguments)
+    print(f"Usage: python {sys.argv[0]} <control file> import|export")
+    print("Terminating process.")
+    sys.exit(1)
+
+# Read parameter file and load values into a dictionary object.
+err_code, parms_dict = ReadControl.read(arguments[1], True, ReadControl.script_schemas["ActionSync.py"])
+if err_code > 0 :
+    print("Terminating process.")
+    sys.exit(1)
+
+# MessageOut(), MessageClose(), and MessageShow() functions for output message handling.
+mssg_file = None
+mssg_file_path = None
+def MessageOut(mssg_txt) :  # Write message to output message file.
+    global mssg_file, mssg_file_path
+    if not mssg_file :
+       mssg_file = open(mssg_file_path, "w")
+    mssg_file.write(f"{mssg_txt}\n")
+def MessageClose() :
+    global mssg_file, mssg_file_path
+    if mssg_file :
+        MessageOut(" ")
+        MessageShow("Output messages to: " + mssg_file_path)
+        mssg_file.close()
+def MessageShow(mssg_txt) :  # Display message to console and write to output message file.
+    print(mssg_txt)
+    MessageOut(mssg_txt)
+
+# Write start message to output message file.
+mssg_file_path = parms_dict['messagdir'][0] + "\\ActionSync.mssg"  # Message Directory obtained from Parameter File.
+MessageOut(start_message)
+MessageOut(" ")
+
+try:
+    from openpyxl import Workbook
+except ModuleNotFoundError:
+    MessageShow("openpyxl not found!")
+    MessageShow("Make sure that you run " + arguments[0] + " in a virtual environment that is activated and has openpyxl installed.")
+    MessageShow("Terminating process.")
+    MessageClose()
+    sys.exit(1)
+
+actionfile_path = parms_dict['actionsheet'][0]
+store_path = parms_dict['actionstore'][0]
+key_column = parms_dict['key_column'][0]
+
+sql_store = ActionStore.SqlActionStore(store_path)
+if not sql_store.open() :
+    MessageShow(sql_store.error)
+    MessageShow("Terminating process.")
+    MessageClose()
+    sys.exit(1)
+
+if arguments[2] == "import" :
+    MessageShow("Reading " + actionfile_path)
+    action_sheet = ActionStore.ActionStore(actionfile_path, use_cache=False)
+    if not action_sheet.load() :
+        MessageShow(action_sheet.error)
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+    if key_column not in [header_value.strip() for header_value in action_sheet.header if isinstance(header_value, str)] :
+        MessageShow(f"Did not find \"{key_column}\" column header in {actionfile_path}.")
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+
+    import_rows = [row for row in action_sheet.rows if any(cell_value is not None for cell_value in row)]     # Skip empty rows.
+    sql_store.importSheet(action_sheet.header, import_rows, key_column, action_sheet.sheet_title)
+    MessageShow(f"Imported {len(import_rows)} Action rows into {store_path}.")
+
+else :
+    if not sql_store.load() :
+        MessageShow(sql_store.error)
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+
+    outbook  = Workbook()
+    outsheet = outbook.active
+    if sql_store.sheet_title :
+        outsheet.title = sql_store.sheet_title
+    outsheet.append(sql_store.header)
+    for row in sql_store.rows :
+        outsheet.append(list(row))
+        for col_ix, cell_value in enumerate(row) :
+            if isinstance(cell_value, datetime) :
+                outsheet.cell(row=outsheet.max_row, column=col_ix + 1).number_format = 'mm/dd/yyyy'
+
+    input_dummy = input(f"Is the {actionfile_path} workbook closed?  If not, will CRASH !!!  <Enter> to continue.")
+    outbook.save(actionfile_path)
+    MessageShow(f"Exported {len(sql_store.rows)} Action rows to {actionfile_path}.")
+
+sql_store.close()
+MessageClose()
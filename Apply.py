@@ -4,20 +4,38 @@
 #       Make sure target workbook is closed before doing final save.  (How this done?)
 
 import sys
+import time
 import shlex
 from pathlib import Path
 from datetime import datetime
 import ReadControl
+import ActionStore
+import RunStats
+import RoleReader
+import SearchIndex
 
 arguments = sys.argv[0:]  # List of all arguments.  
 # arguments[0] = <script name>  arguments[1] = <Control File name>  arguments[2] = <Input worksheet File name>
 now_time = datetime.now()
 start_message = "Python script " + arguments[0] + " started at " + now_time.strftime("%Y-%m-%d %H:%M:%S")
 
+# "--batch <file>" option - Take the actions from a file ("-" for standard input) instead of the prompts.  Removed from the argument list before the positional arguments are read.
+# Each line:  <Request ID> <action> [<notes>]   - action is A (Apply For) or P (Pass Over), as at the prompt; the notes (rest of the line) go in the first "prompt" column.
+# Blank lines, and lines starting with "#", are skipped.
+batch_path = None
+if "--batch" in arguments :
+    flag_ix = arguments.index("--batch")
+    if flag_ix + 1 >= len(arguments) :
+        print("Expected a file name (or \"-\" for standard input) following the \"--batch\" option.")
+        print("Terminating process.")
+        sys.exit(1)
+    batch_path = arguments[flag_ix + 1]
+    del arguments[flag_ix:flag_ix + 2]
+
 if len(arguments) < 3 :
     print("Missing required command line parameters.")
     print(arguments)
-    print(f"Usage: python {sys.argv[0]} <control file> <workbook>")
+    print(f"Usage: python {sys.argv[0]} [--batch <file>] <control file> <workbook>")
     print(" .. or, if using BAT file: Apply.bat <workbook>")
     print("Terminating process.")
     sys.exit(1)
@@ -29,7 +47,7 @@ if not worksheet_path.is_file():
     sys.exit(1)
     
 # Read parameter file and load values into a dictionary object.
-err_code, parms_dict = ReadControl.read(arguments[1], True)
+err_code, parms_dict = ReadControl.read(arguments[1], True, ReadControl.script_schemas["Apply.py"])
 if err_code > 0 :
     print("Terminating process.")
     sys.exit(1)
@@ -62,6 +80,12 @@ mssg_file_path = parms_dict['messagdir'][0] + "\\Apply.mssg"  # Message Director
 MessageOut(start_message)
 MessageOut(" ")
 
+# Phase timing and counters - written to the end of the output message file (see RunStats.py).  "session" is the time spent at the prompts.
+run_stats = RunStats.RunStats("Apply.py")
+if "runstats" in parms_dict and len(parms_dict['runstats']) > 0 and parms_dict['runstats'][0] == "False" :
+    run_stats.enabled = False
+run_stats.phase("control")
+
 have_other_parms = True
 #
 # Test for required pandas and openpyxl libraries in current environment.
@@ -81,27 +105,7 @@ except ModuleNotFoundError:
     MessageShow("Make sure that you run " + arguments[0] + " in a virtual environment that is activated and has openpyxl installed.")
     have_other_parms = False
 
-if 'inputdir' not in parms_dict:
-    MessageShow(f"\"inputdir\" parameter not found in {arguments[1]} Control File.")
-    have_other_parms = False
-elif len(parms_dict['inputdir']) < 1 :
-    MessageShow(f"\"inputdir\" parameter in {arguments[1]} Control File should have an argument: <workbook file name>")
-    have_other_parms = False
-
-if 'targetsheet' not in parms_dict:
-    MessageShow(f"\"targetsheet\" parameter not found in {arguments[1]} Control File.")
-    have_other_parms = False
-elif len(parms_dict['targetsheet']) < 1 :
-    MessageShow(f"\"targetsheet\" parameter in {arguments[1]} Control File should have an argument: <workbook file name>")
-    have_other_parms = False
-    
-if 'copycols' not in parms_dict:
-    MessageShow(f"\"copycols\" parameter not found in {arguments[1]} Control File.")
-    have_other_parms = False
-elif len(parms_dict['copycols']) < 2 :
-    MessageShow(f"\"copycols\" parameter in {arguments[1]} Control File should have two arguments: <workbook file name> <worksheet name>")
-    have_other_parms = False
-    
+# ("inputdir", "targetsheet", and "copycols" are checked when the Control File is read - see ReadControl.script_schemas.)
 if not have_other_parms :
     MessageShow("Terminating process.")
     MessageClose()
@@ -165,6 +169,7 @@ for c_row in controlsheet.iter_rows(min_row=2, max_row=controlsheet.max_row, val
 #
 #
 # Read Roles Worksheet
+run_stats.phase("load")
 workbook_path = parms_dict['inputdir'][0] + "\\" + arguments[2]
 MessageShow("Reading " + workbook_path)
 
@@ -187,19 +192,14 @@ except Exception as err:
 role_headers = {}
 def getRoleHeaders (sheet_row) :
     global role_headers
-    for idx, cell in enumerate(sheet_row):
-        if cell.value is not None :
-            col_header = cell.value.strip() 
-            role_headers[col_header] = idx
+    role_headers = RoleReader.headerIndex(sheet_row)
             
-start_data_row = 2
-getRoleHeaders(worksheet[1])
+first_rows = list(worksheet.iter_rows(min_row=1, max_row=2, values_only=True))
+skip_header = None
 if "skip_header" in parms_dict :    # Special processing for GPS_Open_Demands_Report.xlsx - headers needed for processing are on second line.
     skip_header = parms_dict['skip_header'][0]
-    if skip_header in role_headers and role_headers[skip_header] == 0 :
-        role_headers = {}
-        start_data_row += 1 
-        getRoleHeaders(worksheet[2])
+start_data_row = RoleReader.skipHeaderRow(first_rows[0] if len(first_rows) > 0 else (), skip_header) + 1
+getRoleHeaders(first_rows[start_data_row - 2] if len(first_rows) > start_data_row - 2 else ())
 
 def getIndexOfColumn (column_title) :
     global worksheet_name, role_headers
@@ -240,62 +240,187 @@ if ix_request < 0 or ix_role < 0 :
     MessageClose()
     sys.exit(1)
     
+# Columns indexed for "/search <terms>" (see SearchIndex.py):  the Control Worksheet rows with a value in the "Search" column - or, if there is no "Search" column,
+# the rows with a value in the "Display" column.  The index is read from its cache file, if current - otherwise built as the rows are read, below.
+search_titles = []
+search_ixs = []
+def findSearchColumns() :
+    global ctrl_headers, controlsheet, role_headers, search_titles, search_ixs
+    have_search_column = 'Search' in ctrl_headers
+    search_cix = ctrl_headers['Search'] if have_search_column else ctrl_headers['Display']
+    source_cix = ctrl_headers['Source']
+    for c_row in controlsheet.iter_rows(min_row=2, max_row=controlsheet.max_row, values_only=True) :
+        source_col_name = c_row[source_cix]
+        if c_row[search_cix] is None or source_col_name == "?" or source_col_name in search_titles :
+            continue
+        if source_col_name in role_headers :
+            search_titles.append(source_col_name)
+            search_ixs.append(role_headers[source_col_name])
+        elif have_search_column :
+            getIndexOfColumn(source_col_name)       # (Shows the warning.)
+
+findSearchColumns()
+search_index = SearchIndex.SearchIndex(workbook_path, search_titles)
+build_search = len(search_ixs) > 0 and not search_index.readCache()
+
 # Save row indexes into a Python dictionary.
+run_stats.phase("index rows")
 request_dict = {}
 row_count = start_data_row - 1
-blank_rows = 0
 for row in worksheet.iter_rows(min_row=start_data_row, max_row=worksheet.max_row, values_only=False):
     row_count +=1
-    if row[ix_request].value is None :  # Test for blank rows, and ignore anything beyond the first couple of blank Request IDs.
-                                # Excel seems to be confused by the MySource process, and does not know that rows have been deleted.  After going through the real rows, worksheet.iter_rows(...) 
-                                # keeps going and makes repeated passes through the actual rows. This would throw off the row_count value, so that later retrieval would not work.
-        blank_rows += 1
-    elif blank_rows < 3 :
-        request_id_value = row[ix_request].value
-        if isinstance(request_id_value, int) :
-            request_dict[request_id_value] = row_count
-        elif isinstance(request_id_value, str) :
-            if len(request_id_value) > 6 :
-                print (request_id_value)
-                request_id_value = request_id_value[-6:]
-            try :
-                request_id_int = int(request_id_value)
-                request_dict[request_id_int] = row_count
-            except ValueError:
-                MessageShow(f"Request ID not valid; found \"{request_id_value}\"")
-                
+    if row[ix_request].value is None :      # Blank Request ID - skipped.
+        continue
+    request_id_value = row[ix_request].value
+    if isinstance(request_id_value, int) :
+        request_dict[request_id_value] = row_count
+        if build_search :
+            search_index.addRole(request_id_value, [row[search_ix].value for search_ix in search_ixs])
+    elif isinstance(request_id_value, str) :
+        if len(request_id_value) > 6 :
+            print (request_id_value)
+            request_id_value = request_id_value[-6:]
+        try :
+            request_id_int = int(request_id_value)
+            request_dict[request_id_int] = row_count
+            if build_search :
+                search_index.addRole(request_id_int, [row[search_ix].value for search_ix in search_ixs])
+        except ValueError:
+            MessageShow(f"Request ID not valid; found \"{request_id_value}\"")
+            
 MessageShow(f"Read {len(request_dict)} rows from \"{worksheet_name}\" worksheet.")
+if build_search :
+    search_index.finish()
+    search_index.writeCache()
+if len(search_ixs) > 0 :
+    MessageShow(f"Search index: {len(search_index.vocabulary)} words in {', '.join(search_titles)}{' (from ' + search_index.cache_path + ')' if search_index.from_cache else ''}.")
 
 #
 #
 # Read Target Worksheet
-target_path = parms_dict['targetsheet'][0]
-MessageShow("Reading " + target_path)
+run_stats.phase("target")
+# If "actionstore <database path>" is specified in the Control File, the actions are added to the SQLite action store (see ActionStore.py) instead of the target worksheet.
+# Each action is committed as it is entered - so there is no final save of the target workbook.
+# Otherwise, each action is written to a journal next to the target workbook (see ActionStore.ActionJournal) as it is entered, and the workbook is saved every
+# "saveevery <N>" actions (default 10; 0 - only at the end) and at the end.  Actions not saved by an earlier run (a crash, or a failed save) are recovered from the journal.
+sql_store = None
+journal = None
+save_every = 10
+if "actionstore" in parms_dict and len(parms_dict['actionstore']) > 0 :
+    target_path = parms_dict['actionstore'][0]
+    MessageShow("Reading " + target_path)
+    sql_store = ActionStore.SqlActionStore(target_path)
+    if not sql_store.open() or len(sql_store.header) == 0 :
+        if sql_store.error is None :
+            sql_store.error = f"No Action rows in {target_path}.  (Use ActionSync.py to import the Action worksheet.)"
+        MessageShow(sql_store.error)
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+    targetsheet_name = sql_store.sheet_title if sql_store.sheet_title else target_path
+    target_header_row = sql_store.header
+else :
+    target_path = parms_dict['targetsheet'][0]
+    MessageShow("Reading " + target_path)
 
-try:
-    targetbook  = load_workbook(target_path)
-    targetsheet = targetbook.active  # Get the active (only) worksheet.
-    targetsheet_name = targetbook.sheetnames[0] 
-except FileNotFoundError:
-    MessageShow(f"File {target_path} not found.")
-    MessageShow("Terminating process.")
-    MessageClose()
-    sys.exit(1)
-except Exception as err:
-    MessageShow(f"Could not open the file: {err}")
-    MessageShow("Terminating process.")
-    MessageClose()
-    sys.exit(1)
+    try:
+        targetbook  = load_workbook(target_path)
+        targetsheet = targetbook.active  # Get the active (only) worksheet.
+        targetsheet_name = targetbook.sheetnames[0] 
+    except FileNotFoundError:
+        MessageShow(f"File {target_path} not found.")
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+    except Exception as err:
+        MessageShow(f"Could not open the file: {err}")
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+    target_header_row = [cell.value for cell in targetsheet[1]]
+
+    journal = ActionStore.ActionJournal(target_path)
+    if "saveevery" in parms_dict and len(parms_dict['saveevery']) > 0 :
+        try :
+            save_every = int(parms_dict['saveevery'][0])
+        except ValueError :
+            save_every = -1
+        if save_every < 0 :
+            MessageShow(f"Expected a number (0 or more) in the \"saveevery\" parameter, but found \"{parms_dict['saveevery'][0]}\".  Defaulting to 10.")
+            save_every = 10
 
 #   Find target column headers.
 target_headers = {}
 max_target_col = 0
-for idx, cell in enumerate(targetsheet[1]):
-    if cell.value is not None :
-        col_header = cell.value.strip() 
+for idx, header_value in enumerate(target_header_row):
+    if header_value is not None :
+        col_header = header_value.strip() 
         target_headers[col_header] = idx
         max_target_col = idx
 
+def getTargetIndex (column_title) :
+    global target_headers, targetsheet_name
+    if column_title in target_headers :
+        ix_request = target_headers[column_title]
+    else:
+        MessageShow(f"Did not locate \"{column_title}\" column header in \"{targetsheet_name}\" worksheet.")
+        ix_request = -1
+    return ix_request
+
+#
+#
+# Compile Control Worksheet into column plans - once, so that each Request ID entered is answered without reading the Control Worksheet again.
+#   display_plan - (Target label, source column index) for each row with a "Display" value.
+#   action_plans - For "Applied" and "Pass":  (list of (target column index, source column index, type, query type, prompt), list of target column types).
+#                  The source column index is -1 for a "?" (query) row.
+# Columns not found in the Roles or Target worksheet, and query types not understood, are reported here - once - and left out of the plans.
+run_stats.phase("plan")
+query_types = ("today", "action", "prompt", "literal")
+display_plan = []
+action_plans = {"Applied": ([], ["str"] * (max_target_col + 1)), "Pass": ([], ["str"] * (max_target_col + 1))}
+def compilePlans() :
+    global ctrl_headers, controlsheet, display_plan, action_plans
+    display_cix = ctrl_headers['Display']
+    source_cix  = ctrl_headers['Source']
+    target_cix  = ctrl_headers['Target']
+    type_cix    = ctrl_headers['Type']
+    query_cix   = ctrl_headers['Query']
+    prompt_cix  = ctrl_headers['Prompt']
+    action_cixs = {"Applied": ctrl_headers['Apply'], "Pass": ctrl_headers['Pass']}
+    for c_row in controlsheet.iter_rows(min_row=2, max_row=controlsheet.max_row, values_only=True) :
+        source_col_name = c_row[source_cix]
+        target_col_name = c_row[target_cix]
+        ix_source = None        # Looked up (and any warning shown) the first time it is needed.
+        if c_row[display_cix] is not None :
+            ix_source = getIndexOfColumn(source_col_name)
+            if ix_source > -1 :
+                display_plan.append((target_col_name, ix_source))
+
+        action_names = [action_name for action_name, action_cix in action_cixs.items() if c_row[action_cix] is not None]
+        if len(action_names) == 0 :
+            continue
+        col_index = getTargetIndex(target_col_name)
+        if col_index < 0 :
+            continue
+        if source_col_name == "?" :
+            query_type = c_row[query_cix]
+            if query_type not in query_types :
+                MessageShow(f"*** Note: \"{query_type}\" argument for \"{target_col_name}\" parameter not understood.")
+                continue
+            column_plan = (col_index, -1, "date" if query_type == "today" else None, query_type, c_row[prompt_cix])
+        else :
+            if ix_source is None :
+                ix_source = getIndexOfColumn(source_col_name)
+            if ix_source < 0 :
+                continue
+            column_plan = (col_index, ix_source, c_row[type_cix], None, None)
+        for action_name in action_names :
+            action_plans[action_name][0].append(column_plan)
+            if column_plan[2] is not None :
+                action_plans[action_name][1][col_index] = column_plan[2]
+
+compilePlans()
+
 #   Test input Request ID format and value.  This value is entered by the user, from a prompt.
 def testRequestInput(string_input) :
     try:
@@ -311,7 +436,7 @@ def testRequestInput(string_input) :
     return num_value
     
 def displayRowInfo(search_request_id) :
-    global request_dict, worksheet, ix_request, ix_role, target_row, current_request_tag, controlsheet
+    global request_dict, worksheet, ix_request, ix_role, target_row, current_request_tag, display_plan
     target_row_num = request_dict[search_request_id]
     target_row = worksheet[target_row_num]
     
@@ -319,21 +444,14 @@ def displayRowInfo(search_request_id) :
     MessageShow("")
     MessageShow(current_request_tag)
     
-    display_cix = ctrl_headers['Display']
-    source_cix  = ctrl_headers['Source']
-    target_cix  = ctrl_headers['Target']
-    for c_row in controlsheet.iter_rows(min_row=2, max_row=controlsheet.max_row, values_only=False) :
-        if c_row[display_cix].value is not None :
-            source_col_name = c_row[source_cix].value
-            # print(f"source_col_name = {source_col_name}")
-            ix_source = getIndexOfColumn(source_col_name)
-            if ix_source > -1 :
-                MessageShow(f"{c_row[target_cix].value}: {target_row[ix_source].value}")
+    for target_label, ix_source in display_plan :
+        MessageShow(f"{target_label}: {target_row[ix_source].value}")
 
 #         
 #   inputAction() - Get user response re Apply For or Pass Over - re current Request ID.  Update target worksheet with action information for the current Request ID.
+count_actions = 0
 def inputAction(request_id) :
-    global target_path, targetsheet, current_request_tag, target_updated, col_types
+    global target_path, current_request_tag, col_types, count_actions
     print (" "  )
     input_action = input("Pass Over or Apply For this role? ")
     if input_action == "" :
@@ -351,96 +469,258 @@ def inputAction(request_id) :
         return
         
     if isinstance(new_row, list) :
+        appendTarget([(new_row, col_types)])
+        MessageShow(f"Updated {target_path} with (\"{action_name}\") for {current_request_tag}.")
+        count_actions += 1
+    
+#
+#   appendTarget() - Append rows - list of (new_row, col_types) - to the target worksheet.  With "actionstore", the rows are added to the action store in a single transaction.
+#   The rows are written to the journal first - and the workbook is saved when "saveevery" actions are waiting.
+def appendTarget(built_rows, journaled=False) :
+    global sql_store, targetsheet, target_updated, journal, save_every
+    if sql_store is not None :
+        sql_store.appendRows([new_row for new_row, row_types in built_rows])
+        return
+    if not journaled :
+        journal.append(built_rows)
+    for new_row, row_types in built_rows :
         targetsheet.append(new_row)
-        target_updated = True
-        for col_ix, col_value in enumerate(col_types):
+        for col_ix, col_value in enumerate(row_types):
             if col_value == "date" :
                 date_cell = targetsheet.cell(row=targetsheet.max_row, column=(col_ix + 1))
                 date_cell.number_format = 'mm/dd/yyyy'
-                
-        MessageShow(f"Updated {target_path} with (\"{action_name}\") for {current_request_tag}.")
-    
+    target_updated = True
+    if save_every > 0 and journal.pending >= save_every :
+        saveTarget()
+
+#   saveTarget() - Save the target workbook, and empty the journal.  If the save fails, the actions stay in the journal - for the next save, or the next run.
+count_saves = 0
+def saveTarget() :
+    global targetbook, target_path, target_updated, journal, count_saves
+    journal.markSaving()
+    try:
+        targetbook.save(target_path)
+    except Exception as err:
+        MessageShow(f"Could not save {target_path}: {err}")
+        MessageShow(f"The {journal.pending} actions not yet saved are kept in {journal.journal_path} - they are saved later, or recovered by the next run.")
+        return False
+    journal.markSaved()
+    target_updated = False
+    count_saves += 1
+    return True
+
 #
-#   buildRow() - Prepare list object containing elements to be appended to the target worksheet row.
-def buildRow(action, request_id) :
-    global arguments, parms_dict, max_target_col, target_row, col_types, ctrl_headers, controlsheet
-    new_row = [""] * (max_target_col + 1)
-    col_types = ["str"] * (max_target_col + 1)
-    if action == "Applied" :
-        action_cix = ctrl_headers['Apply']
-    elif action == "Pass" :
-        action_cix = ctrl_headers['Pass']
-    else :
+#   buildRow() - Prepare list object containing elements to be appended to the target worksheet row - from the column plan for the action (see compilePlans).
+#   In batch mode, the notes go in the first "prompt" column (the other "prompt" columns are left blank) - instead of asking.
+def buildRow(action, request_id, notes=None) :
+    global max_target_col, target_row, col_types, action_plans, target_header_row
+    if action not in action_plans :
         return None
-        
-    source_cix  = ctrl_headers['Source']
-    target_cix  = ctrl_headers['Target']
-    type_cix    = ctrl_headers['Type']
-    query_cix   = ctrl_headers['Query']
-    prompt_cix  = ctrl_headers['Prompt']
-    for c_row in controlsheet.iter_rows(min_row=2, max_row=controlsheet.max_row, values_only=False) :
-        if c_row[action_cix].value is not None :
-            source_col_name = c_row[source_cix].value
-            target_col_name = c_row[target_cix].value
-            col_index = getTargetIndex(target_col_name)
-            if col_index > -1 :
-                if source_col_name == "?" :
-                    query_type = c_row[query_cix].value
-                    if query_type == "today" :
-                        todays_date = datetime.now()
-                        new_row[col_index] = todays_date
-                        col_types[col_index] = "date"
-                    elif query_type == "action" :
-                        new_row[col_index] = action
-                    elif query_type == "prompt" :
-                        input_info = input(c_row[prompt_cix].value + " ")
-                        new_row[col_index] = input_info
-                    elif query_type == "literal" :
-                        new_row[col_index] = c_row[prompt_cix].value
-                    else :
-                        MessageShow(f"*** Note: \"{query_type}\" argument for \"{target_col_name}\" parameter not understood.")
-                else : 
-                    ix_source = getIndexOfColumn(source_col_name)
-                    if ix_source > -1 :
-                        col_types[col_index] = c_row[type_cix].value
-                        if col_types[col_index] == "int" :
-                            try :
-                                new_row[col_index] = int(target_row[ix_source].value)
-                            except ValueError :
-                                MessageShow(f"Unexpected value, \"{target_row[ix_source].value}\" for {target_col_name}.")
-                        else :
-                            new_row[col_index] = target_row[ix_source].value                            
+    column_plan, plan_types = action_plans[action]
+    new_row = [""] * (max_target_col + 1)
+    col_types = list(plan_types)
+    for col_index, ix_source, col_type, query_type, prompt_text in column_plan :
+        if ix_source < 0 :
+            if query_type == "today" :
+                new_row[col_index] = datetime.now()
+            elif query_type == "action" :
+                new_row[col_index] = action
+            elif query_type == "prompt" :
+                if notes is None :
+                    new_row[col_index] = input(prompt_text + " ")
+                else :
+                    new_row[col_index] = notes
+                    notes = ""
+            elif query_type == "literal" :
+                new_row[col_index] = prompt_text
+        elif col_type == "int" :
+            try :
+                new_row[col_index] = int(target_row[ix_source].value)
+            except (ValueError, TypeError) :
+                MessageShow(f"Unexpected value, \"{target_row[ix_source].value}\" for {target_header_row[col_index]}.")
+        else :
+            new_row[col_index] = target_row[ix_source].value
     return new_row
     
+#   actionRequestIds() - Set of the Request IDs that already have an action in the target worksheet (or action store).  None if the Request ID column is not in the plans.
+def actionRequestIds() :
+    global sql_store, targetsheet, action_plans, ix_request
+    if sql_store is not None :
+        return sql_store.requestIds()
+    target_ixs = [col_index for column_plan, plan_types in action_plans.values() for col_index, ix_source, col_type, query_type, prompt_text in column_plan if ix_source == ix_request]
+    if len(target_ixs) == 0 :
+        return None
+    request_ids = set()
+    for (request_id_value,) in targetsheet.iter_rows(min_row=2, min_col=target_ixs[0] + 1, max_col=target_ixs[0] + 1, values_only=True) :
+        try :
+            request_ids.add(int(request_id_value))
+        except (ValueError, TypeError) :
+            pass
+    return request_ids
 
-def getTargetIndex (column_title) :
-    global target_headers, targetsheet_name
-    if column_title in target_headers :
-        ix_request = target_headers[column_title]
-    else:
-        MessageShow(f"Did not locate \"{column_title}\" column header in \"{targetsheet_name}\" worksheet.")
-        ix_request = -1
-    return ix_request
-    
-target_updated = False
-while True :
-    print ("")
-    input_request_id = input("Please enter Request ID: ")
-    if input_request_id == "" :
-        print("")
-        MessageShow("Ending process.")
-        break
-    search_request_id = testRequestInput(input_request_id)
-    if search_request_id > 0 :
-        if search_request_id in request_dict :
-            displayRowInfo(search_request_id)
-            inputAction(search_request_id)
-                
+#   readBatch() - Read the batch lines.  Returns a list of (Request ID, action name, notes) - one for each Request ID, the first listed.
+#   Lines that are not valid, Request IDs not in the Roles worksheet, and Request IDs listed more than once are reported and left out.
+batch_missing = []
+batch_repeated = []
+def readBatch(batch_file) :
+    global request_dict, worksheet_name, batch_missing, batch_repeated
+    batch_actions = []
+    batch_ids = set()
+    for line_num, batch_line in enumerate(batch_file, start=1) :
+        line_parts = batch_line.strip().split(None, 2)
+        if len(line_parts) == 0 or line_parts[0].startswith("#") :
+            continue
+        if len(line_parts) < 2 or line_parts[1].capitalize()[0:1] not in ("A", "P") :
+            MessageShow(f"Line {line_num}: expected <Request ID> <A or P> [<notes>], found \"{batch_line.strip()}\".  Skipped.")
+            continue
+        search_request_id = testRequestInput(line_parts[0])
+        if search_request_id < 1 :
+            MessageShow(f"Line {line_num} skipped.")
+        elif search_request_id not in request_dict :
+            batch_missing.append(search_request_id)
+        elif search_request_id in batch_ids :
+            batch_repeated.append(search_request_id)
+        else :
+            batch_ids.add(search_request_id)
+            action_name = "Applied" if line_parts[1].capitalize()[0:1] == "A" else "Pass"
+            batch_actions.append((search_request_id, action_name, line_parts[2] if len(line_parts) > 2 else ""))
+    return batch_actions
+
+#   runBatch() - Build the rows for all of the batch actions, and append them to the target worksheet (or action store) together.
+def runBatch() :
+    global batch_path, target_path, worksheet, worksheet_name, request_dict, target_row, col_types, count_actions, batch_missing, batch_repeated
+    MessageShow(f"Reading batch actions from {'standard input' if batch_path == '-' else batch_path}")
+    try:
+        if batch_path == "-" :
+            batch_actions = readBatch(sys.stdin)
         else :
-            MessageShow (f"Request ID {search_request_id} not found in \"{worksheet_name}\" worksheet.")
+            with open(batch_path, encoding="utf-8") as batch_file :
+                batch_actions = readBatch(batch_file)
+    except OSError as err:
+        MessageShow(f"Could not read the batch file: {err}")
+        return
+
+    action_ids = actionRequestIds()
+    if action_ids is None :
+        MessageShow(f"The Request ID column is not copied to the \"{targetsheet_name}\" worksheet - not checking for Request IDs that already have an action.")
+        action_ids = set()
+    built_rows = []
+    built_actions = []
+    already_listed = []
+    for request_id, action_name, notes in batch_actions :
+        target_row = worksheet[request_dict[request_id]]
+        new_row = buildRow(action_name, request_id, notes)
+        if isinstance(new_row, list) :
+            built_rows.append((new_row, col_types))
+            built_actions.append(action_name)
+            if request_id in action_ids :
+                already_listed.append(request_id)
+    if len(built_rows) > 0 :
+        appendTarget(built_rows)
+        count_actions += len(built_rows)
+
+    MessageShow("")
+    MessageShow(f"Updated {target_path} with {len(built_rows)} actions:  {built_actions.count('Applied')} Applied, {built_actions.count('Pass')} Pass.")
+    if len(batch_missing) > 0 :
+        MessageShow(f"{len(batch_missing)} Request IDs not found in \"{worksheet_name}\" worksheet (no action taken):  " + " ".join(str(request_id) for request_id in batch_missing))
+    if len(batch_repeated) > 0 :
+        MessageShow(f"{len(batch_repeated)} Request IDs listed more than once (the first is used):  " + " ".join(str(request_id) for request_id in batch_repeated))
+    if len(already_listed) > 0 :
+        MessageShow(f"{len(already_listed)} Request IDs already had an action in {target_path} (another was added):  " + " ".join(str(request_id) for request_id in already_listed))
+
+#   searchRoles() - "/search <terms>" - Show the roles that best match the search terms, best first.
+count_searches = 0
+search_show = 20    # Roles shown for a search.
+def searchRoles(search_text) :
+    global search_index, search_ixs, search_show, request_dict, worksheet, ix_role, count_searches
+    if len(search_ixs) == 0 :
+        MessageShow("No columns to search.  (Mark them in the \"Search\" or \"Display\" column of the Control Worksheet.)")
+        return
+    if search_text.strip() == "" :
+        MessageShow("Usage:  /search <terms>")
+        return
+    search_start = time.perf_counter()
+    search_results = [search_result for search_result in search_index.search(search_text) if search_result[0] in request_dict]
+    search_ms = (time.perf_counter() - search_start) * 1000
+    count_searches += 1
+    shown_note = f", the first {search_show} shown" if len(search_results) > search_show else ""
+    MessageShow(f"{len(search_results)} roles found for \"{search_text.strip()}\" ({search_ms:.1f} ms{shown_note}):")
+    for request_id, terms_matched, score in search_results[:search_show] :
+        MessageShow(f"   {request_id}   {worksheet[request_dict[request_id]][ix_role].value}   ({terms_matched} terms, score {score})")
+
+target_updated = False
+count_recovered = 0
+if journal is not None :
+    recovered_rows = journal.readPending()
+    if journal.error is not None :
+        MessageShow(journal.error)
+    if journal.saving > 0 :
+        last_rows = [list(row_values) for row_values in targetsheet.iter_rows(min_row=max(2, targetsheet.max_row - journal.saving + 1), values_only=True)]
+        saved_count = journal.savedCount(recovered_rows, last_rows)
+        if saved_count > 0 :
+            MessageShow(f"{saved_count} actions in {journal.journal_path} were saved by an earlier run - before it ended.  Not added again.")
+            recovered_rows = recovered_rows[saved_count:]
+    if not journal.open(recovered_rows) :
+        MessageShow(journal.error)
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+    if len(recovered_rows) > 0 :
+        count_recovered = len(recovered_rows)
+        MessageShow(f"Recovered {count_recovered} actions not saved by an earlier run, from {journal.journal_path}.")
+        appendTarget(recovered_rows, journaled=True)
+
+if batch_path is not None :
+    run_stats.phase("batch")
+    runBatch()
+else :
+    run_stats.phase("session")
+    if len(search_ixs) > 0 :
+        print("(Enter \"/search <terms>\" to find roles by " + ", ".join(search_titles) + ".)")
+    while True :
+        print ("")
+        input_request_id = input("Please enter Request ID: ")
+        if input_request_id == "" :
+            print("")
+            MessageShow("Ending process.")
+            break
+        if input_request_id.startswith("/") :
+            if input_request_id.split(None, 1)[0].lower() == "/search" :
+                searchRoles(input_request_id[len("/search"):])
+            else :
+                MessageShow(f"Unknown command \"{input_request_id}\".  Use:  /search <terms>")
+            continue
+        search_request_id = testRequestInput(input_request_id)
+        if search_request_id > 0 :
+            if search_request_id in request_dict :
+                displayRowInfo(search_request_id)
+                if sql_store is not None and sql_store.hasRequest(search_request_id) :
+                    MessageShow(f"Note: Request ID {search_request_id} already has an action in {target_path}.")
+                inputAction(search_request_id)
+                    
+            else :
+                MessageShow (f"Request ID {search_request_id} not found in \"{worksheet_name}\" worksheet.")
 
 if target_updated :
-    input_dummy = input(f"Is the {targetsheet_name} workbook closed?  If not, will CRASH !!!  <Enter> to continue.")
-    targetbook.save(target_path)
-    
+    if batch_path != "-" :      # (Standard input is the batch - so no prompt.)
+        input_dummy = input(f"Is the {targetsheet_name} workbook closed?  <Enter> to continue.")     # (Counted in the "session" or "batch" phase.)
+    run_stats.phase("save")
+    saveTarget()
+if journal is not None :
+    journal.close()
+if sql_store is not None :
+    sql_store.close()
+run_stats.endPhase()
+
+run_stats.setRows(len(request_dict))
+run_stats.count("requests", len(request_dict))
+run_stats.count("actions_recorded", count_actions)
+if journal is not None :
+    run_stats.count("actions_recovered", count_recovered)
+    run_stats.count("saves", count_saves)
+run_stats.count("searches", count_searches)
+if batch_path is not None :
+    run_stats.count("batch_missing", len(batch_missing))
+    run_stats.count("batch_repeated", len(batch_repeated))
+run_stats.writeSection(MessageOut)
 MessageClose()
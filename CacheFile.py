@@ -0,0 +1,55 @@
+# CacheFile.py - Read and write the cache and state files kept next to an input file:  the Action File cache (ActionStore.py), the role file cache (RoleReader.py),
+# the search index (SearchIndex.py), the Control File cache (ReadControl.py), and the Mario.py state file.
+
+# Each cache file is a dictionary in pickle form, with a 'version' entry and whatever identifies the input it was made from (usually the input file's stamp - its
+# modification time and size).  readPickle() returns the dictionary only if those entries match - otherwise the cache is out of date, and is rebuilt by the caller.
+# Cache files are written to a temporary file first, then moved into place - so an interrupted run never leaves a partial cache file.
+
+import os
+import pickle
+
+
+#   fileStamp() - (modification time, size) of a file.  A change in either means the file has changed.  Raises OSError if the file is not found.
+def fileStamp(file_path) :
+    file_stat = os.stat(file_path)
+    return (file_stat.st_mtime_ns, file_stat.st_size)
+
+#   readPickle() - The dictionary in the cache file, if its entries are equal to the expected values (keyword arguments, for example version=1, stamp=...).  Otherwise
+#   - or if the file is not found, or cannot be read - None.
+def readPickle(cache_path, **expected) :
+    try:
+        with open(cache_path, "rb") as cache_file :
+            cache_content = pickle.load(cache_file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, ImportError):
+        return None
+    if not isinstance(cache_content, dict) :
+        return None
+    for entry_key, entry_value in expected.items() :
+        if cache_content.get(entry_key) != entry_value :
+            return None
+    return cache_content
+
+#   writeReplace() - Write a file through a temporary file:  write_content(temp_path) writes it, then it is moved into place.  If writing fails, the temporary file is
+#   removed, and the exception raised again.
+def writeReplace(file_path, write_content) :
+    temp_path = file_path + ".tmp"
+    try:
+        write_content(temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+#   writePickle() - Write the dictionary to the cache file.  Returns True if successful.  (A cache file that cannot be written is not an error - it is rebuilt next time.)
+def writePickle(cache_path, cache_content) :
+    def dumpContent(temp_path) :
+        with open(temp_path, "wb") as cache_file :
+            pickle.dump(cache_content, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        writeReplace(cache_path, dumpContent)
+    except (OSError, pickle.PicklingError):
+        return False
+    return True
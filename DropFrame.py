@@ -0,0 +1,228 @@
+# DropFrame.py - Decide the rows of the Roles Worksheet with pandas: each "droprows" condition is tested against a whole column at once.  Used by MySource.py with "filterengine pandas".
+
+# The rows are loaded into a DataFrame, and each condition becomes a column-wide True/False mask.  The values of a role column repeat from row to row (practice, clearance,
+# location, even the skills text), so each tested column is factorized once - and a condition is worked out once for each distinct value, then mapped back onto the rows:
+#   drop, dropbl, keep, keepbl - isin() on the listed values.
+#   before    - Date comparison on the values that are dates.
+#   dropincl  - str.contains() on the lowered text, for each of the listed values.
+#   filter    - str.contains() on the lowered text, one value at a time in the order listed - so the first listed value found is the My Filter value.
+#   location  - The percentage tables are looked up once per distinct Co-Location and My Location value, and the percentages mapped onto the rows.
+#
+# The masks are applied in the order of the "droprows" parameter, each only to the rows still kept - so the condition that drops a row, the My Filter value, and all of the
+# tallies (rows dropped per condition, blank and unmatched My Location values, rows tested) are the same as for DropPlan.dropThisRow(), row by row.
+#
+# Note: factorize() takes equal numbers of different types (1, 1.0, True) as one value.  That is also how the listed values are matched (as for a Python set), but not how
+# the text of a cell is searched ("1" vs "1.0") - so the "filter" and "dropincl" conditions search cells that are not text one row at a time, as DropRules.lowerText() does.
+
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import DropRules
+
+
+#   FrameColumns - The rows of a batch, with each tested column factorized once: codes (one per row, -1 for an empty cell) and distinct values.
+class FrameColumns:
+
+    def __init__(self, rows):
+        self.frame = pd.DataFrame(rows, dtype=object)       # Rows shorter than the others are filled out with None.
+        self.row_count = len(rows)
+        self.factors = {}
+
+    def column(self, col_ix):
+        if col_ix >= self.frame.shape[1] :
+            return pd.Series([None] * self.row_count, dtype=object)
+        return self.frame[col_ix]
+
+    #   codes() - (codes, distinct values) of the column.  An empty cell (None) has code -1 - so a per-value array with one extra entry at the end gives the result for None.
+    def codes(self, col_ix):
+        if col_ix not in self.factors :
+            value_codes, distinct_values = pd.factorize(self.column(col_ix).to_numpy(dtype=object))
+            self.factors[col_ix] = (value_codes, np.asarray(distinct_values, dtype=object))
+        return self.factors[col_ix]
+
+    #   distinctResult() - Apply function to each distinct value (and to None), and map the results onto the rows.
+    def distinctResult(self, col_ix, function):
+        value_codes, distinct_values = self.codes(col_ix)
+        distinct_results = np.array([function(cell_value) for cell_value in distinct_values] + [function(None)], dtype=bool)
+        return distinct_results[value_codes]
+
+    def blank(self, col_ix):
+        return self.distinctResult(col_ix, DropRules.isBlank)
+
+    #   firstFound() - For the rows in row_mask: index of the first of the (lowered) patterns found in the lowered cell text, or -1.  Other rows: -1.
+    def firstFound(self, col_ix, row_mask, matcher):
+        value_codes, distinct_values = self.codes(col_ix)
+        found_ixs = np.full(self.row_count, -1, dtype=np.int64)
+        row_mask = row_mask & (value_codes > -1)
+        if not row_mask.any() :
+            return found_ixs
+
+        # Distinct text values (of the rows in row_mask) - searched with str.contains(), a pattern at a time.
+        needed = np.zeros(len(distinct_values), dtype=bool)
+        needed[value_codes[row_mask]] = True
+        is_text = np.array([isinstance(cell_value, str) for cell_value in distinct_values], dtype=bool)
+        distinct_found = np.full(len(distinct_values), -1, dtype=np.int64)
+        text_ixs = np.flatnonzero(needed & is_text)
+        if len(text_ixs) > 0 :
+            lowered = pd.Series(distinct_values[text_ixs], dtype=pd.StringDtype()).str.lower()
+            for pattern_ix, pattern in enumerate(matcher.patterns) :
+                found_mask = lowered.str.contains(pattern, regex=False).to_numpy(dtype=bool)
+                if found_mask.any() :
+                    distinct_found[text_ixs[found_mask]] = pattern_ix
+                    lowered = lowered[~found_mask]
+                    text_ixs = text_ixs[~found_mask]
+                    if len(text_ixs) == 0 :
+                        break
+        found_ixs[row_mask] = distinct_found[value_codes[row_mask]]
+
+        # Cells that are not text (numbers, dates) - one row at a time.
+        other_rows = np.flatnonzero(row_mask & ~is_text[np.maximum(value_codes, 0)])
+        if len(other_rows) > 0 :
+            column = self.column(col_ix)
+            for row_ix in other_rows :
+                found_ixs[row_ix] = matcher.firstListed(DropRules.lowerText(column.iat[row_ix]))
+        return found_ixs
+
+
+#   FrameState - The My Filter value of each row, carried from one condition to the next (as DropRules.RowState, for a row).
+class FrameState:
+
+    def __init__(self, row_count):
+        self.my_filter = np.full(row_count, "", dtype=object)
+        self.found_filter = np.zeros(row_count, dtype=bool)
+
+
+#   Mask functions - one for each condition type.  Each returns the mask of the rows dropped by the condition, out of the rows still kept (alive).
+def maskDropValues(rule, columns, alive, state) :
+    value_codes, distinct_values = columns.codes(rule.col_ix)
+    distinct_drop = np.append(pd.Series(distinct_values, dtype=object).isin(rule.values).to_numpy(dtype=bool), False)
+    drop_mask = distinct_drop[value_codes]
+    if rule.drop_blank :
+        drop_mask = drop_mask | columns.blank(rule.col_ix)
+    return alive & drop_mask
+
+def maskKeepValues(rule, columns, alive, state) :
+    value_codes, distinct_values = columns.codes(rule.col_ix)
+    distinct_drop = np.append(~pd.Series(distinct_values, dtype=object).isin(rule.values).to_numpy(dtype=bool), True)
+    drop_mask = distinct_drop[value_codes]
+    if rule.keep_blank :
+        drop_mask = drop_mask & ~columns.blank(rule.col_ix)
+    return alive & drop_mask
+
+def maskBeforeDate(rule, columns, alive, state) :
+    value_codes, distinct_values = columns.codes(rule.col_ix)
+    is_date = np.array([isinstance(cell_value, datetime) for cell_value in distinct_values], dtype=bool)
+    distinct_drop = np.zeros(len(distinct_values) + 1, dtype=bool)
+    if is_date.any() :
+        distinct_drop[np.flatnonzero(is_date)] = ~(pd.Series(distinct_values[is_date], dtype=object) < rule.test_date).to_numpy(dtype=bool)
+    return alive & distinct_drop[value_codes]
+
+def maskFilter(rule, columns, alive, state) :
+    search_mask = alive & ~state.found_filter & ~columns.blank(rule.col_ix)
+    if search_mask.any() :
+        found_ixs = columns.firstFound(rule.col_ix, search_mask, rule.matcher)
+        found_mask = found_ixs > -1
+        state.my_filter[found_mask] = np.array(rule.filter_values, dtype=object)[found_ixs[found_mask]]
+        state.found_filter |= found_mask
+    return np.zeros(columns.row_count, dtype=bool)
+
+def maskNoFilter(rule, columns, alive, state) :
+    return alive & ~state.found_filter
+
+def maskDropIncl(rule, columns, alive, state) :
+    search_mask = alive & ~state.found_filter & ~columns.blank(rule.col_ix)
+    if not search_mask.any() :
+        return np.zeros(columns.row_count, dtype=bool)
+    return columns.firstFound(rule.col_ix, search_mask, rule.matcher) > -1
+
+def maskLocation(rule, columns, alive, state) :
+    drop_mask = np.zeros(columns.row_count, dtype=bool)
+    is_blank = columns.distinctResult(rule.ix_mylocat, lambda my_location : my_location is None or my_location == "")
+    rule.blank_count += int((alive & is_blank).sum())
+    test_mask = alive & ~is_blank
+    if not test_mask.any() :
+        return drop_mask
+
+    # Percentages - looked up once for each distinct value, then mapped onto the rows.
+    test_rows = np.flatnonzero(test_mask)
+    unmatched_rows = []         # (first row, 0 = Co-Location / 1 = My Location, parameter name, value, row count) - for each value not found in the table.
+    row_pcts = []
+    for slot, list_key, table, col_ix in ((0, rule.coloc_key, rule.coloc_table, rule.ix_colocat), (1, rule.myloc_key, rule.myloc_table, rule.ix_mylocat)) :
+        value_codes, distinct_values = columns.codes(col_ix)
+        distinct_pcts = np.array([table.lookup(location) for location in distinct_values] + [table.lookup(None)], dtype=np.int64)
+        test_codes = value_codes[test_rows]
+        pcts = distinct_pcts[test_codes]
+        row_pcts.append(pcts)
+        unmatched_ixs = np.flatnonzero(pcts < 0)
+        if len(unmatched_ixs) > 0 :
+            unmatched_codes, first_ixs, code_counts = np.unique(test_codes[unmatched_ixs], return_index=True, return_counts=True)
+            for code, first_ix, code_count in zip(unmatched_codes, first_ixs, code_counts) :
+                location = None if code < 0 else distinct_values[code]
+                unmatched_rows.append((test_rows[unmatched_ixs[first_ix]], slot, list_key, location, int(code_count)))
+    for first_row, slot, list_key, location, row_count in sorted(unmatched_rows, key=lambda unmatched_row : unmatched_row[:2]) :
+        unmatched_key = (list_key, location)
+        rule.unmatched[unmatched_key] = rule.unmatched.get(unmatched_key, 0) + row_count
+
+    drop_mask[test_rows] = row_pcts[1] < row_pcts[0]
+    return drop_mask
+
+def maskNever(rule, columns, alive, state) :
+    return np.zeros(columns.row_count, dtype=bool)
+
+mask_functions = {
+    DropRules.DropValues  : maskDropValues,
+    DropRules.KeepValues  : maskKeepValues,
+    DropRules.BeforeDate  : maskBeforeDate,
+    DropRules.LocationRule: maskLocation,
+    DropRules.FilterRule  : maskFilter,
+    DropRules.NoFilterRule: maskNoFilter,
+    DropRules.DropInclRule: maskDropIncl,
+    DropRules.DropRule    : maskNever,
+}
+
+
+#   decideAll() - Decide the rows (lists of values, each with a Request ID).  Returns the list of decisions, in row order - (drop_row, my_action, my_filter), as RowDecider.decideRow() -
+#   and adds the tallies to decider and its DropPlan rules.
+def decideAll(rows, decider) :
+    if len(rows) == 0 :
+        return []
+    drop_plan = decider.drop_plan
+    columns = FrameColumns(rows)
+
+    state = FrameState(len(rows))
+    alive = np.ones(len(rows), dtype=bool)
+    for rule in drop_plan.rules :
+        if rule.col_ix < 0 :
+            continue
+        test_start = time.perf_counter()
+        drop_mask = mask_functions[type(rule)](rule, columns, alive, state)
+        if drop_plan.timed :
+            rule.seconds += time.perf_counter() - test_start
+            rule.tested += int(alive.sum())
+        rule.count += int(drop_mask.sum())
+        alive &= ~drop_mask
+    dropped = ~alive
+
+    # Match the Request IDs against the Action File - once for each distinct Request ID.
+    request_codes, distinct_requests = columns.codes(decider.ix_request)
+    distinct_matched = []
+    distinct_actions = []
+    for request_value in distinct_requests :
+        request_id = int(request_value) if isinstance(request_value, str) else request_value
+        distinct_matched.append(request_id in decider.action_dict)
+        distinct_actions.append(decider.action_dict.get(request_id))
+    matched = np.array(distinct_matched + [False], dtype=bool)[request_codes] & alive
+
+    if not decider.do_actual_delete :
+        state.my_filter[dropped] = "DELETE"
+        state.found_filter[dropped] = True
+    decider.count_delet += int(dropped.sum())
+    decider.count_match += int(matched.sum())
+    decider.count_nomat += int((alive & ~matched).sum())
+    decider.count_nofilter += int((alive & ~state.found_filter).sum())
+
+    drop_rows = (dropped & decider.do_actual_delete).tolist()
+    my_actions = np.array(distinct_actions + [None], dtype=object)[np.where(matched, request_codes, -1)].tolist()
+    my_filters = np.where(state.found_filter, state.my_filter, None).tolist()
+    return list(zip(drop_rows, my_actions, my_filters))
@@ -0,0 +1,432 @@
+# DropRules.py - Compile the "droprows" conditions from the Control File into rule objects, for use by MySource.py.
+
+# The conditions are compiled once, at startup, so that the row loop does not have to re-read parms_dict (and re-parse dates, re-lower strings) for every cell of every row.
+# The "filter" and "dropincl" values are searched with a MultiMatch object (see MultiMatch.py).
+#
+#   Control File Format (First element returned as parms_dict key, subsequent elements returned in list object in parms_dict.):
+#
+#           droprows condition1 condition2 condition3 ...
+#           condition1 "column header 1" drop dropvalue1 dropvalue2 dropvalue3 ...
+#           condition2 "column header 2" keep keepvalue1 keepvalue2 keepvalue3 ...
+#
+#   Condition types:
+#
+#       drop    - Drop the row if the cell value matches any of the values listed for the condition.
+#       dropbl  - Same as "drop" but also if the cell value is blank or empty.
+#       dropincl - Drop the row if the cell value includes any of the values listed for the condition.  (Different from "drop" b/c "drop" test if equal to the whole cell value.)
+#       keep    - Keep the row if the cell value matches any of the values listed for the condition.
+#       keepbl  - Same as "keep" but also if the cell value is blank or empty.
+#       before  - Drop the row if the date is not before the specified date.
+#       location - Compares two cells of the row (My Location and Co-Location).  Drop the row if the My Location percentage is less than the Co-Location percentage.
+#                  condition "Co-Location" location <co-location list> <my location list> [nocase]
+#                  The percentage tables are indexed once (see LocationTable).  Table values may include wild cards (* and ?).  With "nocase", values are matched regardless of case.
+#       filter  - Search for a string within the cell value.  If found, set the my_filter value and found_filter flag of the RowState.
+#       nofilter - Drop the row if there is no filter set.  This condition should be listed after any "filter" conditions in the droprows arguments.
+
+import re
+import time
+import fnmatch
+from datetime import datetime
+from MultiMatch import MultiMatch
+
+
+def isBlank(cell_value) :
+    if cell_value is None :
+        return True
+    if isinstance(cell_value, str) and cell_value.strip() == "" :
+        return True
+    return False
+
+def lowerText(cell_value) :
+    if isinstance(cell_value, str) :
+        return cell_value.lower()
+    return str(cell_value).lower()
+
+
+#   RowState - Values carried from one condition to the next, while testing a single row.
+class RowState:
+
+    def __init__(self):
+        self.my_filter = ""
+        self.found_filter = False
+
+
+#   DropRule - Base class for a compiled condition.  Also used for an unrecognized condition type, which never drops a row.
+class DropRule:
+
+    def __init__(self, drop_key, drop_ix, parm_list):
+        self.drop_key = drop_key        # Name of the condition (the parameter listed in "droprows").
+        self.drop_ix = drop_ix          # Index of the condition in the "droprows" parameter.
+        self.col_header = parm_list[0]
+        self.drop_type = parm_list[1]
+        self.col_ix = -1                # Column index of the tested cell.  Stays at -1 if the column header is not found - and then the condition is not tested.
+        self.count = 0                  # Count of rows dropped b/c this condition.
+        self.tested = 0                 # Count of rows tested, and time spent testing - only kept if the DropPlan is timed.  (See RunStats.py.)
+        self.seconds = 0.0
+
+    def match(self, cell_value, row_values, state):
+        return False
+
+
+class DropValues(DropRule):     # "drop" and "dropbl"
+
+    def __init__(self, drop_key, drop_ix, parm_list):
+        super().__init__(drop_key, drop_ix, parm_list)
+        self.values = frozenset(parm_list[2:])
+        self.drop_blank = (self.drop_type == "dropbl")
+
+    def match(self, cell_value, row_values, state):
+        if self.drop_blank and isBlank(cell_value) :
+            return True
+        return cell_value in self.values
+
+
+class KeepValues(DropRule):     # "keep" and "keepbl"
+
+    def __init__(self, drop_key, drop_ix, parm_list):
+        super().__init__(drop_key, drop_ix, parm_list)
+        self.values = frozenset(parm_list[2:])
+        self.keep_blank = (self.drop_type == "keepbl")
+
+    def match(self, cell_value, row_values, state):
+        if self.keep_blank and isBlank(cell_value) :
+            return False
+        return cell_value not in self.values
+
+
+class BeforeDate(DropRule):     # "before" - date is specified in yyyymmdd form.
+
+    def __init__(self, drop_key, drop_ix, parm_list):
+        super().__init__(drop_key, drop_ix, parm_list)
+        self.test_date = datetime.strptime(parm_list[2], "%Y%m%d")
+
+    def match(self, cell_value, row_values, state):
+        if isinstance(cell_value, datetime) :
+            return not cell_value < self.test_date
+        return False
+
+
+#   LocationTable - Percentage lookup for Co-Location or My Location values.  Built once from the Control File parameters, so that each row is an O(1) lookup.
+#   Exact values are matched first, then (with no_case) values regardless of case, then wild card values.  As in the Control File, a value listed more than once takes the last percentage listed.
+class LocationTable:
+
+    def __init__(self, no_case):
+        self.no_case = no_case
+        self.exact = {}
+        self.folded = {}
+        self.patterns = []
+        self.found = {}     # Results of earlier lookups, by cell value.
+
+    def add(self, location, pct):
+        if "*" in location or "?" in location :
+            flags = re.IGNORECASE if self.no_case else 0
+            self.patterns.append((re.compile(fnmatch.translate(location), flags), pct))
+        else :
+            self.exact[location] = pct
+            if self.no_case :
+                self.folded[location.lower()] = pct
+
+    #   lookup() - Return the percentage for the location, or -1 if not found.
+    def lookup(self, location):
+        if location in self.found :
+            return self.found[location]
+        pct = self.exact.get(location, -1)
+        if pct < 0 and isinstance(location, str) :
+            if self.no_case :
+                pct = self.folded.get(location.lower(), -1)
+            if pct < 0 :
+                for pattern, pattern_pct in self.patterns :
+                    if pattern.match(location) :
+                        pct = pattern_pct
+        self.found[location] = pct
+        return pct
+
+
+class LocationRule(DropRule):   # "location" - arguments are the Co-Location and My Location parameter lists, and optional "nocase".
+
+    def __init__(self, drop_key, drop_ix, parm_list):
+        super().__init__(drop_key, drop_ix, parm_list)
+        self.coloc_key = parm_list[2]
+        self.myloc_key = parm_list[3]
+        self.no_case = "nocase" in parm_list[4:]
+        self.ix_colocat = -1
+        self.ix_mylocat = -1
+        self.coloc_table = LocationTable(self.no_case)
+        self.myloc_table = LocationTable(self.no_case)
+        self.blank_count = 0    # Count of rows with blank My Location.
+        self.unmatched = {}     # Values not found in the tables - (parameter name, value) : count of rows.  Reported once per value, at the end of the run.
+
+    #   loadTables() - Build the percentage tables from the Control File.  Returns a list of error messages.
+    #       <co-location list> loc1 loc2 ...        with       loc1 <percentage> <Co-Location value>
+    #       <my location list> loc1 loc2 ...        with       loc1 <percentage> <My Location value 1> <My Location value 2> ...
+    def loadTables(self, parms_dict, control_name):
+        errors = []
+        for list_key, table, first_only in ((self.coloc_key, self.coloc_table, True), (self.myloc_key, self.myloc_table, False)) :
+            if list_key not in parms_dict :
+                errors.append(f"\"{list_key}\" parameter listed in \"{self.drop_key}\" but is not specified in {control_name}.")
+                continue
+            for loc_key in parms_dict[list_key] :
+                if loc_key not in parms_dict or len(parms_dict[loc_key]) < 2 :
+                    errors.append(f"\"{loc_key}\" parameter listed in \"{list_key}\" should be: {loc_key} <percentage> <location> ...")
+                    continue
+                try :
+                    loc_pct = int(parms_dict[loc_key][0])
+                except ValueError :
+                    errors.append(f"First element in \"{loc_key}\" parameter list is \"{parms_dict[loc_key][0]}\" but was expecting an integer value.")
+                    continue
+                if first_only :
+                    table.add(parms_dict[loc_key][1], loc_pct)
+                else :
+                    for location in parms_dict[loc_key][1:] :
+                        table.add(location, loc_pct)
+        return errors
+
+    def noteUnmatched(self, list_key, location):
+        unmatched_key = (list_key, location)
+        self.unmatched[unmatched_key] = self.unmatched.get(unmatched_key, 0) + 1
+
+    def match(self, cell_value, row_values, state):
+        co_location = row_values[self.ix_colocat]
+        my_location = row_values[self.ix_mylocat]
+        if my_location is None or my_location == "" :
+            self.blank_count += 1
+            return False
+
+        coloc_pct = self.coloc_table.lookup(co_location)
+        if coloc_pct < 0 :
+            self.noteUnmatched(self.coloc_key, co_location)
+        myloc_pct = self.myloc_table.lookup(my_location)
+        if myloc_pct < 0 :
+            self.noteUnmatched(self.myloc_key, my_location)
+
+        return myloc_pct < coloc_pct
+
+
+class FilterRule(DropRule):     # "filter" - never drops a row, but sets My Filter to the first listed value found in the cell.
+
+    def __init__(self, drop_key, drop_ix, parm_list):
+        super().__init__(drop_key, drop_ix, parm_list)
+        self.filter_values = tuple(parm_list[2:])
+        self.matcher = MultiMatch(self.filter_values)
+
+    def match(self, cell_value, row_values, state):
+        if state.found_filter or isBlank(cell_value) :
+            return False    # Bypass this test if My Filter has already been set for this row.
+        filter_ix = self.matcher.firstListed(lowerText(cell_value))
+        if filter_ix > -1 :
+            state.my_filter = self.filter_values[filter_ix]
+            state.found_filter = True
+        return False
+
+
+class NoFilterRule(DropRule):   # "nofilter" - should follow any of the "filter" conditions in the "droprows" list.
+
+    def match(self, cell_value, row_values, state):
+        return not state.found_filter
+
+
+class DropInclRule(DropRule):   # "dropincl"
+
+    def __init__(self, drop_key, drop_ix, parm_list):
+        super().__init__(drop_key, drop_ix, parm_list)
+        self.matcher = MultiMatch(parm_list[2:])
+
+    def match(self, cell_value, row_values, state):
+        if state.found_filter or isBlank(cell_value) :
+            return False    # Bypass this test if My Filter has already been set for this row.
+        return self.matcher.anyFound(lowerText(cell_value))
+
+
+rule_classes = {
+    "drop"    : DropValues,
+    "dropbl"  : DropValues,
+    "keep"    : KeepValues,
+    "keepbl"  : KeepValues,
+    "before"  : BeforeDate,
+    "location": LocationRule,
+    "filter"  : FilterRule,
+    "nofilter": NoFilterRule,
+    "dropincl": DropInclRule,
+}
+
+
+#   DropPlan - The compiled "droprows" conditions, in the order listed in the Control File.
+#   Any problems found while compiling are collected in the errors list (fatal) and warnings list, so that the calling script can report them - and terminate before reading the worksheet.
+class DropPlan:
+
+    def __init__(self, parms_dict, control_name="Control File"):
+        self.rules = []
+        self.errors = []
+        self.warnings = []
+        self.timed = False      # If True, dropThisRow() keeps the count of rows tested and the time spent for each condition.
+
+        if 'droprows' not in parms_dict :
+            self.errors.append(f"\"droprows\" parameter missing from {control_name}.")
+            return
+
+        seen_keys = set()
+        for drop_ix, drop_key in enumerate(parms_dict['droprows']) :
+            if drop_key in seen_keys :
+                continue
+            seen_keys.add(drop_key)
+            rule = self.compileRule(parms_dict, drop_key, drop_ix, control_name)
+            if rule is not None :
+                self.rules.append(rule)
+
+    def compileRule(self, parms_dict, drop_key, drop_ix, control_name):
+        if drop_key not in parms_dict :
+            self.errors.append(f"\"{drop_key}\" parameter listed in \"droprows\" but is not specified in {control_name}.")
+            return None
+        parm_list = parms_dict[drop_key]
+        if len(parm_list) < 2 :
+            self.errors.append(f"\"{drop_key}\" parameter should have at least two arguments: <column header> <condition type> ...")
+            return None
+
+        drop_type = parm_list[1]
+        if drop_type == "location" and len(parm_list) < 4 :
+            self.errors.append(f"\"{drop_key}\" parameter should be: {drop_key} <column header> location <co-location list> <my location list>")
+            return None
+        if drop_type == "before" and len(parm_list) < 3 :
+            self.errors.append(f"\"{drop_key}\" parameter should be: {drop_key} <column header> before <yyyymmdd>")
+            return None
+
+        if drop_type not in rule_classes :
+            self.warnings.append(f"\"{drop_type}\" condition type in \"{drop_key}\" parameter not understood.  Condition will not drop any rows.")
+            return DropRule(drop_key, drop_ix, parm_list)
+        try :
+            rule = rule_classes[drop_type](drop_key, drop_ix, parm_list)
+        except ValueError :
+            self.errors.append(f"Expected a date in yyyymmdd form in \"{drop_key}\" parameter, but found \"{parm_list[2]}\".")
+            return None
+        if isinstance(rule, LocationRule) :
+            self.errors.extend(rule.loadTables(parms_dict, control_name))
+        return rule
+
+    #   columnCheck() - Test if column header matches any of the conditions.  Returns list of the matching rules.
+    #   Possible for some columns to be identified individually (in the calling script) and also in the "droprows" parameter.
+    def columnCheck(self, header_text, col_ix):
+        matched_rules = []
+        for rule in self.rules :
+            if rule.col_header == header_text :
+                rule.col_ix = col_ix
+                matched_rules.append(rule)
+        return matched_rules
+
+    #   bumpColumns() - If inserting a column, make sure all column indexes greater than the insert column are incremented.
+    def bumpColumns(self, bump_ix):
+        for rule in self.rules :
+            if bump_ix <= rule.col_ix :
+                rule.col_ix += 1
+
+    def locationRules(self):
+        return [rule for rule in self.rules if isinstance(rule, LocationRule)]
+
+    #   dropThisRow() - Test the row values against each condition, in order.  Returns the rule that dropped the row - or None if the row is kept.
+    def dropThisRow(self, row_values, state):
+        if self.timed :
+            return self.dropThisRowTimed(row_values, state)
+        for rule in self.rules :
+            if rule.col_ix > -1 :
+                if rule.match(row_values[rule.col_ix], row_values, state) :
+                    rule.count += 1
+                    return rule
+        return None
+
+    def dropThisRowTimed(self, row_values, state):
+        perf_counter = time.perf_counter
+        for rule in self.rules :
+            if rule.col_ix > -1 :
+                test_start = perf_counter()
+                drop_row = rule.match(row_values[rule.col_ix], row_values, state)
+                rule.seconds += perf_counter() - test_start
+                rule.tested += 1
+                if drop_row :
+                    rule.count += 1
+                    return rule
+        return None
+
+
+#   RowDecider - Decide, for each row of the Roles Worksheet, whether the row is dropped and what is written to the My Action and My Filter columns.
+#   Holds everything needed to decide a row (the compiled plan, Request ID column and Action File entries) - so that it can also be passed to worker processes (see RowWorkers.py).
+class RowDecider:
+
+    def __init__(self, drop_plan, ix_request, action_dict, do_actual_delete):
+        self.drop_plan = drop_plan
+        self.ix_request = ix_request
+        self.action_dict = action_dict
+        self.do_actual_delete = do_actual_delete
+        self.count_match = 0
+        self.count_nomat = 0
+        self.count_nofilter = 0
+        self.count_delet = 0
+
+    #   decideRow() - Test the row values against the "droprows" conditions, and match the Request ID against the Action File.
+    #   Returns (drop_row, my_action, my_filter).  drop_row is True if the row should be deleted.  my_action and my_filter are None if there is no value to write to the row.
+    def decideRow(self, row_values):
+        this_request_value = row_values[self.ix_request]
+        if isinstance(this_request_value, str) :
+            this_request_id = int(this_request_value)
+        else :
+            this_request_id = this_request_value
+
+        row_state = RowState()
+        drop_row = False
+        my_action = None
+        increment_blank = 0
+        if self.drop_plan.dropThisRow(row_values, row_state) is not None :
+            self.count_delet += 1
+            if self.do_actual_delete :
+                drop_row = True
+            else :
+                row_state.my_filter = "DELETE"
+                row_state.found_filter = True
+        elif this_request_id in self.action_dict :
+            self.count_match += 1
+            my_action = self.action_dict[this_request_id]
+            increment_blank = 1
+        else :
+            self.count_nomat += 1
+            increment_blank = 1
+
+        if row_state.found_filter :
+            return drop_row, my_action, row_state.my_filter
+        self.count_nofilter += increment_blank
+        return drop_row, my_action, None
+
+    #   resetCounts(), takeCounts() and addCounts() - Used to merge the tallies from worker processes back into the main process.
+    def resetCounts(self):
+        self.count_match = 0
+        self.count_nomat = 0
+        self.count_nofilter = 0
+        self.count_delet = 0
+        for rule in self.drop_plan.rules :
+            rule.count = 0
+            rule.tested = 0
+            rule.seconds = 0.0
+            if isinstance(rule, LocationRule) :
+                rule.blank_count = 0
+                rule.unmatched = {}
+
+    def takeCounts(self):
+        rule_counts = []
+        for rule in self.drop_plan.rules :
+            if isinstance(rule, LocationRule) :
+                rule_counts.append((rule.count, rule.tested, rule.seconds, rule.blank_count, rule.unmatched))
+            else :
+                rule_counts.append((rule.count, rule.tested, rule.seconds, 0, None))
+        return (self.count_match, self.count_nomat, self.count_nofilter, self.count_delet, rule_counts)
+
+    def addCounts(self, counts):
+        count_match, count_nomat, count_nofilter, count_delet, rule_counts = counts
+        self.count_match += count_match
+        self.count_nomat += count_nomat
+        self.count_nofilter += count_nofilter
+        self.count_delet += count_delet
+        for rule, (rule_count, tested, seconds, blank_count, unmatched) in zip(self.drop_plan.rules, rule_counts) :
+            rule.count += rule_count
+            rule.tested += tested
+            rule.seconds += seconds
+            if unmatched is not None :
+                rule.blank_count += blank_count
+                for unmatched_key, row_count in unmatched.items() :
+                    rule.unmatched[unmatched_key] = rule.unmatched.get(unmatched_key, 0) + row_count
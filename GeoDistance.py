@@ -0,0 +1,143 @@
+# GeoDistance.py - Distance (in miles) from the home office to a Project Location, from a table of place coordinates - no network access needed.  Used by MyLocation.py.
+
+# The place table is a CSV file with a header row and the columns:  place, state, latitude, longitude
+#   place     - City name ("Arlington"), or a 5-digit ZIP code (with state left blank).
+#   state     - 2-letter state abbreviation.
+#   latitude, longitude - Decimal degrees.
+# USPlaces.csv (next to this script) lists the state capitals, the larger cities, and the government sites around Washington, DC.  A larger table - for example,
+# built from the US Census Gazetteer files - can be used in its place ("geotable <path>" in the MyLocation.py Control File).
+#
+# Places are matched by their normalized "city st" form (see LocationIndex.normalizeLocation), so "Arlington, VA" and "arlington va" are the same place.
+# The coordinates are kept in two arrays (one entry per place), and the distances for a list of places are computed together - with numpy, if it is installed.
+
+import csv
+import math
+import bisect
+from array import array
+from pathlib import Path
+import LocationIndex
+
+try:
+    import numpy as np
+    have_numpy = True
+except ModuleNotFoundError:
+    have_numpy = False
+
+earth_radius_miles = 3958.8
+default_table = str(Path(__file__).resolve().parent / "USPlaces.csv")
+
+# Column headers accepted for each column of the place table (lower case).
+place_columns = {"place": ("place", "city", "name", "zip", "zipcode"), "state": ("state", "st", "usps"),
+                 "latitude": ("latitude", "lat", "intptlat"), "longitude": ("longitude", "lon", "lng", "long", "intptlong")}
+
+
+#   zipKey() - "zip nnnnn" key for a ZIP code value (int or 5-digit string).  None if the value is not a ZIP code.
+def zipKey(location) :
+    if isinstance(location, int) and 0 < location < 100000 :
+        return f"zip {location:05d}"
+    if isinstance(location, str) and len(location.strip()) == 5 and location.strip().isdigit() :
+        return "zip " + location.strip()
+    return None
+
+
+class GeoTable:
+
+    def __init__(self, table_path=default_table):
+        self.table_path = table_path
+        self.place_ix = {}              # Normalized "city st" (or "zip nnnnn"): index into latitudes and longitudes.
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.error = None
+
+    #   load() - Read the place table.  Returns True if successful, otherwise sets self.error.
+    def load(self):
+        try:
+            with open(self.table_path, newline="", encoding="utf-8-sig") as table_file :
+                table_reader = csv.reader(table_file)
+                header = [column_title.strip().lower() for column_title in next(table_reader, [])]
+                column_ix = {}
+                for column_name, column_titles in place_columns.items() :
+                    for column_title in column_titles :
+                        if column_title in header :
+                            column_ix[column_name] = header.index(column_title)
+                            break
+                for column_name in ("place", "latitude", "longitude") :
+                    if column_name not in column_ix :
+                        self.error = f"Did not find a \"{column_name}\" column in {self.table_path}."
+                        return False
+
+                for table_row in table_reader :
+                    try:
+                        place = table_row[column_ix['place']].strip()
+                        latitude = float(table_row[column_ix['latitude']])
+                        longitude = float(table_row[column_ix['longitude']])
+                    except (IndexError, ValueError):
+                        continue    # Blank or malformed row.
+                    state = ""
+                    if "state" in column_ix and column_ix['state'] < len(table_row) :
+                        state = table_row[column_ix['state']].strip()
+                    place_key = zipKey(place)
+                    if place_key is None :
+                        place_key = LocationIndex.normalizeLocation(place + " " + state)
+                    if place_key in self.place_ix :
+                        continue    # The first listed is used.
+                    self.place_ix[place_key] = len(self.latitudes)
+                    self.latitudes.append(latitude)
+                    self.longitudes.append(longitude)
+        except OSError as err:
+            self.error = f"Could not read the place table {self.table_path}: {err}"
+            return False
+        return True
+
+    #   locate() - Index of the place in the table, or -1 if not listed.
+    def locate(self, location):
+        place_key = zipKey(location)
+        if place_key is None :
+            place_key = LocationIndex.normalizeLocation(location)
+        return self.place_ix.get(place_key, -1)
+
+    #   distances() - Great-circle (haversine) distance, in miles, from (home_latitude, home_longitude) to each of the places (list of indexes).
+    def distances(self, place_ixs, home_latitude, home_longitude):
+        if len(place_ixs) == 0 :
+            return []
+        if have_numpy :
+            place_ixs = np.asarray(place_ixs, dtype=np.intp)
+            latitudes = np.radians(np.frombuffer(self.latitudes, dtype=np.float64)[place_ixs])
+            longitudes = np.radians(np.frombuffer(self.longitudes, dtype=np.float64)[place_ixs])
+            home_latitude, home_longitude = math.radians(home_latitude), math.radians(home_longitude)
+            haversine = (np.sin((latitudes - home_latitude) / 2) ** 2
+                         + math.cos(home_latitude) * np.cos(latitudes) * np.sin((longitudes - home_longitude) / 2) ** 2)
+            return (2 * earth_radius_miles * np.arcsin(np.sqrt(np.minimum(haversine, 1.0)))).tolist()
+        return [haversineMiles(self.latitudes[place_ix], self.longitudes[place_ix], home_latitude, home_longitude) for place_ix in place_ixs]
+
+
+def haversineMiles(latitude, longitude, home_latitude, home_longitude) :
+    latitude, longitude, home_latitude, home_longitude = map(math.radians, (latitude, longitude, home_latitude, home_longitude))
+    haversine = math.sin((latitude - home_latitude) / 2) ** 2 + math.cos(home_latitude) * math.cos(latitude) * math.sin((longitude - home_longitude) / 2) ** 2
+    return 2 * earth_radius_miles * math.asin(math.sqrt(min(haversine, 1.0)))
+
+
+#   parseBands() - Distance bands from the "geobands" Control File parameter:  <miles> <label> <miles> <label> ... <label beyond the last distance>
+#   Returns (list of distance limits, list of labels - one more than the limits), or None if the list is not in that form (or the distances are not increasing).
+def parseBands(band_list) :
+    if len(band_list) < 1 or len(band_list) % 2 == 0 :
+        return None
+    band_limits = []
+    band_labels = []
+    for band_ix in range(0, len(band_list) - 1, 2) :
+        try:
+            band_limit = float(band_list[band_ix])
+        except ValueError:
+            return None
+        if len(band_limits) > 0 and band_limit <= band_limits[-1] :
+            return None
+        band_limits.append(band_limit)
+        band_labels.append(band_list[band_ix + 1])
+    band_labels.append(band_list[-1])
+    return band_limits, band_labels
+
+#   distanceBands() - Band label for each distance.  A distance equal to a limit is in the nearer band.
+def distanceBands(distances, band_limits, band_labels) :
+    if have_numpy and len(distances) > 0 :
+        return [band_labels[band_ix] for band_ix in np.searchsorted(np.asarray(band_limits), np.asarray(distances), side="left")]
+    return [band_labels[bisect.bisect_left(band_limits, distance)] for distance in distances]
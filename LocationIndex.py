@@ -0,0 +1,141 @@
+# LocationIndex.py - Look up a Project Location in the Location Worksheet values, allowing for differences in case, punctuation, spacing, and state names.  Used by MyLocation.py.
+
+# Each value is looked up in three steps - the first one found is used:
+#   exact      - The value as listed in the Location Worksheet.
+#   normalized - Lower case, punctuation and extra spaces removed, and a trailing state name replaced by its abbreviation (a trailing country name is dropped).
+#                "Arlington, VA", "Arlington VA", "arlington, va ", and "Arlington, Virginia" all normalize to "arlington va".
+#   fuzzy      - Closest normalized Location Worksheet value, if it is at least as similar as the threshold (0 - 1; "locatfuzzy <threshold>" in the MyLocation.py Control File).
+#                Candidates are taken from an index of the three-character pieces (trigrams) of the normalized values, and then scored with difflib.
+#                Both values must name the same state (if both name one) - so "Arlington TX" is never matched to "Arlington VA".
+#
+# The fuzzy matches are listed in the output message file, so that they can be checked - and added to the Location Worksheet.
+
+import re
+import difflib
+
+fuzzy_threshold = 0.88      # Default similarity needed for a fuzzy match.
+fuzzy_candidates = 8        # Number of trigram candidates scored with difflib.
+
+state_abbreviations = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca", "colorado": "co", "connecticut": "ct", "delaware": "de",
+    "district of columbia": "dc", "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il", "indiana": "in", "iowa": "ia",
+    "kansas": "ks", "kentucky": "ky", "louisiana": "la", "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv", "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm",
+    "new york": "ny", "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or", "pennsylvania": "pa", "puerto rico": "pr",
+    "rhode island": "ri", "south carolina": "sc", "south dakota": "sd", "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va",
+    "washington": "wa", "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+}
+state_codes = set(state_abbreviations.values())
+state_names = {tuple(state_name.split()): state_code for state_name, state_code in state_abbreviations.items()}
+country_names = [("united", "states", "of", "america"), ("united", "states"), ("usa",), ("us",)]
+
+remove_pattern = re.compile(r"[.']")            # Removed - so "D.C." becomes "dc".
+space_pattern  = re.compile(r"[^0-9a-z]+")      # Any other punctuation (and spaces) separate words.
+
+
+#   normalizeLocation() - Normalized form of a location value.  Values that are not strings are returned unchanged.
+def normalizeLocation(location) :
+    if not isinstance(location, str) :
+        return location
+    words = space_pattern.sub(" ", remove_pattern.sub("", location.lower())).split()
+    for country_words in country_names :
+        if len(words) > len(country_words) and tuple(words[-len(country_words):]) == country_words :
+            words = words[:-len(country_words)]
+            break
+    for name_length in (3, 2, 1) :       # Longest state name first ("west virginia" before "virginia").
+        if len(words) > name_length and tuple(words[-name_length:]) in state_names :
+            words = words[:-name_length] + [state_names[tuple(words[-name_length:])]]
+            break
+    return " ".join(words)
+
+def stateCode(normalized) :
+    if isinstance(normalized, str) and len(normalized) > 3 and normalized[-3] == " " and normalized[-2:] in state_codes :
+        return normalized[-2:]
+    return None
+
+def trigrams(normalized) :
+    padded = " " + normalized + " "
+    return {padded[ix:ix + 3] for ix in range(len(padded) - 2)}
+
+
+class LocationIndex:
+
+    def __init__(self, locats_dict, threshold=fuzzy_threshold):
+        self.locats_dict = locats_dict
+        self.threshold = threshold          # None - no fuzzy matching.
+        self.normalized_dict = {}           # Normalized value: (Location Worksheet value, My Location value)
+        self.conflicts = []                 # (Location Worksheet value, Location Worksheet value) - same normalized form, different My Location values.  The first is used.
+        self.fuzzy_matches = {}             # Project Location: (Location Worksheet value, similarity)
+        self.lookups = {}                   # Project Location: (My Location value, match type) - so that each value is looked up only once.
+        self.match_counts = {"exact": 0, "normalized": 0, "fuzzy": 0, "unknown": 0}     # Distinct Project Location values, by match type.
+
+        for locat_key, locat_value in locats_dict.items() :
+            normalized = normalizeLocation(locat_key)
+            if normalized in self.normalized_dict :
+                if self.normalized_dict[normalized][1] != locat_value :
+                    self.conflicts.append((self.normalized_dict[normalized][0], locat_key))
+                continue
+            self.normalized_dict[normalized] = (locat_key, locat_value)
+
+        self.gram_index = {}                # Trigram: list of normalized values
+        self.gram_counts = {}               # Normalized value: number of trigrams
+        if self.threshold is not None :
+            for normalized in self.normalized_dict :
+                if not isinstance(normalized, str) :
+                    continue
+                normalized_grams = trigrams(normalized)
+                self.gram_counts[normalized] = len(normalized_grams)
+                for gram in normalized_grams :
+                    self.gram_index.setdefault(gram, []).append(normalized)
+
+    #   lookup() - Returns (My Location value, match type), or (None, "unknown") if not found.
+    def lookup(self, location):
+        if location in self.lookups :
+            return self.lookups[location]
+        if location in self.locats_dict :
+            result = (self.locats_dict[location], "exact")
+        else :
+            result = (None, "unknown")
+            normalized = normalizeLocation(location)
+            if normalized in self.normalized_dict :
+                result = (self.normalized_dict[normalized][1], "normalized")
+            elif self.threshold is not None and isinstance(normalized, str) and normalized != "" :
+                fuzzy_key, similarity = self.fuzzyMatch(normalized)
+                if fuzzy_key is not None :
+                    locat_key, locat_value = self.normalized_dict[fuzzy_key]
+                    self.fuzzy_matches[location] = (locat_key, similarity)
+                    result = (locat_value, "fuzzy")
+        self.match_counts[result[1]] += 1
+        self.lookups[location] = result
+        return result
+
+    #   fuzzyMatch() - The most similar normalized value (and its similarity), if at least the threshold.  Otherwise (None, 0).
+    def fuzzyMatch(self, normalized):
+        query_grams = trigrams(normalized)
+        shared_counts = {}
+        for gram in query_grams :
+            for candidate in self.gram_index.get(gram, ()) :
+                shared_counts[candidate] = shared_counts.get(candidate, 0) + 1
+
+        # Dice coefficient of the trigrams - a quick first cut, before the (slower) difflib score.
+        scored = []
+        for candidate, shared_count in shared_counts.items() :
+            scored.append((2 * shared_count / (len(query_grams) + self.gram_counts[candidate]), candidate))
+        scored.sort(reverse=True)
+
+        query_state = stateCode(normalized)
+        best_key, best_similarity = None, 0
+        sequence_matcher = difflib.SequenceMatcher(None, normalized)
+        for dice, candidate in scored[:fuzzy_candidates] :
+            if dice < self.threshold / 2 :      # Too few trigrams in common to reach the threshold.  (Sorted - so the rest are no closer.)
+                break
+            candidate_state = stateCode(candidate)
+            if query_state is not None and candidate_state is not None and query_state != candidate_state :
+                continue
+            sequence_matcher.set_seq2(candidate)
+            if sequence_matcher.quick_ratio() < self.threshold :    # Upper bound of ratio() - much quicker.
+                continue
+            similarity = sequence_matcher.ratio()
+            if similarity >= self.threshold and similarity > best_similarity :
+                best_key, best_similarity = candidate, similarity
+        return best_key, round(best_similarity, 3)
@@ -3,15 +3,19 @@
 # This is used if the subject (Mario) does not mainitain his own Action File. 
 
 # Suggested Enhancements:
-#   Add routine to verify all required parameters are specified in the control file. (Pass list to ReadControl, with number of required parameters for each.)
 #   Add processing for skip_to_header parmeter (as in MySource.py).
 #   Provide graceful exit if worksheet is open in Excel session.
 
 import sys
 import shlex
+import hashlib
 from pathlib import Path
 from datetime import datetime
 import ReadControl
+import ActionStore
+import RunStats
+import RoleReader
+import CacheFile
 
 arguments = sys.argv[0:]  # List of all arguments.  arguments[0] = <script name>  arguments[1] = <Control File name>   arguments[2] = <Prior Open Roles worksheet file name>
 now_time = datetime.now()
@@ -32,7 +36,7 @@ if not worksheet_path.is_file():
     sys.exit(1)
 
 # Read parameter file and load values into a dictionary object.
-err_code, parms_dict = ReadControl.read(arguments[1], True)
+err_code, parms_dict = ReadControl.read(arguments[1], True, ReadControl.script_schemas["Mario.py"])
 if err_code > 0 :
     print("Terminating process.")
     sys.exit(1)
@@ -60,6 +64,12 @@ mssg_file_path = parms_dict['messagdir'][0] + "\\Mario.mssg"  # Message Director
 MessageOut(start_message)
 MessageOut(" ")
 
+# Phase timing and counters - written to the end of the output message file (see RunStats.py).  "prompts" is the time spent at the prompts.
+run_stats = RunStats.RunStats("Mario.py")
+if "runstats" in parms_dict and len(parms_dict['runstats']) > 0 and parms_dict['runstats'][0] == "False" :
+    run_stats.enabled = False
+run_stats.phase("control")
+
 # print("Python executable: ", sys.executable)
 try:
     import pandas as pd
@@ -74,6 +84,8 @@ except ModuleNotFoundError:
     
 try:
     from openpyxl import load_workbook
+    from openpyxl.styles import NamedStyle
+    from openpyxl.cell import WriteOnlyCell
 except ModuleNotFoundError:
     MessageShow("openpyxl not found!")
     MessageShow("Make sure that you run " + arguments[0] + " in a virtual environment that is activated and has openpyxl installed.")
@@ -140,36 +152,142 @@ for ctrl_row in controlsheet.iter_rows(min_row=2, max_row=controlsheet.max_row,
 #
 #
 # Read Action File and process.
-actionfile_path = parms_dict['actionsheet'][0] 
-MessageShow("Reading " + actionfile_path)
-try:
-    actbook  = load_workbook(actionfile_path)
-    actsheet = actbook.active  # Get the active (only) worksheet.
-    actsheet_name = actbook.sheetnames[0]
-except FileNotFoundError:
-    MessageShow(f"File {actionfile_path} not found.")
-except Exception as err:
-    MessageShow(f"Could not open the file: {err}")
+run_stats.phase("actions")
+# If "actionstore <database path>" is specified in the Control File, the new rows are added to the SQLite action store (see ActionStore.py) instead of the Action File.
+sql_store = None
+if "actionstore" in parms_dict and len(parms_dict['actionstore']) > 0 :
+    actionfile_path = parms_dict['actionstore'][0]
+    MessageShow("Reading " + actionfile_path)
+    sql_store = ActionStore.SqlActionStore(actionfile_path)
+    if not sql_store.open() or len(sql_store.header) == 0 :
+        if sql_store.error is None :
+            sql_store.error = f"No Action rows in {actionfile_path}.  (Use ActionSync.py to import the Action worksheet.)"
+        MessageShow(sql_store.error)
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+    actsheet_name = sql_store.sheet_title if sql_store.sheet_title else actionfile_path
+    action_header_row = sql_store.header
+else :
+    actionfile_path = parms_dict['actionsheet'][0] 
+    MessageShow("Reading " + actionfile_path)
+    try:
+        actbook  = load_workbook(actionfile_path, read_only=True)     # Only the header row and the key column are read here.  Reopened for writing only if there are rows to add.
+        actsheet = actbook.active  # Get the active (only) worksheet.
+        actsheet_name = actbook.sheetnames[0]
+    except FileNotFoundError:
+        MessageShow(f"File {actionfile_path} not found.")
+    except Exception as err:
+        MessageShow(f"Could not open the file: {err}")
+    action_header_row = list(next(actsheet.iter_rows(min_row=1, max_row=1, values_only=True), ()))
     
 #   Find column headers in Action File (worksheet).  Headers should be in the first row.  Save column indexes into action_headers dictionary.
 action_headers = {}
 max_action_col_ix = -1
-for idx, cell in enumerate(actsheet[1]):
-    if cell.value is not None :
-        col_header = cell.value.strip() 
+for idx, header_value in enumerate(action_header_row):
+    if header_value is not None :
+        col_header = header_value.strip() 
         action_headers[col_header] = idx
         max_action_col_ix = idx
  
 #
 #
 #   Process Source Worksheet
+#   The Source Worksheet is read in streaming (read-only) mode, and only the columns named in the Control Worksheet are taken from the rows - see source_ixs, below.
+#   "fastread True" in the Control File - read it with RoleReader.py instead (values only, and a converted copy is kept next to the workbook - see RoleReader.py).
+#   A CSV or Parquet file (see RoleReader.py) is always read by RoleReader.py.
+run_stats.phase("load")
 workbook_path = parms_dict['inputdir'][0] + "\\" + arguments[2]
 MessageShow("Reading " + workbook_path)
+fast_read = False
+if "fastread" in parms_dict and len(parms_dict['fastread']) > 0 :
+    if parms_dict['fastread'][0] == "True" :
+        fast_read = True
+if workbook_path.lower().endswith((".csv", ".parquet")) :
+    fast_read = True
+
+#   readSheetRows() - Rows of the worksheet (openpyxl, read-only) from min_row to max_row, as tuples of values - only the columns in col_ixs, if given.  (As RoleReader.RoleTable.rows.)
+#   With col_ixs, openpyxl is asked only for the cells from the first to the last of those columns (min_col, max_col).
+def readSheetRows(min_row=1, max_row=None, col_ixs=None) :
+    global worksheet
+    if col_ixs is None or len(col_ixs) == 0 :
+        for row_values in worksheet.iter_rows(min_row=min_row, max_row=max_row, values_only=True) :
+            yield row_values if col_ixs is None else ()
+        return
+    min_col_ix = min(col_ixs)
+    row_positions = [col_ix - min_col_ix for col_ix in col_ixs]
+    for row_values in worksheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col_ix + 1, max_col=max(col_ixs) + 1, values_only=True) :
+        yield tuple(row_values[row_pos] if row_pos < len(row_values) else None for row_pos in row_positions)
+
+#   State file (<source workbook>.state) - so that a re-run only does the work for what has changed.  Holds a hash of the source values (the move_list columns) of each
+#   Request ID, and the modification times and sizes of the source workbook and the Action File when it was last imported.  On the next run:
+#     - If neither the source workbook nor the Action File has changed since, there is nothing to do.
+#     - Otherwise, a Request ID with the same hash as before is unchanged - skipped.  A Request ID already in the Action File, with a different hash, is changed - its Action
+#       row is updated in place (for example, a new My Action value).  A Request ID not in the Action File is new - added, as before.
+#       The "split" columns of a changed row are updated only if the new source cell has both an action and a date - a blank or unexpected value does not replace the
+#       recorded action with the default action and date.
+#   (The file stamps take the place of a "last processed position":  rows can be added, removed, or sorted anywhere in the source workbook between imports.)
+#   The state file is written only after the Action File is saved.  It is ignored if the Control Worksheet columns or the Action File differ from the last import.
+#   Specify "incremental False" in the Control File to ignore (and not write) the state file.
+state_version = 2
+use_state = True
+if "incremental" in parms_dict and len(parms_dict['incremental']) > 0 :
+    if parms_dict['incremental'][0] == "False" :
+        use_state = False
+state_path = workbook_path + ".state"
+state_key = (actionfile_path, parms_dict['key_column'][0], tuple((ctrl_target.value, ctrl_value[0].value, ctrl_value[1].value, ctrl_value[2].value) for ctrl_target, ctrl_value in ctrl_dict.items()))
+
+#   fileStamps() - (modification time, size) of the source workbook and of the Action File - None if either is not found.
+def fileStamps() :
+    global workbook_path, actionfile_path
+    try:
+        return (CacheFile.fileStamp(workbook_path), CacheFile.fileStamp(actionfile_path))
+    except OSError:
+        return None
+
+#   readState() - (file stamps, {Request ID: hash}) from the state file - or (None, {}) if there is none, or it is for different columns or Action File.
+def readState() :
+    global state_path, state_key, state_version
+    state_content = CacheFile.readPickle(state_path, version=state_version, key=state_key)
+    if state_content is None :
+        return None, {}
+    return state_content['stamp'], state_content['hashes']
+
+def writeState(row_hashes) :
+    global state_path, state_key, state_version
+    if not CacheFile.writePickle(state_path, {'version': state_version, 'key': state_key, 'stamp': fileStamps(), 'hashes': row_hashes}) :
+        MessageShow(f"Could not write the state file {state_path}.")
+
+def rowHash(row_values) :
+    return hashlib.blake2b(repr(row_values).encode(), digest_size=8).digest()
+
+prior_stamp, prior_hashes = readState() if use_state else (None, {})
+if prior_stamp is not None and fileStamps() == prior_stamp :
+    MessageShow(f"No changes in {workbook_path} since the last import ({len(prior_hashes)} Requests) - nothing to do.  (See {state_path}.)")
+    if sql_store is not None :
+        sql_store.close()
+    else :
+        actbook.close()
+    run_stats.endPhase()
+    run_stats.setRows(len(prior_hashes))
+    run_stats.count("rows_unchanged", len(prior_hashes))
+    run_stats.writeSection(MessageOut)
+    MessageClose()
+    sys.exit(0)
 
 try:
-    workbook  = load_workbook(workbook_path)
-    worksheet = workbook.active  # Get the active (only) worksheet.
-    worksheet_name = workbook.sheetnames[0]
+    if fast_read :
+        role_table = RoleReader.readRoles(workbook_path)
+        MessageOut(f"Read {role_table.row_count} rows ({role_table.source}).")
+        worksheet_name = role_table.title
+        source_row_count = role_table.row_count
+        readRows = role_table.rows
+    else :
+        workbook  = load_workbook(workbook_path, read_only=True)
+        worksheet = workbook.active  # Get the active (only) worksheet.
+        worksheet_name = workbook.sheetnames[0]
+        source_row_count = worksheet.max_row
+        readRows = readSheetRows
     MessageShow(f"Processing \"{worksheet_name}\" worksheet.")
 except FileNotFoundError:
     MessageShow(f"File {workbook_path} not found.")
@@ -203,21 +321,16 @@ if "skip_to_header" in parms_dict :
 role_headers = {}
 def findRoleHeaders(header_row) :
     global parms_dict, workbook_path, role_headers
-    for idx, cell in enumerate(header_row):
-        if cell.value is not None :
-            col_header = cell.value.strip() 
-            role_headers[col_header] = idx
+    role_headers = RoleReader.headerIndex(header_row)
             
 min_data_row = 1
-for row_ix, row in enumerate(worksheet.iter_rows(min_row=1, max_row=12, values_only=False), start=1) :
-    if not have_header_row :
-        if start_header_value == "" :
-            have_header_row = True  # "skip_to_header" parameter not specified in Control File - assume the first row of the worksheet is the header.
-        elif start_header_value == row[start_header_index].value :
-            have_header_row = True
-        if have_header_row :
-            findRoleHeaders(row)
-            min_data_row = row_ix + 1
+run_stats.phase("header scan")
+first_rows = list(readRows(min_row=1, max_row=RoleReader.header_search_rows))
+header_row_number = RoleReader.findHeaderRow(first_rows, start_header_value, start_header_index)    # No "skip_to_header" parameter - the first row.
+if header_row_number > 0 :
+    have_header_row = True
+    findRoleHeaders(first_rows[header_row_number - 1])
+    min_data_row = header_row_number + 1
 
 if not have_header_row :
     MessageShow(f"Unable to locate the header row in \"{worksheet_name}\" worksheet.  Searched first 12 rows for \"{start_header_value}\" in column {start_header_index}.")
@@ -259,19 +372,35 @@ if missing_required_header :
     MessageShow("Terminating process.")
     MessageClose()
     sys.exit(1)
+
+#   Only the source columns in move_list are read from the rows (source_ixs).  The source indexes in move_list, and source_key_ix, become positions in those rows.
+source_ixs = sorted({move_it[0] for move_it in move_list})
+source_pos = {source_ix: pos for pos, source_ix in enumerate(source_ixs)}
+move_list = [(source_pos[move_it[0]], move_it[1], move_it[2], move_it[3]) for move_it in move_list]
+source_key_ix = source_pos[source_key_ix]
     
    
 #   Build dictionary of Request IDs in current Action Worksheet.   This is needed for comparing - if the same Request ID shows up in the Source Worksheet.
 #
 #   Note: target_key_ix was derived earlier (when building move_list), from the 'key_column' parameter.
 action_requests = {} 
-for act_row in actsheet.iter_rows(min_row=2, max_row=actsheet.max_row, values_only=False) :
-    action_requests[act_row[target_key_ix].value] = act_row[0].row
+if sql_store is not None :
+    if sql_store.key_ix == target_key_ix :
+        action_requests = dict.fromkeys(sql_store.requestIds())    # From the Request ID index.
+    else :
+        sql_store.load()
+        for act_row in sql_store.rows :
+            action_requests[act_row[target_key_ix]] = None
+else :
+    for act_row_number, (act_key_value,) in enumerate(actsheet.iter_rows(min_row=2, min_col=target_key_ix + 1, max_col=target_key_ix + 1, values_only=True), start=2) :
+        action_requests[act_key_value] = act_row_number
+    actbook.close()
     
     
 #
 #   Pull in user input for default action and date.  This is used for roles (rows) that have no action/date specified in the source worksheet.
 
+run_stats.phase("prompts")
 default_action = input("What should be the default action value? ")
 if default_action == "" :
     MessageShow("Ending process.")
@@ -292,90 +421,133 @@ while not have_date :
         print(f"Error parsing date: {e}")
 
 #
-#   splitCell() - Source cell consists of action (string) and date in mm/dd/year form.  (Delimited by space.)  Split into action and date, and pass back one or the other.
-def splitCell(indicator, cell_content) :
-    global default_action, default_date, key_value_display
+#   splitAction() - Source cell consists of action (string) and date in mm/dd/year form.  (Delimited by space.)  Split into (action, date, parsed) - parsed is False
+#   if the default action or date was used.
+#   Each distinct cell value is split and parsed only once - the results are kept in split_cache.  (A historical worksheet repeats the same few hundred values.)
+#   An unexpected value is reported once, at its first row.
+split_cache = {}
+def splitAction(cell_content, value_display) :
+    global default_action, default_date, split_cache
+    if cell_content in split_cache :
+        return split_cache[cell_content]
     
-    if cell_content == None :
-        if indicator == "str" :
-            return default_action
-        else :
-            return default_date
+    split_result = (default_action, default_date, False)     # (action, date, True if both were in the cell)
+    if cell_content is not None :
+        cell_text = cell_content.strip()
+        split_list = cell_text.split()
+        if len(split_list) == 1 :     # Unexpected 
+            MessageShow(f"Unexpected Action/Date value, \"{cell_text}\" at {value_display}")
+            split_result = (cell_text, default_date, False)
+        elif len(split_list) > 1 :
+            
+#           Verify that the last part of the cell content is a valid date in mm/dd/year form.
+            try:
+                action_date = datetime.strptime(split_list[-1], "%m/%d/%Y")
+                date_ix = cell_text.find(split_list[-1])
+                split_result = (cell_text[0:date_ix].strip(), action_date, True)
+            except ValueError as e:
+                MessageShow(f"Unexpected Action/Date value, \"{cell_text}\" at {value_display}")
+                split_result = (cell_text, default_date, False)
+    split_cache[cell_content] = split_result
+    return split_result
 
-    cell_content = cell_content.strip()
-    split_list = cell_content.split()
+def intValue(copy_value, value_display) :
+    try :
+        return int(copy_value)
+    except (ValueError, TypeError) :
+        MessageShow(f"Unable to convert \"{copy_value}\" to int object at {value_display}")
+        return copy_value
 
-    split_len = len(split_list)
-    if split_len == 0 :
-        if indicator == "str" :
-            return default_action
-        else :
-            return default_date
-    if split_len == 1 :     # Unexpected 
-        MessageShow("Unexpected Action/Date value, \"{cell_content}\" at {key_value_display}")
-        if indicator == "str" :
-            return cell_content
+#   buildRows() - Build the new Action rows a column at a time:  for each entry of move_list, the values of its source column (for all of the new rows) are converted
+#   together, and set in the target column.  source_rows are the values of the new source rows; value_displays identify each row (for the messages).
+def buildRows(source_rows, value_displays) :
+    global move_list, max_action_col_ix
+    new_rows = [[""] * (max_action_col_ix + 1) for source_row in source_rows]
+    for source_ix, target_ix, type_code, process_code in move_list :
+        source_values = [source_row[source_ix] for source_row in source_rows]
+        if process_code.strip() == "copy" :
+            if type_code.strip() == "int" :
+                target_values = [intValue(copy_value, value_display) for copy_value, value_display in zip(source_values, value_displays)]
+            else :
+                target_values = source_values
+        elif process_code.strip() == "split" :
+            part_ix = 0 if type_code == "str" else 1
+            target_values = [splitAction(cell_content, value_display)[part_ix] for cell_content, value_display in zip(source_values, value_displays)]
         else :
-            return default_date
+            if len(source_rows) > 0 :
+                MessageShow(f"Unable to process \"{process_code.strip()}\" indicator.")
+            continue
+        for new_row, target_value in zip(new_rows, target_values) :
+            new_row[target_ix] = target_value
+    return new_rows
 
-    
-#   Verify that the last part of the cell content is a valid date in mm/dd/year form.
-    date_str = split_list[-1]
-    have_date = False
-    try:
-        action_date = datetime.strptime(date_str, "%m/%d/%Y")
-        have_date = True
-    except ValueError as e:
-        MessageShow("Unexpected Action/Date value, \"{cell_content}\" at {key_value_display}")
-        if indicator == "str" :
-            return cell_content
-        else :
-            return default_date
-           
-    if indicator == "date" :
-        return action_date
-    else :
-        date_ix = cell_content.find(split_list[-1])
-        return cell_content[0:date_ix].strip()
- 
-    
-show_process_warning = True
-def buildRow(w_row) :
-    global move_list, show_process_warning, key_value_display
-    
-    new_row = [""] * (max_action_col_ix + 1)
-    warning_shown = False 
-    for move_it in move_list :
-        if move_it[3].strip() == "copy" :
-            copy_value = w_row[move_it[0]].value
-            if move_it[2].strip() == "int" :
-                try :
-                    copy_value = int(copy_value)
-                except ValueError :
-                    MessageShow(f"Unable to convert \"{copy_value}\" to int object at {key_value_display}")
-                except TypeError :
-                    MessageShow(f"Unable to convert \"{copy_value}\" to int object at {key_value_display}")
-            new_row[move_it[1]] = copy_value
-        elif move_it[3].strip() == "split" :
-            new_row[move_it[1]] = splitCell(move_it[2], w_row[move_it[0]].value)
-        elif show_process_warning :
-            warning_shown = True
-            MessageShow("Unable to process \"{move_it[3].strip()}\" indicator.")
-    
-    if warning_shown :      # Show warning for any bad process code - but only on the first call to buildRow.
-        show_process_warning = False
-        
-    return new_row
+#   appendRows() - Append the new rows to the Action worksheet.  The cells of the "date" columns are added with a named style (mm/dd/yyyy) - registered in the workbook
+#   once - instead of looking up each new cell afterwards to set its number format.
+date_style_name = "Action Date"
+def dateColumns() :
+    global move_list, actbook
+    date_ixs = [target_ix for source_ix, target_ix, type_code, process_code in move_list if type_code.strip() == "date"]
+    if len(date_ixs) > 0 and date_style_name not in actbook.named_styles :
+        actbook.add_named_style(NamedStyle(name=date_style_name, number_format="mm/dd/yyyy"))
+    return date_ixs
+
+def appendRows(new_rows) :
+    global actsheet
+    date_ixs = dateColumns()
+    for new_row in new_rows :
+        for date_ix in date_ixs :
+            date_cell = WriteOnlyCell(actsheet, value=new_row[date_ix])
+            date_cell.style = date_style_name
+            new_row[date_ix] = date_cell
+        actsheet.append(new_row)
 
+#   changedValues() - The values to set in the Action rows of the changed Request IDs:  for each changed row, {target column index: value} - every move_list column but
+#   the key column.  The "split" columns are left out if the source cell is blank or not in "<action> mm/dd/yyyy" form - so the recorded action and date are kept,
+#   rather than replaced with the defaults.
+def changedValues(source_rows, changed_rows, value_displays) :
+    global move_list, target_key_ix
+    row_updates = []
+    for source_row, changed_row, value_display in zip(source_rows, changed_rows, value_displays) :
+        col_values = {}
+        for source_ix, target_ix, type_code, process_code in move_list :
+            if target_ix == target_key_ix :
+                continue
+            if process_code.strip() == "split" and not splitAction(source_row[source_ix], value_display)[2] :
+                continue
+            col_values[target_ix] = changed_row[target_ix]
+        row_updates.append(col_values)
+    return row_updates
+
+#   updateRows() - Set the values (see changedValues) in the Action rows of changed Request IDs - in place.
+def updateRows(request_ids, row_updates) :
+    global actsheet, action_requests
+    date_ixs = dateColumns()
+    for request_id, col_values in zip(request_ids, row_updates) :
+        for target_ix, col_value in col_values.items() :
+            action_cell = actsheet.cell(row=action_requests[request_id], column=target_ix + 1)
+            action_cell.value = col_value
+            if target_ix in date_ixs :
+                action_cell.style = date_style_name
+
+run_stats.phase("build rows")
 action_updated = False
-count_rows  = 1
+store_rows = []     # New rows for the SQLite action store - added in a single transaction, at the end.
+new_sources = []    # Values of the source rows to be added - built into Action rows together, after all of the rows are read (see buildRows).
+new_displays = []
+changed_ids = []    # Request IDs (and source rows) with a different hash than at the last import - their Action rows are updated.
+changed_sources = []
+changed_displays = []
+row_hashes = {}     # Request ID: hash of the source values - for the state file.
+count_rows  = min_data_row - 1
 count_match = 0
 count_added = 0
+count_changed = 0
+count_unchanged = 0
 count_type_error = 0
-for w_row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row, values_only=False) :
+for w_row in readRows(min_row=min_data_row, col_ixs=source_ixs) :
     count_rows += 1
 
-    key_value = w_row[source_key_ix].value      # source_key_ix was derived earlier (when building move_list), from the 'key_column' parameter.
+    key_value = w_row[source_key_ix]      # source_key_ix was derived earlier (when building move_list), from the 'key_column' parameter.
     key_value_display = f"Request # {key_value} at row {count_rows}"
     have_key_error = False
     if key_is_int :
@@ -391,26 +563,77 @@ for w_row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row, values_on
     if have_key_error :
         count_type_error += 1
         if count_type_error > 11 :
-            MessageShow(f"Ending process b/c key errors.  Worksheet size is {worksheet.max_row - 1}.")
+            MessageShow(f"Ending process b/c key errors.  Worksheet size is {source_row_count - 1}.")
             break
-    elif key_value in action_requests :
-        count_match += 1
     else :
-        new_row = buildRow(w_row)
-        if isinstance(new_row, list) :
-            actsheet.append(new_row)
-            action_updated = True
-            count_added += 1
-            for move_it in move_list :
-                if move_it[2].strip() == "date" :
-                    date_cell = actsheet.cell(row=actsheet.max_row, column=move_it[1] + 1)
-                    date_cell.number_format = 'mm/dd/yyyy'
+        row_hash = rowHash(w_row)
+        if key_value not in action_requests :
+            new_sources.append(w_row)
+            new_displays.append(key_value_display)
+        else :
+            count_match += 1
+            if key_value in prior_hashes and prior_hashes[key_value] != row_hash :
+                changed_ids.append(key_value)
+                changed_sources.append(w_row)
+                changed_displays.append(key_value_display)
+            elif key_value in prior_hashes :
+                count_unchanged += 1
+        row_hashes[key_value] = row_hash
+if not fast_read :
+    workbook.close()
+
+new_rows = buildRows(new_sources, new_displays)
+changed_rows = buildRows(changed_sources, changed_displays)
+row_updates = changedValues(changed_sources, changed_rows, changed_displays)
+count_added = len(new_rows)
+count_changed = sum(1 for col_values in row_updates if len(col_values) > 0)
+count_kept = len(row_updates) - count_changed
+if sql_store is not None :
+    store_rows = new_rows
+elif count_added > 0 or count_changed > 0 :
+    run_stats.phase("append")
+    try:
+        actbook  = load_workbook(actionfile_path)       # Reopened for writing - now that there are rows to add (or update).
+        actsheet = actbook.active
+    except Exception as err:
+        MessageShow(f"Could not open the file: {err}")
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+    appendRows(new_rows)
+    updateRows(changed_ids, row_updates)
+    action_updated = True
 
 MessageShow(f"{count_rows} Requests read from {worksheet_name}.")
 MessageShow(f"{count_added} Requests added to {actsheet_name}. {count_match} matching - already listed.")
+if len(prior_hashes) > 0 :
+    MessageShow(f"Since the last import:  {count_added} new, {count_changed} changed (updated in place), {count_unchanged} unchanged.")
+if count_kept > 0 :
+    MessageShow(f"{count_kept} Requests with a blank or unexpected My Action value - the recorded action was kept.")
 if action_updated :
+    run_stats.phase("prompts")
     input_dummy = input(f"Is the {actsheet_name} workbook closed?  If not, will CRASH !!!  <Enter> to continue.")
+    run_stats.phase("save")
     actbook.save(actionfile_path)
+if sql_store is not None :
+    run_stats.phase("save")
+    sql_store.appendRows(store_rows)
+    sql_store.updateRows(list(zip(changed_ids, row_updates)))
+    sql_store.close()
+if use_state and count_type_error <= 11 :
+    writeState(row_hashes)
+run_stats.endPhase()
+
+run_stats.setRows(count_rows)
+run_stats.count("actions", len(action_requests))
+run_stats.count("rows_added", count_added)
+run_stats.count("rows_matched", count_match)
+run_stats.count("rows_changed", count_changed)
+run_stats.count("rows_kept", count_kept)
+run_stats.count("rows_unchanged", count_unchanged)
+run_stats.count("key_errors", count_type_error)
+run_stats.count("distinct_actions", len(split_cache))
+run_stats.writeSection(MessageOut)
 
 
 MessageClose()
\ No newline at end of file
@@ -0,0 +1,69 @@
+# MultiMatch.py - Multi-pattern substring search, used by the "filter" and "dropincl" conditions (see DropRules.py).
+
+# The patterns are compiled once per condition.  Each cell value is then lowered once and scanned once, instead of once per pattern.
+#
+# The single-pass scan uses an Aho-Corasick automaton from the pyahocorasick package (pip install pyahocorasick), if it is installed in the current environment.
+# Without pyahocorasick - or for short pattern lists, where the automaton does not pay for itself - the patterns are tested one at a time against the lowered text.
+# (A pure-Python automaton is many times slower than the built-in substring test, so it is not used.  Run bench/BenchMultiMatch.py to compare on your own data.)
+
+try:
+    import ahocorasick
+    have_ahocorasick = True
+except ModuleNotFoundError:
+    have_ahocorasick = False
+
+min_automaton_size = 24     # Use the automaton only if there are at least this many patterns.  (Below this, the built-in substring test is faster - see bench/BenchMultiMatch.py.)
+
+
+class MultiMatch:
+
+    def __init__(self, patterns, use_automaton=None):
+        self.patterns = tuple(pattern.lower() for pattern in patterns)      # In the order listed - the first listed pattern wins.
+        self.empty_ix = -1
+        if "" in self.patterns :
+            self.empty_ix = self.patterns.index("")     # An empty pattern matches any text.
+
+        if use_automaton is None :
+            use_automaton = have_ahocorasick and len(self.patterns) >= min_automaton_size
+        self.automaton = None
+        if use_automaton and have_ahocorasick :
+            self.automaton = ahocorasick.Automaton()
+            for pattern_ix, pattern in enumerate(self.patterns) :
+                if pattern != "" and pattern not in self.automaton :    # Keep the first listed index for a repeated pattern.
+                    self.automaton.add_word(pattern, pattern_ix)
+            if len(self.automaton) > 0 :
+                self.automaton.make_automaton()
+            else :
+                self.automaton = None
+
+    #   firstListed() - Return the index of the first listed pattern found in the (already lowered) text, or -1 if none are found.
+    def firstListed(self, lower_text):
+        if self.automaton is None :
+            for pattern_ix, pattern in enumerate(self.patterns) :
+                if pattern in lower_text :
+                    return pattern_ix
+            return -1
+
+        best_ix = self.empty_ix
+        if best_ix == 0 :
+            return 0
+        for end_ix, pattern_ix in self.automaton.iter(lower_text) :
+            if best_ix < 0 or pattern_ix < best_ix :
+                best_ix = pattern_ix
+                if best_ix == 0 :
+                    break
+        return best_ix
+
+    #   anyFound() - Return True if any of the patterns is found in the (already lowered) text.
+    def anyFound(self, lower_text):
+        if self.automaton is None :
+            for pattern in self.patterns :
+                if pattern in lower_text :
+                    return True
+            return False
+
+        if self.empty_ix > -1 :
+            return True
+        for match in self.automaton.iter(lower_text) :
+            return True
+        return False
@@ -6,12 +6,40 @@
 #   Add input worksheet for client locations.
 #   Provide graceful exit if worksheet is open in Excel session.
 #   Add input re unidentified locations.  Ask if want to add from command line - or directly into spreadsheet.
-
+#
+# Project Location values are matched to the Location Worksheet regardless of case, punctuation, spacing, and state name vs abbreviation - and then, if still not found,
+# to the most similar Location Worksheet value (see LocationIndex.py).  "locatfuzzy <threshold>" in the Control File sets the similarity needed (0 - 1, default 0.88);
+# "locatfuzzy False" turns off the similarity match.
+#
+# "streaming True" - Read the Roles Worksheet in read-only mode, and write the rows (with My Location) to a new, write-only workbook: <workbook>_loc.xlsx.
+# The input workbook is left as it is.  Keeps memory flat, and saves faster, for large worksheets.  Only the cell values of the Roles Worksheet are carried over to
+# the new workbook (dates are written in mm/dd/yyyy form) - other worksheets, such as "Instructions", are not.
+# In streaming mode the Roles Worksheet is read by RoleReader.py (values only - much quicker than openpyxl), unless "fastread False" is in the Control File.  The rows are
+# read from the file as they are needed - the values of the whole worksheet are not held in memory (and no RoleReader.py cache file is kept).
+# A CSV or Parquet role file (see RoleReader.py) is always read in streaming mode.
+#
+# Project Locations that are not in the Location Worksheet can be given a My Location value by their distance from the home office (see GeoDistance.py):
+#   geohome  "<city, state>"  - or -  geohome <latitude> <longitude>
+#   geobands <miles> <label> <miles> <label> ... <label beyond the last distance>    (default: 50 Local 150 Commute 500 Travel Far)
+#   geotable <path>    (optional - place table CSV file; default USPlaces.csv, next to this script)
+# The distances are worked out once for all of the distinct Project Location values, before the rows are updated.  List the band labels in "locompare",
+# so that the closest of multiple Project Locations can be chosen.  Location Worksheet values still come first.
+#
+# Project Location values repeat across the rows of a large worksheet, so each distinct value (with the Requesting Office, for "Deloitte Office") is resolved once,
+# and the result is reused - see resolveLocation().  "locatcache <n>" in the Control File sets the number of distinct values kept (default 4096, 0 = no reuse).
+
+import os
 import sys
 import shlex
+import functools
 from pathlib import Path
 from datetime import datetime
 import ReadControl
+import RunStats
+import LocationIndex
+import GeoDistance
+import PipelineStage
+import RoleReader
 
 arguments = sys.argv[0:]  # List of all arguments.  arguments[0] = <script name>  arguments[1] = <Control File name>   arguments[2] = <Input worksheet File name>
 now_time = datetime.now()
@@ -32,7 +60,7 @@ if not worksheet_path.is_file():
     sys.exit(1)
 
 # Read parameter file and load values into a dictionary object.
-err_code, parms_dict = ReadControl.read(arguments[1], True)
+err_code, parms_dict = ReadControl.read(arguments[1], True, ReadControl.script_schemas["MyLocation.py"])
 if err_code > 0 :
     print("Terminating process.")
     sys.exit(1)
@@ -60,6 +88,12 @@ mssg_file_path = parms_dict['messagdir'][0] + "\\MyLocation.mssg"  # Message Dir
 MessageOut(start_message)
 MessageOut(" ")
 
+# Phase timing and counters - written to the end of the output message file (see RunStats.py).
+run_stats = RunStats.RunStats("MyLocation.py")
+if "runstats" in parms_dict and len(parms_dict['runstats']) > 0 and parms_dict['runstats'][0] == "False" :
+    run_stats.enabled = False
+run_stats.phase("control")
+
 # print("Python executable: ", sys.executable)
 try:
     import pandas as pd
@@ -73,7 +107,9 @@ except ModuleNotFoundError:
     sys.exit(1)
     
 try:
-    from openpyxl import load_workbook
+    from openpyxl import load_workbook, Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils.exceptions import InvalidFileException
 except ModuleNotFoundError:
     MessageShow("openpyxl not found!")
     MessageShow("Make sure that you run " + arguments[0] + " in a virtual environment that is activated and has openpyxl installed.")
@@ -89,7 +125,25 @@ else :
     MessageClose()
     sys.exit(1)
 
+stream_rows = False
+fast_read = True
+if "fastread" in parms_dict and len(parms_dict['fastread']) > 0 :
+    if parms_dict['fastread'][0] == "False" :
+        fast_read = False
+role_file = not arguments[2].lower().endswith((".xlsx", ".xlsm"))     # CSV or Parquet - see RoleReader.py.
+if role_file :
+    fast_read = True
+if ("streaming" in parms_dict and len(parms_dict['streaming']) > 0 and parms_dict['streaming'][0] == "True") or role_file :
+    stream_rows = True
+    stream_out_path = os.path.splitext(arguments[2])[0] + "_loc.xlsx"
+    MessageShow(f"Streaming mode: reading {arguments[2]} in read-only mode, and writing to {stream_out_path}.")
+    if PipelineStage.active :
+        stream_rows = False
+        MessageShow("Streaming mode is not used as a pipeline stage - the workbook is passed to MySource.py in memory.")
+fast_read = fast_read and (stream_rows or role_file)
+
 # Read Location Worksheet and load values into a dictionary object.
+run_stats.phase("locations")
 control_path = Path(parms_dict['locatsheet'][0])   # The Location Worksheet path is specified in the Control File.
 if not control_path.is_file():
     MessageShow(f"Location Worksheet \"{parms_dict['locatsheet'][0]}\" not found.")
@@ -113,6 +167,22 @@ for row in locsheet.iter_rows(min_row=2, max_row=locsheet.max_row, values_only=T
 
 MessageShow(f"Read {len(locats_dict)} locations from {parms_dict['locatsheet'][0]}.")
 
+fuzzy_threshold = LocationIndex.fuzzy_threshold
+if "locatfuzzy" in parms_dict and len(parms_dict['locatfuzzy']) > 0 :
+    if parms_dict['locatfuzzy'][0] == "False" :
+        fuzzy_threshold = None
+    else :
+        try:
+            fuzzy_threshold = float(parms_dict['locatfuzzy'][0])
+        except ValueError:
+            MessageShow(f"\"locatfuzzy\" parameter is \"{parms_dict['locatfuzzy'][0]}\" but was expecting a number between 0 and 1, or False.  Using {fuzzy_threshold}.")
+
+location_index = LocationIndex.LocationIndex(locats_dict, fuzzy_threshold)
+if len(location_index.conflicts) > 0 :
+    MessageShow(f"{len(location_index.conflicts)} Location Worksheet values are the same as another value (apart from case, punctuation, or state name) but have a different My Location.  The first listed is used:")
+    for first_key, other_key in location_index.conflicts :
+        MessageOut(f"   \"{other_key}\" - using \"{first_key}\"")
+
 
 
 #   Build dictionary from parameters for comparing which value to return for a mulit-value Project Location input.  (The result should refer to the closest Project Location.)
@@ -152,18 +222,43 @@ def loadLocCampare(compare_list) :
 
 
 # Read Roles Worksheet and process.
+run_stats.phase("load")
+#   readRows() - The rows of the Roles Worksheet from min_row to max_row, as tuples of values.
 try:
-    rolebook  = load_workbook(arguments[2])
+    if fast_read :
+        if stream_rows :
+            role_table = RoleReader.streamRoles(arguments[2])
+            MessageOut(f"Reading the rows as they are needed ({role_table.source}).")
+        else :
+            role_table = RoleReader.readRoles(arguments[2])      # Pipeline stage, CSV or Parquet file - the rows are copied into a workbook, below.
+            MessageOut(f"Read {role_table.row_count} rows ({role_table.source}).")
+        rolesheet_title = role_table.title
+        readRows = role_table.rows
+        if not stream_rows :
+            rolebook = Workbook()       # Pipeline stage - MySource.py takes the worksheet in memory.
+            rolesheet = rolebook.active
+            rolesheet.title = rolesheet_title
+            for row_values in role_table.rows() :
+                rolesheet.append(row_values)
+            for rrow in rolesheet.iter_rows() :
+                for cell in rrow :
+                    if isinstance(cell.value, datetime) :
+                        cell.number_format = 'mm/dd/yyyy'
+    else :
+        rolebook  = load_workbook(arguments[2], read_only=stream_rows)
+        rolesheet = rolebook.active
+        readRows = lambda min_row=1, max_row=None : rolesheet.iter_rows(min_row=min_row, max_row=max_row, values_only=True)
     
     sheet_to_remove = "Instructions"    # Drop the "Instructions" worksheet.
     # Note: For some reason, this script causes the "Instructions" worksheet to get blanked out.  Have not figured out how to keep this from happening - so just deleting the worksheet.
-    if sheet_to_remove in rolebook.sheetnames:
+    # (Not needed in streaming mode - the input workbook is not saved, and only the Roles Worksheet is written to the new workbook.)
+    if not stream_rows and sheet_to_remove in rolebook.sheetnames :
         drop_sheet = rolebook[sheet_to_remove]
         rolebook.remove(drop_sheet)
         MessageShow(f"Deleting worksheet '{sheet_to_remove}'.")
         
-    rolesheet_title = rolebook.sheetnames[0]
-    rolesheet = rolebook.active
+    if not fast_read :
+        rolesheet_title = rolebook.sheetnames[0]
     MessageShow(f"Processing \"{rolesheet_title}\" worksheet.")
     
 except FileNotFoundError:
@@ -176,21 +271,20 @@ except Exception as unexpected_error:
     print(f"An unexpected error occurred: {unexpected_error}")
 
 
+run_stats.phase("header scan")
 role_headers = {}
 def getRoleHeaders (sheet_row) :
     global start_data_row, role_headers
-    for idx, cell in enumerate(sheet_row):
-        if cell.value is not None :
-            col_header = cell.value.strip() 
-            role_headers[col_header] = idx
+    role_headers.update(RoleReader.headerIndex(sheet_row))
             
-start_data_row = 2
-getRoleHeaders(rolesheet[1])
+first_rows = list(readRows(min_row=1, max_row=2))
+getRoleHeaders(first_rows[0] if len(first_rows) > 0 else ())
+skip_header = None
 if "skip_header" in parms_dict :    # Special processing for GPS_Open_Demands_Report.xlsx - headers needed for processing are on second line.
     skip_header = parms_dict['skip_header'][0]
-    if skip_header in role_headers and role_headers[skip_header] == 0 :
-        start_data_row += 1 
-        getRoleHeaders(rolesheet[2])
+start_data_row = RoleReader.skipHeaderRow(first_rows[0] if len(first_rows) > 0 else (), skip_header) + 1
+if start_data_row > 2 :
+    getRoleHeaders(first_rows[1] if len(first_rows) > 1 else ())
 
 have_col_headers = True
 try:
@@ -222,11 +316,14 @@ try:
         MessageOut(f"ix_my_locat = {ix_my_locat}")
     else:
         if have_col_headers :
-            rolesheet.insert_cols(ix_proj_locat + 2)    # Column location count from A = 1
             ix_my_locat = ix_proj_locat + 1             # Column location count from A = 0
-            MessageShow(f"Inserting \"{parms_dict['col_location'][0]}\" column in {arguments[2]} workbook.")
+            if stream_rows :
+                MessageShow(f"Inserting \"{parms_dict['col_location'][0]}\" column in {stream_out_path} workbook.")     # As each row is written - see streamValues().
+            else :
+                rolesheet.insert_cols(ix_proj_locat + 2)    # Column location count from A = 1
+                MessageShow(f"Inserting \"{parms_dict['col_location'][0]}\" column in {arguments[2]} workbook.")
+                rolesheet.cell(row=start_data_row - 1, column=ix_my_locat + 1, value=parms_dict['col_location'][0])      # Column location count from A = 1
             MessageOut(f"ix_my_locat = {ix_my_locat}")
-            rolesheet.cell(row=start_data_row - 1, column=ix_my_locat + 1, value=parms_dict['col_location'][0])      # Column location count from A = 1
             location_col_inserted = True
         else:
             MessageShow(f"Did not locate \"{parms_dict['col_location'][0]}\" column header in {arguments[2]} workbook.")
@@ -266,46 +363,140 @@ if location_col_inserted :
     if ix_req_offc > ix_proj_locat :
         ix_req_offc += 1
   
+#   streamValues() - Streaming mode: list of the values of a row of the Roles Worksheet - with the My Location column inserted, if it is not in the worksheet.
+#   (Same column indexes as the worksheet after insert_cols(), in the non-streaming mode.)
+stream_width = max(ix_request, ix_proj_locat, ix_my_locat, ix_req_offc) + 1
+def streamValues(row_values, header_row=False) :
+    out_row = list(row_values)
+    if location_col_inserted :
+        while len(out_row) < ix_my_locat :
+            out_row.append(None)
+        out_row.insert(ix_my_locat, parms_dict['col_location'][0] if header_row else None)
+    while len(out_row) < stream_width :
+        out_row.append(None)
+    return out_row
+
+#   streamCells() - Streaming mode: write dates in mm/dd/yyyy form (as in the downloaded worksheet).
+def streamCells(out_row) :
+    global outsheet
+    for col_ix, cell_value in enumerate(out_row) :
+        if isinstance(cell_value, datetime) :
+            write_cell = WriteOnlyCell(outsheet, value=cell_value)
+            write_cell.number_format = 'mm/dd/yyyy'
+            out_row[col_ix] = write_cell
+    return out_row
+
+
+# Distance bands for the Project Location values not in the Location Worksheet - all worked out together, before the rows are updated.
+geo_dict = {}       # Project Location: My Location (distance band label)
+if "geohome" in parms_dict :
+    run_stats.phase("geodistance")
+    geo_table = GeoDistance.GeoTable(parms_dict['geotable'][0] if "geotable" in parms_dict and len(parms_dict['geotable']) > 0 else GeoDistance.default_table)
+    geo_error = False
+    if not geo_table.load() :
+        MessageShow(geo_table.error)
+        geo_error = True
+    else :
+        MessageShow(f"Read {len(geo_table.latitudes)} places from {geo_table.table_path}.")
 
-loc_unknown_list = []   # For collecting unique unknown locations
-
-#   processLocation() function
+    home_list = parms_dict['geohome']
+    home_latitude = home_longitude = None
+    if len(home_list) == 2 :
+        try:
+            home_latitude, home_longitude = float(home_list[0]), float(home_list[1])
+        except ValueError:
+            pass
+    if home_latitude is None and len(home_list) > 0 and not geo_error :
+        home_ix = geo_table.locate(" ".join(home_list))
+        if home_ix >= 0 :
+            home_latitude, home_longitude = geo_table.latitudes[home_ix], geo_table.longitudes[home_ix]
+    if home_latitude is None and not geo_error :
+        MessageShow(f"\"geohome\" parameter {home_list} is not a place in {geo_table.table_path}, or a latitude and longitude.")
+        geo_error = True
+
+    geo_bands = GeoDistance.parseBands(parms_dict['geobands'] if "geobands" in parms_dict else ["50", "Local", "150", "Commute", "500", "Travel", "Far"])
+    if geo_bands is None :
+        MessageShow(f"\"geobands\" parameter is {parms_dict['geobands']} but was expecting <miles> <label> <miles> <label> ... <label>, with increasing distances.")
+        geo_error = True
+
+    if geo_error :
+        MessageShow("Terminating process.")
+        MessageClose()
+        sys.exit(1)
+
+    distinct_locations = {}     # In order first seen.
+    geo_rows = readRows(min_row=start_data_row)
+    if stream_rows :
+        geo_rows = (streamValues(row_values) for row_values in geo_rows)
+    for row_values in geo_rows :
+        proj_location = row_values[ix_proj_locat]
+        if ix_req_offc > -1 and proj_location == "Deloitte Office" :
+            proj_location = row_values[ix_req_offc]
+        if isinstance(proj_location, str) :
+            for split_value in proj_location.split('|') :
+                if split_value != "" :
+                    distinct_locations[split_value] = None
+        elif isinstance(proj_location, int) :
+            distinct_locations[proj_location] = None
+
+    geo_locations = []
+    place_ixs = []
+    for proj_location in distinct_locations :
+        if location_index.lookup(proj_location)[0] is not None :
+            continue
+        place_ix = geo_table.locate(proj_location)
+        if place_ix >= 0 :
+            geo_locations.append(proj_location)
+            place_ixs.append(place_ix)
+
+    geo_distances = geo_table.distances(place_ixs, home_latitude, home_longitude)
+    geo_labels = GeoDistance.distanceBands(geo_distances, geo_bands[0], geo_bands[1])
+    MessageShow(f"{len(geo_locations)} Project Locations not in the Location Worksheet placed by distance from {' '.join(home_list)}.")
+    for proj_location, geo_distance, geo_label in zip(geo_locations, geo_distances, geo_labels) :
+        geo_dict[proj_location] = geo_label
+        MessageOut(f"   {proj_location}: {geo_distance:.0f} miles - {geo_label}")
+    for geo_label in geo_bands[1] :
+        if geo_label not in loc_compare_dict :
+            MessageOut(f"Note: distance band \"{geo_label}\" is not listed in \"locompare\" - ranked after the listed values, for multiple Project Locations.")
+
+
+loc_unknown_set = {}    # For collecting unique unknown locations.  (A dictionary with no values - an ordered set, in order first seen.)
+
+#   processLocation() function - returns the My Location value, and True if the Project Location was found in the Location Worksheet.
 def processLocation(proj_location) :
-    global locats_dict, count_matched
-    return_location = ""
+    global location_index
     
-    if proj_location in locats_dict:
-        return_location = locats_dict[proj_location]
-        count_matched += 1
-    else :
-        return_location = "Unknown"
-        if proj_location not in loc_unknown_list:
-            loc_unknown_list.append(proj_location)
-    return return_location
+    my_location, match_type = location_index.lookup(proj_location)
+    if my_location is not None :
+        return my_location, True
+    if proj_location in geo_dict :
+        return geo_dict[proj_location], True
+    return "Unknown", False
     
 
 #   processLocations() function - test if Project Location contains multiple values (delimited by "|" bar character).
+#   Returns (My Location, rank, number of values matched, number of additional (multi) values, tuple of unknown values).  Does not change any global values - so the result can be reused.
 def processLocations(proj_location) :
-    global count_multi, count_matched
-    return_location = ""
-    
     if proj_location is None or proj_location == "" :
-        return_location = "Non"
-        count_matched += 1
-        return return_location
+        return "Non", loc_compare_max + 1, 1, 0, ()
         
     if isinstance(proj_location, int) :
-        return_location = processLocation(proj_location)
-        return return_location
+        return_location, matched = processLocation(proj_location)
+        return return_location, loc_compare_dict.get(return_location, loc_compare_max + 1), int(matched), 0, () if matched else (proj_location,)
     
     split_line = proj_location.split('|')
     if len(split_line) > 1 :
-        count_multi += len(split_line) - 1
         compare_return = "xxx"
         compare_rank   = loc_compare_max + 1
+        count_found    = 0
+        unknown_values = []
         for split_value in split_line :
             if split_value != "" :
-                test_location = processLocation(split_value)
+                test_location, matched = processLocation(split_value)
+                if matched :
+                    count_found += 1
+                elif split_value not in unknown_values :
+                    unknown_values.append(split_value)
                 if test_location in loc_compare_dict :
                     test_rank = loc_compare_dict[test_location]
                 else :
@@ -315,37 +506,127 @@ def processLocations(proj_location) :
                     compare_return = test_location
                     compare_rank   = test_rank
         
-        return_location = compare_return
-    else :
-        return_location = processLocation(proj_location)
-    return return_location
+        return compare_return, compare_rank, count_found, len(split_line) - 1, tuple(unknown_values)
+
+    return_location, matched = processLocation(proj_location)
+    return return_location, loc_compare_dict.get(return_location, loc_compare_max + 1), int(matched), 0, () if matched else (proj_location,)
+    
+
+#   resolveLocation() - processLocations() for the Project Location of a row - or for the Requesting Office, if the Project Location is "Deloitte Office" (MySource worksheet).
+#   The result is kept for each distinct (Project Location, Requesting Office) value, up to the "locatcache" number of values (least recently used are dropped).
+loc_cache_size = 4096
+if "locatcache" in parms_dict and len(parms_dict['locatcache']) > 0 :
+    try:
+        loc_cache_size = max(0, int(parms_dict['locatcache'][0]))
+    except ValueError:
+        MessageShow(f"\"locatcache\" parameter is \"{parms_dict['locatcache'][0]}\" but was expecting an integer value.  Using {loc_cache_size}.")
+
+#   use_office is part of the cache key - a blank Requesting Office (None) still replaces the Project Location.
+@functools.lru_cache(maxsize=loc_cache_size)
+def resolveLocation(proj_location, req_office, use_office) :
+    if use_office :
+        proj_location = req_office
+    return processLocations(proj_location)
+
+#   rowLocation() - My Location value for a row, given its Project Location and Requesting Office values.  Adds to the counts, and to the unknown locations.
+def rowLocation(proj_location, office_value) :
+    global count_matched, count_multi
+    use_office = ix_req_offc > -1 and proj_location == "Deloitte Office"      # Special processing for MySource worksheet
+    req_office = office_value if use_office else None
+
+    try:
+        my_location, location_rank, matched, multi, unknown_values = resolveLocation(proj_location, req_office, use_office)
+    except TypeError:   # Not hashable (not expected from a worksheet cell) - resolve without the cache.
+        my_location, location_rank, matched, multi, unknown_values = processLocations(req_office if use_office else proj_location)
+    count_matched += matched
+    count_multi   += multi
+    for unknown_value in unknown_values :
+        loc_unknown_set[unknown_value] = None
+    return my_location
     
  
+run_stats.phase("resolve")
 count_matched = 0
 count_rows = 0
 count_multi = 0
-for rrow in rolesheet.iter_rows(min_row=start_data_row) :
-    proj_location = rrow[ix_proj_locat].value
-    request_id    = rrow[ix_request].value
-    
-    if request_id is not None and request_id != "" :
-        count_rows += 1
-         
-        if ix_req_offc > -1 and proj_location == "Deloitte Office" :     # Special processing for MySource worksheet
-            proj_location = rrow[ix_req_offc].value
-    
-   
-        update_cell = rrow[ix_my_locat]
-        update_cell.value = processLocations(proj_location)
+if stream_rows :
+    outbook  = Workbook(write_only=True)
+    outsheet = outbook.create_sheet(rolesheet_title)
+    for row_ix, row_values in enumerate(readRows(min_row=1, max_row=start_data_row - 1), start=1) :
+        outsheet.append(streamCells(streamValues(row_values, row_ix == start_data_row - 1)))
+
+    for row_values in readRows(min_row=start_data_row) :
+        out_row = streamValues(row_values)
+        request_id = out_row[ix_request]
+        if request_id is not None and request_id != "" :
+            count_rows += 1
+            out_row[ix_my_locat] = rowLocation(out_row[ix_proj_locat], out_row[ix_req_offc] if ix_req_offc > -1 else None)
+        outsheet.append(streamCells(out_row))
 
-rolebook.save(arguments[2])
+else :
+    for rrow in rolesheet.iter_rows(min_row=start_data_row) :
+        proj_location = rrow[ix_proj_locat].value
+        request_id    = rrow[ix_request].value
+    
+        if request_id is not None and request_id != "" :
+            count_rows += 1
+            update_cell = rrow[ix_my_locat]
+            update_cell.value = rowLocation(proj_location, rrow[ix_req_offc].value if ix_req_offc > -1 else None)
+
+run_stats.phase("save")
+if stream_rows :
+    outbook.save(stream_out_path)
+    if not fast_read :
+        rolebook.close()
+    MessageShow(f"Wrote {stream_out_path}.")
+elif PipelineStage.active :
+    PipelineStage.rolebook = rolebook      # Saved by MySource.py (as <workbook>_out.xlsx) - see Pipeline.py.
+    MessageShow(f"Passing the workbook to MySource.py - {arguments[2]} is not saved.")
+else :
+    rolebook.save(arguments[2])
+run_stats.endPhase()
 
 multi_message_string = "."
 if count_multi > 0 :
     multi_message_string = f" + {count_multi} additional (multi) values = {count_rows + count_multi}."
 MessageShow(f"Matched Project Location for {count_matched} out of {count_rows} rows" + multi_message_string)
     
-MessageShow(f"{len(loc_unknown_list)} unique Project Locations still not identified.")
-for loc_unk in loc_unknown_list :
-    MessageOut(loc_unk)
+match_counts = location_index.match_counts
+MessageOut(f"Distinct Project Location values matched: {match_counts['exact']} exact, {match_counts['normalized']} normalized, {match_counts['fuzzy']} by similarity.")
+if len(location_index.fuzzy_matches) > 0 :
+    MessageShow(f"{len(location_index.fuzzy_matches)} Project Locations matched by similarity - check, and add to the Location Worksheet if correct:")
+    for proj_location, (locat_key, similarity) in location_index.fuzzy_matches.items() :
+        MessageOut(f"   \"{proj_location}\" -> \"{locat_key}\" ({similarity})")
+
+# Unknown values that differ only in case, punctuation, or state name are listed once.
+unknown_groups = {}
+for loc_unk in loc_unknown_set :
+    unknown_groups.setdefault(LocationIndex.normalizeLocation(loc_unk), []).append(loc_unk)
+MessageShow(f"{len(unknown_groups)} unique Project Locations still not identified.")
+for unknown_values in unknown_groups.values() :
+    if len(unknown_values) > 1 :
+        MessageOut(f"{unknown_values[0]}   (+ {len(unknown_values) - 1} variants: " + ", ".join(f"\"{unknown_value}\"" for unknown_value in unknown_values[1:]) + ")")
+    else :
+        MessageOut(unknown_values[0])
+
+cache_info = resolveLocation.cache_info()
+cache_lookups = cache_info.hits + cache_info.misses
+cache_hit_rate = 0.0
+if cache_lookups > 0 :
+    cache_hit_rate = cache_info.hits / cache_lookups
+MessageOut(f"Location cache: {cache_info.currsize} distinct values, {cache_info.hits} hits out of {cache_lookups} lookups ({cache_hit_rate:.1%}).")
+
+run_stats.setRows(count_rows)
+run_stats.count("locations", len(locats_dict))
+run_stats.count("rows_matched", count_matched)
+run_stats.count("multi_values", count_multi)
+run_stats.count("unknown_locations", len(unknown_groups))
+run_stats.count("normalized_matches", match_counts['normalized'])
+run_stats.count("fuzzy_matches", match_counts['fuzzy'])
+run_stats.count("distance_matches", len(geo_dict))
+run_stats.count("streaming", stream_rows)
+run_stats.count("location_cache_hits", cache_info.hits)
+run_stats.count("location_cache_misses", cache_info.misses)
+run_stats.count("location_cache_hit_rate", round(cache_hit_rate, 4))
+run_stats.writeSection(MessageOut)
 MessageClose()
\ No newline at end of file
@@ -6,17 +6,23 @@
 #       Where possible drop named indexes (e.g. ix_my_actn) and replace with lookup of role_headers
 #       Allow multiple values (in Mandatory Skills) to map to same filter value in My Filter.
 #       Add option to delete rows with blank filter (for Mario).
-#       Fix problem of deleted rows.  After the deletes, Excel still thinks that it has the original number of rows.
 #       When reading dates from Action File, add test to make sure have actual date (re .strftime()).
-#       Allow wild cards when specifying location.
 
+import os
 import sys
 import shlex
 from pathlib import Path
 from datetime import datetime
 from openpyxl.styles import Alignment
+from openpyxl.cell   import WriteOnlyCell
 from openpyxl.utils  import get_column_letter
 import ReadControl
+import DropRules
+import RowWorkers
+import ActionStore
+import RunStats
+import PipelineStage
+import RoleReader
 from FilterRow import FilterRow
 
 arguments = sys.argv[0:]  # List of all arguments.  arguments[0] = <script name>  arguments[1] = <Control File name>   arguments[2] = <Input Spreadsheet File name>
@@ -42,10 +48,24 @@ def MessageShow(mssg_txt) :  # Display message to console and write to output me
     print(mssg_txt)
     MessageOut(mssg_txt)
 
+# "--workers N" option - Decide the rows in N worker processes.  (See RowWorkers.py.)  Removed from the argument list before the positional arguments are read.
+worker_count = 1
+if "--workers" in arguments :
+    flag_ix = arguments.index("--workers")
+    try :
+        worker_count = int(arguments[flag_ix + 1])
+    except (IndexError, ValueError) :
+        worker_count = 0
+    if worker_count < 1 :
+        print("Expected a positive number following the \"--workers\" option.")
+        print("Terminating process.")
+        sys.exit(1)
+    del arguments[flag_ix:flag_ix + 2]
+
 if len(arguments) < 3 :
     print("Missing required command line parameters.")
     print(arguments)
-    print(f"Usage: python {sys.argv[0]} <control file> <workbook>")
+    print(f"Usage: python {sys.argv[0]} [--workers N] <control file> <workbook>")
     print(" .. or, if using BAT file: MySource.bat <workbook>")
     print("Terminating process.")
     sys.exit(1)
@@ -62,7 +82,7 @@ except ModuleNotFoundError:
     sys.exit(1)
     
 try:
-    from openpyxl import load_workbook
+    from openpyxl import load_workbook, Workbook
 except ModuleNotFoundError:
     print("openpyxl not found!")
     print("Make sure that you run " + arguments[0] + " in a virtual environment that is activated and has openpyxl installed.")
@@ -70,7 +90,7 @@ except ModuleNotFoundError:
     sys.exit(1)
 
 # Read Parameter File and load values into a dictionary object.
-err_code, parms_dict = ReadControl.read(arguments[1], True)
+err_code, parms_dict = ReadControl.read(arguments[1], True, ReadControl.script_schemas["MySource.py"])
 if err_code > 0 :
     print("Terminating process.")
     sys.exit(1)
@@ -81,14 +101,24 @@ MessageOut(start_message)
 MessageOut(f"Using {arguments[1]} Control File.")
 MessageOut(" ")
 
-# Prepare array for processing row drops.
-drop_dict = {}
-drop_ix = 0
-while drop_ix < len(parms_dict['droprows']) :
-    drop_key = parms_dict['droprows'][drop_ix]
-    drop_dict[drop_key] = [-1, 0, -1]  # Initialize the list with column index = -1, count of lines dropped = 0, xref = -1
-    drop_ix +=1
- 
+# Phase timing and counters - written to the end of the output message file (see RunStats.py).  "runstats False" in the Control File leaves them out.
+run_stats = RunStats.RunStats("MySource.py")
+if "runstats" in parms_dict and len(parms_dict['runstats']) > 0 and parms_dict['runstats'][0] == "False" :
+    run_stats.enabled = False
+run_stats.phase("control")
+
+# Compile the "droprows" conditions into rule objects for processing row drops.  (See DropRules.py for the condition types.)
+drop_plan = DropRules.DropPlan(parms_dict, f"{arguments[1]} Control File")
+for drop_warning in drop_plan.warnings :
+    MessageShow(drop_warning)
+if len(drop_plan.errors) > 0 :
+    for drop_error in drop_plan.errors :
+        MessageShow(drop_error)
+    MessageShow("Terminating process.")
+    MessageClose()
+    sys.exit(1)
+drop_plan.timed = run_stats.enabled
+
 do_actual_delete = False
 early_quit = False
 try:
@@ -103,6 +133,38 @@ if do_actual_delete :
 else :
     MessageShow("WILL NOT BE deleting rows during this run.")
 
+# "streaming True" - Read the Roles Worksheet in read-only mode, and write the rows straight into a new (write-only) workbook.  Keeps memory flat for large worksheets.
+# Note: Only cell values are carried over to the output workbook.  (Dates are written in mm/dd/yyyy form.)
+# In streaming mode the Roles Worksheet is read by RoleReader.py (values only - much quicker than openpyxl), unless "fastread False" is in the Control File.  The rows are
+# read from the file as they are needed - the values of the whole worksheet are not held in memory (and no RoleReader.py cache file is kept).
+# A CSV or Parquet role file (see RoleReader.py) is always read in streaming mode.
+stream_rows = False
+if "streaming" in parms_dict and len(parms_dict['streaming']) > 0 :
+    if parms_dict['streaming'][0] == "True" :
+        stream_rows = True
+fast_read = True
+if "fastread" in parms_dict and len(parms_dict['fastread']) > 0 :
+    if parms_dict['fastread'][0] == "False" :
+        fast_read = False
+if arguments[2].lower().endswith((".csv", ".parquet")) and PipelineStage.rolebook is None :
+    stream_rows = True
+    fast_read = True
+if stream_rows :
+    MessageShow("Streaming mode: reading Roles Worksheet in read-only mode, and writing to a new workbook.")
+
+# "filterengine pandas" - Test the "droprows" conditions with pandas, a whole column at a time, instead of row by row.  Same results.  (See DropFrame.py.)
+filter_engine = "rows"
+if "filterengine" in parms_dict and len(parms_dict['filterengine']) > 0 :
+    if parms_dict['filterengine'][0] == "pandas" :
+        filter_engine = "pandas"
+        import DropFrame
+        MessageShow("Filter engine: pandas - each \"droprows\" condition is tested against a whole column.")
+        if worker_count > 1 :
+            MessageShow("The \"--workers\" option is not used with \"filterengine pandas\".")
+            worker_count = 1
+    elif parms_dict['filterengine'][0] != "rows" :
+        MessageShow(f"\"filterengine\" parameter is \"{parms_dict['filterengine'][0]}\" but was expecting \"rows\" or \"pandas\".  Defaulting to \"rows\".")
+
 have_filtersheet = False
 if "filtersheet" in parms_dict :
     if len(parms_dict['filtersheet']) < 2 :
@@ -154,24 +216,34 @@ def findActionHeaders(header_row) :
         sys.exit(1)
 
 # Read Action File and load into a dictionary object.
-actionfile_path = parms_dict['inputdir'][0] + "\\" + parms_dict['actionf'][0]
+run_stats.phase("actions")
+# The Action File is read through a cache file kept next to it (see ActionStore.py) - unless "actioncache False" is specified in the Control File.
+# If "actionstore <database path>" is specified in the Control File, the actions are read from the SQLite action store instead.
+if "actionstore" in parms_dict and len(parms_dict['actionstore']) > 0 :
+    actionfile_path = parms_dict['actionstore'][0]
+    action_store = ActionStore.SqlActionStore(actionfile_path)
+else :
+    actionfile_path = parms_dict['inputdir'][0] + "\\" + parms_dict['actionf'][0]
+    use_action_cache = True
+    if "actioncache" in parms_dict and len(parms_dict['actioncache']) > 0 :
+        if parms_dict['actioncache'][0] == "False" :
+            use_action_cache = False
+    action_store = ActionStore.ActionStore(actionfile_path, use_action_cache)
 MessageShow("Reading " + actionfile_path)
-try:
-    actbook  = load_workbook(actionfile_path)
-    actsheet = actbook.active  # Get the active (only) worksheet.
-except FileNotFoundError:
-    MessageShow(f"File {actionfile_path} not found.")
-except Exception as err:
-    MessageShow(f"Could not open the file: {err}")
+if not action_store.load() :
+    MessageShow(action_store.error)
+    MessageShow("Terminating process.")
+    MessageClose()
+    sys.exit(1)
+if action_store.from_cache :
+    MessageOut(f"Action File unchanged since last run - read from {action_store.cache_path}.")
 
-first_row = True
+findActionHeaders(action_store.header)
 action_dict = {}
-for row in actsheet.iter_rows(min_row=1, max_row=actsheet.max_row, values_only=True):
-    if first_row :
-        findActionHeaders(row)
-        first_row = False
-    elif row[ix_act_req] is not None :
-        action_dict[row[ix_act_req]] = f"{row[ix_act_act]} {row[ix_act_dte].strftime("%m/%d/%Y")}"  # Development note: May need to test re if cell is a date object.
+for row in action_store.rows :
+    if row[ix_act_req] is not None :
+        action_date = row[ix_act_dte].strftime('%m/%d/%Y')     # Development note: May need to test re if cell is a date object.
+        action_dict[row[ix_act_req]] = f"{row[ix_act_act]} {action_date}"
 
 MessageShow(f"Read {len(action_dict)} actions from {actionfile_path}.")
 
@@ -180,14 +252,31 @@ MessageShow(f"Read {len(action_dict)} actions from {actionfile_path}.")
 #
 #
 # Read Roles Worksheet
+run_stats.phase("load")
 workbook_path = parms_dict['inputdir'][0] + "\\" + arguments[2]
 MessageShow("Reading " + workbook_path)
-workbook_out = workbook_path.replace(".xlsx", "_out.xlsx")
+workbook_out = os.path.splitext(workbook_path)[0] + "_out.xlsx"
 
+#   readRows() - The rows of the Roles Worksheet from min_row to max_row, as tuples of values.
+workbook = None
+role_table = None
 try:
-    workbook  = load_workbook(workbook_path)
-    worksheet = workbook.active  # Get the active (only) worksheet.
-    worksheet_name = workbook.sheetnames[0]
+    if PipelineStage.rolebook is not None :
+        workbook = PipelineStage.rolebook     # Already read (with My Location added) by MyLocation.py - see Pipeline.py.
+        MessageShow("Using the workbook read by MyLocation.py (pipeline stage).")
+    elif stream_rows and fast_read :
+        role_table = RoleReader.streamRoles(workbook_path)
+        MessageOut(f"Reading the rows as they are needed ({role_table.source}).")
+    else :
+        workbook  = load_workbook(workbook_path, read_only=stream_rows)
+    if role_table is not None :
+        worksheet = None
+        worksheet_name = role_table.title
+        readRows = role_table.rows
+    else :
+        worksheet = workbook.active  # Get the active (only) worksheet.
+        worksheet_name = workbook.sheetnames[0]
+        readRows = lambda min_row=1, max_row=None : worksheet.iter_rows(min_row=min_row, max_row=max_row, values_only=True)
     MessageShow(f"Processing \"{worksheet_name}\" worksheet.")
 except FileNotFoundError:
     MessageShow(f"File {workbook_path} not found.")
@@ -203,16 +292,9 @@ except Exception as err:
 
 # Test if column header matches any of the "droprows" columns.
 def dropColumnCheck(header_text, col_ix) :
-    global drop_dict, parms_dict
-    drop_ix = 0
-    drop_ix_max = len(parms_dict['droprows'])
-    drop_ix_save = -1
-    while drop_ix < drop_ix_max :
-        drop_key = parms_dict['droprows'][drop_ix]
-        if parms_dict[drop_key][0] == header_text :
-            MessageOut (f"Index of \"{header_text}\" = {col_ix}  <- (drop test column)")
-            drop_dict[drop_key] = [col_ix, 0, drop_ix]
-        drop_ix +=1
+    global drop_plan
+    for rule in drop_plan.columnCheck(header_text, col_ix) :
+        MessageOut (f"Index of \"{header_text}\" = {col_ix}  <- (drop test column)")
 
 # findRoleHeaders() function - to identify column headers in Role File (worksheet)
 ix_request = -1
@@ -225,14 +307,11 @@ role_headers = {}
 def findRoleHeaders(header_row) :
     global ix_request, ix_my_actn, ix_my_fltr, ix_colocat, ix_mylocat, ix_mynsert, parms_dict, workbook_path, role_headers
  
-    for idx, cell in enumerate(header_row):
-        if cell.value is not None :
-            col_header = cell.value.strip() 
-            role_headers[col_header] = idx
+    role_headers = RoleReader.headerIndex(header_row)
     
     col_ix = 0
     while col_ix < len (header_row) :
-        header_text = header_row[col_ix].value
+        header_text = header_row[col_ix]
         if header_text == parms_dict['col_request'][0] :    
             ix_request = col_ix
             MessageOut(f"Index of \"{header_text}\" = {col_ix}")
@@ -282,170 +361,85 @@ def findRoleHeaders(header_row) :
         sys.exit(1)
 
 
-#   matchDrop()- Compare the current cell value against any of the specified "drop" or "keep", or other tests.
-#   This function tests only a single cell of the current row, against a single condition from "droprows".  The condition definition specifies which cell in the row is being tested.
-#
-#   Control File Format (First element returned as parms_dict key, subsequent elements returned in list object in parms_dict.):
-#
-#           droprows condition1 condition2 condition3 ...
-#           condition1 "column header 1" drop dropvalue1 dropvalue2 dropvalue3 ...
-#           condition2 "column header 2" keep keepvalue1 keepvalue2 keepvalue3 ...
-#
-#   Condition types:
-#   
-#       drop    - Drop the row if the cell value matches any of the values listed for the condition.
-#       dropbl  - Same as "drop" but also if the cell value is blank or empty.
-#       dropincl - Drop the row if the cell value includes any of the values listed for the condition.  (Different from "drop" b/c "drop" test if equal to the whole cell value.)
-#       keep    - Keep the row if the cell value matches any of the values listed for the condition.
-#       keepbl  - Same as "keep" but also if the cell value is blank or empty.
-#       before  - Drop the row if the date is not before the specified date.
-#       location - Compares two cells of the row (My Location and Co-Location).  Here, we just set the test_colocation flag.  Actual comparison takes place in the colocTooFar() function.
-#       filter  - Search for a string within the cell value.  If found, set the my_filter variable and found_filter flag.
-#       nofilter - Drop the row if there is no filter set.  This condition should be listed after any "filter" conditions in the droprows arguments.
-
-
-def matchDrop(cell_value, xref_ix) :
-    global parms_dict, my_filter, found_filter, test_colocation
-    
-    drop_key = parms_dict['droprows'][xref_ix]
-    is_date_instance = False
-    test_colocation  = False
-
-    if isinstance(cell_value, datetime):    # do this to avoid hitting error on cell_value.strip() - in the else construct.
-        is_date_instance = True
-
-    elif cell_value is None or cell_value.strip() == "" :
-        if  parms_dict[drop_key][1] == "dropbl" :
-            return True
-        elif parms_dict[drop_key][1] == "keepbl" :
-            return False
-        elif parms_dict[drop_key][1] == "filter" :
-            return False
-        elif parms_dict[drop_key][1] == "dropincl" :
-            return False
-    
-    col_ix = 2
-    if  parms_dict[drop_key][1] == "drop" or parms_dict[drop_key][1] == "dropbl":
-        while col_ix < len (parms_dict[drop_key]) :
-            if parms_dict[drop_key][col_ix] == cell_value :
-                return True
-            col_ix += 1
-        return False
-        
-    elif parms_dict[drop_key][1] == "keep" or parms_dict[drop_key][1] == "keepbl":
-        while col_ix < len (parms_dict[drop_key]) :
-            if parms_dict[drop_key][col_ix] == cell_value :   
-                return False
-            col_ix += 1
-        return True
-        
-    elif parms_dict[drop_key][1] == "before" :
-        if is_date_instance :
-            test_date = datetime.strptime(parms_dict[drop_key][2], "%Y%m%d")
-            if cell_value < test_date :
-                return False
-            else :
-                return True
-        else :
-            return False
-            
-    elif parms_dict[drop_key][1] == "location" :    # Requires comparison of two cells - so set the test_colocation flag & pass control back to dropThisRow()
-        test_colocation = True
-        return False
-            
-    elif parms_dict[drop_key][1] == "filter" :   # "filter" action is to find any of the filter values in the cell_value.
-        if found_filter :
-            return False    # Bypass this test if My Filter has already been set for this row.
-        while col_ix < len (parms_dict[drop_key]) :
-            if parms_dict[drop_key][col_ix].lower() in cell_value.lower() :
-                my_filter = parms_dict[drop_key][col_ix]
-                found_filter = True
-                return False
-            col_ix += 1
-        return False
-
-    elif parms_dict[drop_key][1] == "nofilter" :    # Special condition - drop this row if filter is blank.
-    #   This drop_key should follow any of the filter drop_keys in the "droprows" list. 
-        if found_filter :
-            return False
-        else :
-            return True
-        
-    elif parms_dict[drop_key][1] == "dropincl" : # Drop if any of the drop values are included in the cell_value.
-        if found_filter :
-            return False    # Bypass this test if My Filter has already been set for this row.
-        while col_ix < len (parms_dict[drop_key]) :
-            if parms_dict[drop_key][col_ix].lower() in cell_value.lower() :
-               return True
-            col_ix += 1
-        return False
-    
-    return False    # Just in case - processing should not reach this line of code.
-
-
-my_non_loc_count = 0
-#   Compare Co-Location requirement against "My Location".
-def colocTooFar(xref_ix, co_location, my_location) :
-    global parms_dict, my_non_loc_count
-    drop_key  = parms_dict['droprows'][xref_ix]
-    coloc_key = parms_dict[drop_key][2]
-    myloc_key = parms_dict[drop_key][3]
-    
-    if my_location is None or my_location == "" :
-        MessageShow("Blank My Location value.  Should have been filled by MyLocation.py.")
-        my_non_loc_count += 1
-        if my_non_loc_count > 10 :
-            MessageShow("Too many blank My Location values.")
+#   Co-Location requirement is compared against "My Location" by the "location" condition rule (see DropRules.LocationRule).
+#   checkBlankLocations() - Terminate if too many rows have a blank My Location value.
+location_rules = drop_plan.locationRules()
+max_blank_locations = 10
+def checkBlankLocations() :
+    global location_rules
+    for rule in location_rules :
+        if rule.blank_count > max_blank_locations :
+            MessageShow(f"Too many blank My Location values.  Should have been filled by MyLocation.py.")
             MessageShow("Terminating process.")
             MessageClose()
             sys.exit(1)
-        return False
-    
-    coloc_pct = -1
-    for loc_key in parms_dict[coloc_key] :
-        if parms_dict[loc_key][1] == co_location :
-            coloc_pct = int(parms_dict[loc_key][0])
-    if coloc_pct < 0 :
-        MessageShow(f"Did not find match for \"{co_location}\" in {coloc_key}.")
-        
-    myloc_pct = -1
-    for loc_key in parms_dict[myloc_key] :
-        loc_ix = 1  # Start with 1 b/c index 0 is percentage.
-        while loc_ix < len (parms_dict[loc_key]) :
-            if parms_dict[loc_key][loc_ix] == my_location :
-                myloc_pct = int(parms_dict[loc_key][0])
-            loc_ix += 1
-    if myloc_pct < 0 :
-        MessageShow(f"Did not find match for \"{my_location}\" in {myloc_key}.  Note: Is case-sensitive.")
-        
-    if myloc_pct < coloc_pct:
-        return True
-
-    return False
-
 
-#   Test if current row should be dropped.
-def dropThisRow(test_row) :
-    global drop_dict, test_colocation, ix_colocat, ix_mylocat
-
-
-    for drop_line in drop_dict :   # drop_dict contains the column number of all of the columns that are tested.
-        test_col_ix = drop_dict[drop_line][0]
-        
-        if test_col_ix > -1 :    
-            test_colocation = False # Flag Co-Location test, since cannot be processed in MatchDrop().  Will call colocTooFar() instead - see 5 lines down.
+#   reportLocations() - Report (once per value) the Co-Location and My Location values that were not found in the percentage tables.
+def reportLocations() :
+    global location_rules
+    for rule in location_rules :
+        if rule.blank_count > 0 :
+            MessageShow(f"{rule.blank_count} rows with blank My Location value.  Should have been filled by MyLocation.py.")
+        for (list_key, location), row_count in rule.unmatched.items() :
+            MessageShow(f"Did not find match for \"{location}\" in {list_key}.  ({row_count} rows.)")
+        if len(rule.unmatched) > 0 and not rule.no_case :
+            MessageShow(f"Note: Is case-sensitive.  (Add \"nocase\" to the \"{rule.drop_key}\" parameter to ignore case.)")
+
+
+#   decideRow() - Test the row values against the "droprows" conditions, and match the Request ID against the Action File.  (See DropRules.RowDecider.)
+#   Returns (drop_row, my_action, my_filter).  drop_row is True if the row should be deleted.  my_action and my_filter are None if there is no value to write to the row.
+def decideRow(row_values) :
+    global row_decider
+    decision = row_decider.decideRow(row_values)
+    checkBlankLocations()
+    return decision
+
+#   decideRows() - Decide each row that has a Request ID.  Yields (row, row_values, decision) in row order - decision is None if the row has no Request ID.
+#   With "--workers N", the rows are gathered into batches and decided in the worker processes (see RowWorkers.py).
+#   With "filterengine pandas", the rows are gathered into batches and decided a column at a time (see DropFrame.py).
+worker_batch_size = 2000    # Rows per worker per batch.
+frame_batch_size = 100000   # Rows per batch for the pandas filter engine.
+def decideRows(row_items) :
+    global worker_pool, worker_count, row_decider, ix_request, filter_engine
+    if filter_engine == "pandas" :
+        batch = []
+        for row_item in row_items :
+            batch.append(row_item)
+            if len(batch) >= frame_batch_size :
+                yield from decideBatch(batch)
+                batch = []
+        yield from decideBatch(batch)
+        return
 
-            if matchDrop (test_row[test_col_ix].value, drop_dict[drop_line][2]) :   # Function call arguments: matchDrop(<cell value>, <xref_ix>)
-                drop_dict[drop_line][1] += 1
-                return True
-            
-            if test_colocation :
-                if colocTooFar (drop_dict[drop_line][2], test_row[ix_colocat].value, test_row[ix_mylocat].value) :
-                    drop_dict[drop_line][1] += 1
-                    return True
+    if worker_pool is None :
+        for row, row_values in row_items :
+            if row_values[ix_request] is None :
+                yield row, row_values, None
+            else :
+                yield row, row_values, decideRow(row_values)
+        return
 
-    return False
-    
+    batch = []
+    for row_item in row_items :
+        batch.append(row_item)
+        if len(batch) >= worker_batch_size * worker_count :
+            yield from decideBatch(batch)
+            batch = []
+    yield from decideBatch(batch)
+
+def decideBatch(batch) :
+    global worker_pool, worker_count, row_decider, ix_request, filter_engine
+    decide_values = [row_values for row, row_values in batch if row_values[ix_request] is not None]
+    if filter_engine == "pandas" :
+        decisions = iter(DropFrame.decideAll(decide_values, row_decider))
+    else :
+        decisions = iter(RowWorkers.decideAll(worker_pool, worker_count, decide_values, row_decider))
+    checkBlankLocations()
+    for row, row_values in batch :
+        if row_values[ix_request] is None :
+            yield row, row_values, None
+        else :
+            yield row, row_values, next(decisions)
 
     
 #   Process Roles Worksheet
@@ -467,42 +461,39 @@ if "skip_to_header" in parms_dict :
             MessageShow(f"Expected a positive number in the second argument of \"skip_to_header\" parameter, but found\"{index_number}\"  Defaulting to zero.")
             start_header_index = 0
         
-count_match = 0
-count_nomat = 0
-count_nofilter =0
-count_delet = 0
 process_count = 0
 rows_to_delete = []
-my_filter = ""
 min_data_row = 1
 
-for row_ix, row in enumerate(worksheet.iter_rows(min_row=1, max_row=12, values_only=False), start=1) :
-    if not have_header_row :
-        if start_header_value == "" :
-            have_header_row = True
-        elif start_header_value == row[start_header_index].value :
-            have_header_row = True
-        if have_header_row :
-            findRoleHeaders(row)
-            min_data_row = row_ix + 1
+run_stats.phase("header scan")
+first_rows = list(readRows(min_row=1, max_row=RoleReader.header_search_rows))
+header_row_number = RoleReader.findHeaderRow(first_rows, start_header_value, start_header_index)
+if header_row_number > 0 :
+    have_header_row = True
+    findRoleHeaders(first_rows[header_row_number - 1])
+    min_data_row = header_row_number + 1
 
 if not have_header_row :
-    MessageShow(f"Unable to locate the header row in \"{workbook.sheetnames[0]}\" worksheet.  Searched first 12 rows for \"{start_header_value}\" in column {start_header_index}.")
+    MessageShow(f"Unable to locate the header row in \"{worksheet_name}\" worksheet.  Searched first 12 rows for \"{start_header_value}\" in column {start_header_index}.")
     MessageShow("Terminating process.")
     MessageClose()
     sys.exit(1)
     
            
+left_wrap_alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
+format_col_ixs = []     # Streaming mode: indexes of the columns to format, as the rows are written.
 def formatColumnText(col_title) :
-    global role_headers, worksheet_name, min_data_row, worksheet
+    global role_headers, worksheet_name, min_data_row, worksheet, format_col_ixs
     if col_title not in role_headers :
         MessageShow(f"Did not find column title, \"{col_title}\" in the \"{worksheet_name}\" worksheet header.")
         MessageShow(f"The \"{col_title}\" title was specified in the \"format_cols\" parameter.")
         return
         
-    left_wrap_alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
     col_letter = get_column_letter(role_headers[col_title] + 1)     # Add 1 to the column index to point correctly.
     MessageShow(f"Formatting text alignment in column \"{col_title}\" ({col_letter}).")
+    if stream_rows :
+        format_col_ixs.append(role_headers[col_title])
+        return
     for row in range(min_data_row, worksheet.max_row + 1):
         cell = worksheet[f'{col_letter}{row}']
         cell.alignment = left_wrap_alignment
@@ -511,7 +502,7 @@ def formatColumnText(col_title) :
 #
 #   If inserting a column, make sure all column indexes greater than the insert columns are incremented.
 def bumpColIndexes(bump_ix) :
-    global ix_request, ix_colocat, ix_mylocat, drop_dict, role_headers
+    global ix_request, ix_colocat, ix_mylocat, drop_plan, role_headers
     
     if bump_ix < ix_request :
         ix_request += 1
@@ -520,102 +511,210 @@ def bumpColIndexes(bump_ix) :
     if bump_ix < ix_mylocat :
         ix_mylocat += 1
         
-    for drop_line in drop_dict :   # drop_dict contains the column number of all of the columns that are tested.
-        if bump_ix <= drop_dict[drop_line][0] :
-            drop_dict[drop_line][0] += 1
+    drop_plan.bumpColumns(bump_ix)     # drop_plan contains the column number of all of the columns that are tested.
     
     for key, value in role_headers.items():
         if bump_ix <= value :
             role_headers[key] += 1
             
+#   insertColumn() - Insert a column (at insert_ix, counting from A = 0) and write the column header.  In streaming mode, the column is inserted as each row is written.
+insert_cols_list = []   # (column index, column title) of the inserted columns, in insert order.
+def insertColumn(insert_ix, column_title) :
+    global worksheet, min_data_row, insert_cols_list
+    if not stream_rows :
+        worksheet.insert_cols(insert_ix + 1)
+        worksheet.cell(row=min_data_row - 1, column=insert_ix + 1, value=column_title)    # Write column header
+    insert_cols_list.append((insert_ix, column_title))
+    MessageShow(f"Inserting \"{column_title}\" column in \"{worksheet_name}\" worksheet.")
+
+run_stats.phase("insert")
 if ix_my_actn < 0 :
     column_title = parms_dict['col_my_act'][0]
-    worksheet.insert_cols(ix_mynsert + 2)   # Count plus two from specified column - to insert to right of specified column.
-    ix_my_actn = ix_mynsert + 1             # Count plus one from specified column - for index of new column.
-    worksheet.cell(row=min_data_row - 1, column=ix_my_actn + 1, value=column_title)    # Write column header
-    MessageShow(f"Inserting \"{parms_dict['col_my_act'][0]}\" column in \"{workbook.sheetnames[0]}\" worksheet.")
+    ix_my_actn = ix_mynsert + 1             # Count plus one from specified column - to insert to right of specified column.
+    insertColumn(ix_my_actn, column_title)
     MessageOut(f"ix_my_actn = {ix_my_actn}")
     bumpColIndexes(ix_my_actn)
     role_headers[column_title] = ix_my_actn
 if ix_my_fltr < 0 :
     column_title = parms_dict['col_my_filter'][0]
-    worksheet.insert_cols(ix_my_actn + 2)   # Count plus two from specified column - to insert to right of specified column.
-    ix_my_fltr = ix_my_actn + 1             # Count plus one from specified column - for index of new column.
-    worksheet.cell(row=min_data_row - 1, column=ix_my_fltr + 1, value=column_title)    # Write column header
-    MessageShow(f"Inserting \"{parms_dict['col_my_filter'][0]}\" column in \"{workbook.sheetnames[0]}\" worksheet.")
+    ix_my_fltr = ix_my_actn + 1             # Count plus one from specified column - to insert to right of specified column.
+    insertColumn(ix_my_fltr, column_title)
     MessageOut(f"ix_my_fltr = {ix_my_fltr}")
     bumpColIndexes(ix_my_fltr)
     role_headers[column_title] = ix_my_fltr
 
 
+for rule in location_rules :
+    rule.ix_colocat = ix_colocat
+    rule.ix_mylocat = ix_mylocat
+
+row_decider = DropRules.RowDecider(drop_plan, ix_request, action_dict, do_actual_delete)
+worker_pool = None
+if worker_count > 1 :
+    run_stats.phase("start workers")
+    MessageShow(f"Deciding rows in {worker_count} worker processes.")
+    worker_pool = RowWorkers.startPool(worker_count, row_decider)
+
+run_stats.phase("format")
 if "format_cols" in parms_dict :
     for col_title in parms_dict['format_cols'] :
         formatColumnText(col_title)
 
 
-for row_ix, row in enumerate(worksheet.iter_rows(min_row=min_data_row, max_row=worksheet.max_row, values_only=False), start=1) :
-         
-    if row[ix_request].value is not None :
-        this_request_value = row[ix_request].value
-        if isinstance(this_request_value, str) :
-            this_request_id = int(this_request_value)
-        else :
-            this_request_id = this_request_value
-            
-        my_filter = ""
-        found_filter = False
-        increment_blank = 0
-        if dropThisRow(row) :
-            count_delet += 1
-            if do_actual_delete :
-                rows_to_delete.append(row_ix + min_data_row - 1)
-            else :
-                my_filter = "DELETE"
-                found_filter = True
-        elif this_request_id in action_dict :
-            count_match += 1
-            row[ix_my_actn].value = action_dict[this_request_id]
-            increment_blank = 1
+#   insertStreamColumns() - Streaming mode: insert the new columns into a row of values read from the Roles Worksheet.
+def insertStreamColumns(row_values, header_row=False) :
+    global insert_cols_list
+    out_row = list(row_values)
+    for insert_ix, column_title in insert_cols_list :
+        while len(out_row) < insert_ix :
+            out_row.append(None)
+        if header_row :
+            out_row.insert(insert_ix, column_title)
         else :
-            count_nomat += 1
-            increment_blank = 1
-        
-        if found_filter :
-            row[ix_my_fltr].value = my_filter
-        else :
-            count_nofilter += increment_blank
+            out_row.insert(insert_ix, None)
+    return out_row
+
+#   streamCells() - Streaming mode: wrap the values that need formatting in write-only cells.
+def streamCells(out_row, data_row) :
+    global outsheet, format_col_ixs, left_wrap_alignment
+    for col_ix, cell_value in enumerate(out_row) :
+        is_date = isinstance(cell_value, datetime)
+        format_text = data_row and col_ix in format_col_ixs
+        if is_date or format_text :
+            write_cell = WriteOnlyCell(outsheet, value=cell_value)
+            if is_date :
+                write_cell.number_format = 'mm/dd/yyyy'
+            if format_text :
+                write_cell.alignment = left_wrap_alignment
+            out_row[col_ix] = write_cell
+    return out_row
+
+run_stats.phase("filter")     # Includes reading the rows - and, in streaming mode, writing them.
+if stream_rows :
+    outbook  = Workbook(write_only=True)
+    outsheet = outbook.create_sheet(worksheet_name)
+    out_row_count = 0
+    for row_ix, row_values in enumerate(readRows(min_row=1, max_row=min_data_row - 1), start=1) :
+        out_row = insertStreamColumns(row_values, row_ix == min_data_row - 1)
+        outsheet.append(streamCells(out_row, False))
+        out_row_count += 1
+
+    data_rows = ((None, insertStreamColumns(row_values)) for row_values in readRows(min_row=min_data_row))
+    for row, out_row, decision in decideRows(data_rows) :
+        if decision is not None :
+            drop_row, my_action, filter_value = decision
+            if drop_row :
+                continue
+            if my_action is not None :
+                out_row[ix_my_actn] = my_action
+            if filter_value is not None :
+                out_row[ix_my_fltr] = filter_value
+
+            process_count +=1
+            if process_count > 199 :
+                print("processing ....")
+                process_count = 0
+
+        out_row_count += 1
+        if len(format_col_ixs) > 0 :
+            outsheet.row_dimensions[out_row_count].height = 15
+        outsheet.append(streamCells(out_row, True))
 
-        process_count +=1
-        if process_count > 199 :
-            print("processing ....")
-            process_count = 0
-
-if do_actual_delete :
+else :
+    data_rows = (((row_ix, row), [cell.value for cell in row]) for row_ix, row in enumerate(worksheet.iter_rows(min_row=min_data_row, max_row=worksheet.max_row, values_only=False), start=1))
+    for (row_ix, row), row_values, decision in decideRows(data_rows) :
+         
+        if decision is not None :
+            drop_row, my_action, filter_value = decision
+            if drop_row :
+                rows_to_delete.append(row_ix + min_data_row - 1)
+            if my_action is not None :
+                row[ix_my_actn].value = my_action
+            if filter_value is not None :
+                row[ix_my_fltr].value = filter_value
+
+            process_count +=1
+            if process_count > 199 :
+                print("processing ....")
+                process_count = 0
+
+if worker_pool is not None :
+    worker_pool.close()
+    worker_pool.join()
+count_match    = row_decider.count_match
+count_nomat    = row_decider.count_nomat
+count_nofilter = row_decider.count_nofilter
+count_delet    = row_decider.count_delet
+
+#   compactRows() - Delete the listed rows (row numbers count from 1) in a single pass.  The kept rows (cells, with their styles, and row heights) are moved up to fill the gaps.
+#   Replaces calling worksheet.delete_rows() once per row - which shifts every cell below the deleted row on each call, and left the worksheet reporting the original number of rows.
+#   Note: Works directly on openpyxl internals - sheet._cells ({(row, column): Cell}, with cell.row) and the row_dimensions entries (dimension.index) - as they are in
+#   openpyxl 3.1 (checked with 3.1.5).  Check this function again when moving to a newer openpyxl.
+def compactRows(sheet, drop_rows) :
+    drop_set = set(drop_rows)
+    new_row_nums = {}
+    new_row = 0
+    for row in range(1, sheet.max_row + 1) :
+        if row not in drop_set :
+            new_row += 1
+            new_row_nums[row] = new_row
+
+    kept_cells = {}
+    for (row, col), cell in sheet._cells.items() :
+        if row in new_row_nums :
+            cell.row = new_row_nums[row]
+            kept_cells[(cell.row, col)] = cell
+    sheet._cells = kept_cells
+
+    kept_dimensions = {}
+    for row, dimension in sheet.row_dimensions.items() :
+        if row in new_row_nums :
+            dimension.index = new_row_nums[row]
+            kept_dimensions[dimension.index] = dimension
+    sheet.row_dimensions.clear()
+    sheet.row_dimensions.update(kept_dimensions)
+
+if stream_rows :
+    if do_actual_delete :
+        MessageShow(f"Dropped {count_delet} rows while writing the output workbook.")
+    else :
+        MessageShow(f"No rows actually deleted during this run. {count_delet} rows marked with \"DELETE\" in \"{parms_dict['col_my_filter'][0]}\" column.")
+elif do_actual_delete :
     MessageShow(f"Dropping {count_delet} rows.")            
-    deleting_count = 0
-    delete_to_go = count_delet
-    for row in reversed(rows_to_delete) :
-        worksheet.delete_rows(row, 1)
-    
-        deleting_count +=1
-        delete_to_go -= 1
-        if deleting_count > 99 :
-            print(f"deleting ....... {delete_to_go}")
-            deleting_count = 0
+    run_stats.phase("delete")
+    compactRows(worksheet, rows_to_delete)
+    MessageOut(f"Worksheet has {worksheet.max_row} rows after dropping rows.")
 else :
     MessageShow(f"No rows actually deleted during this run. {count_delet} rows marked with \"DELETE\" in \"{parms_dict['col_my_filter'][0]}\" column.")
         
-workbook.save(workbook_out)
-
-for drop_line in drop_dict :
-    drop_tally = drop_dict[drop_line][1]
-    drop_key_ix = drop_dict[drop_line][2]
-    drop_parm_ix = parms_dict['droprows'][drop_key_ix]
-    drop_header = parms_dict[drop_parm_ix][0]
-    if drop_tally > 0 :
-        MessageShow(f"Dropped {drop_tally} rows b/c \"{drop_header}\" value.")
+run_stats.phase("save")
+if stream_rows :
+    outbook.save(workbook_out)
+    if workbook is not None :
+        workbook.close()
+else :
+    workbook.save(workbook_out)
+
+run_stats.phase("report")
+reportLocations()
+for rule in drop_plan.rules :
+    if rule.count > 0 :
+        MessageShow(f"Dropped {rule.count} rows b/c \"{rule.col_header}\" value.")
         
 MessageShow(f"{count_match} rows matched, {count_nomat} rows not matched, from {count_match + count_nomat} output rows")
 MessageShow(f"{count_nofilter} output rows with blank in \"{parms_dict['col_my_filter'][0]}\" column.")
 MessageShow(f"Worksheet saved to {workbook_out}.")
+
+run_stats.setRows(count_match + count_nomat + count_delet)
+run_stats.count("actions", len(action_dict))
+run_stats.count("action_cache", action_store.from_cache)
+run_stats.count("rows_matched", count_match)
+run_stats.count("rows_not_matched", count_nomat)
+run_stats.count("rows_no_filter", count_nofilter)
+run_stats.count("rows_dropped", count_delet)
+run_stats.count("streaming", stream_rows)
+run_stats.count("workers", worker_count)
+run_stats.count("filter_engine", filter_engine)
+run_stats.addConditions(drop_plan.rules)
+run_stats.writeSection(MessageOut)
 MessageClose()
\ No newline at end of file
@@ -0,0 +1,68 @@
+# Pipeline.py - Run MyLocation.py and MySource.py as stages of one process.  The roles workbook is read once, and written once (as <workbook>_out.xlsx).
+
+# Usage: python Pipeline.py [--workers N] <MyLocation control file> <MySource control file> <workbook>
+#   <workbook> is the name of the roles workbook in the MySource.py "inputdir" directory (as for MySource.py).
+#   "--workers N" is passed on to MySource.py.
+#
+# Each stage runs the script itself - with the same Control File, checks, and output message file as when it is run on its own.  The difference is that MyLocation.py
+# hands the workbook (with My Location added) to MySource.py in memory, instead of saving it - so the input workbook is left as it is.  (See PipelineStage.py.)
+# MyLocation.py "streaming True" is not used as a stage - the workbook is already in memory.  MySource.py "streaming True" still writes the output rows as they are decided.
+#
+# If a stage ends with an error, the pipeline stops there.
+
+import sys
+import time
+import runpy
+from pathlib import Path
+from datetime import datetime
+import ReadControl
+import PipelineStage
+
+arguments = sys.argv[0:]  # List of all arguments.  arguments[0] = <script name>  arguments[1] = <MyLocation Control File>  arguments[2] = <MySource Control File>  arguments[3] = <workbook>
+now_time = datetime.now()
+print("Python script " + arguments[0] + " started at " + now_time.strftime("%Y-%m-%d %H:%M:%S"))
+
+worker_args = []
+if "--workers" in arguments :
+    flag_ix = arguments.index("--workers")
+    worker_args = arguments[flag_ix:flag_ix + 2]
+    del arguments[flag_ix:flag_ix + 2]
+
+if len(arguments) < 4 :
+    print("Missing required command line parameters.")
+    print(arguments)
+    print(f"Usage: python {sys.argv[0]} [--workers N] <MyLocation control file> <MySource control file> <workbook>")
+    print("Terminating process.")
+    sys.exit(1)
+
+# Both Control Files are checked before either stage starts - so a missing MySource.py parameter is found before MyLocation.py updates the workbook.
+err_code, location_parms = ReadControl.read(arguments[1], True, ReadControl.script_schemas["MyLocation.py"])
+if err_code == 0 :
+    err_code, source_parms = ReadControl.read(arguments[2], True, ReadControl.script_schemas["MySource.py"])
+if err_code > 0 :
+    print("Terminating process.")
+    sys.exit(1)
+workbook_path = source_parms['inputdir'][0] + "\\" + arguments[3]
+
+script_dir = Path(__file__).resolve().parent
+stages = [("MyLocation.py", [arguments[1], workbook_path]),
+          ("MySource.py",   worker_args + [arguments[2], arguments[3]])]
+
+PipelineStage.active = True
+for stage_name, stage_args in stages :
+    print(" ")
+    print(f"--- Stage: {stage_name} ---")
+    stage_start = time.perf_counter()
+    sys.argv = [str(script_dir / stage_name)] + stage_args
+    try:
+        runpy.run_path(sys.argv[0], run_name="__main__")
+    except SystemExit as stage_exit:
+        if stage_exit.code not in (None, 0) :
+            print(f"Stage {stage_name} ended with an error - pipeline stopped.")
+            sys.exit(stage_exit.code)
+    print(f"--- {stage_name} took {time.perf_counter() - stage_start:.2f} seconds ---")
+
+PipelineStage.active = False
+PipelineStage.rolebook = None
+print(" ")
+print(f"Pipeline finished in {(datetime.now() - now_time).total_seconds():.2f} seconds.")
@@ -0,0 +1,6 @@
+# PipelineStage.py - Pass the roles workbook from MyLocation.py to MySource.py, when the two scripts are run as stages of Pipeline.py (in one process).
+
+# When the scripts are run on their own, "active" is False and "rolebook" is None - each script reads (and saves) the workbook itself.
+
+active = False          # True while Pipeline.py is running the stages.
+rolebook = None         # openpyxl Workbook - read by MyLocation.py, with My Location added.  Used by MySource.py in place of reading the workbook file.
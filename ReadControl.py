@@ -1,10 +1,163 @@
 # ReadControl.py - Utility script for reading control file.
 
-# Suggested Enhancements:
-#       Define class ReadControl.
-#       Add method to verify that parameter exists and has the requisite number of variables.
+# The Control File is parsed (shlex) into a dictionary:  first token of each line is the key, the following tokens the value (a list, if return_lists is True).
+# If a ControlSchema is given, the parameters are checked - required parameters present, with the requisite number of arguments - before the calling script opens any workbook.
+# The schema of each script is listed in script_schemas (below).
+#
+# The parsed (and checked) dictionary is kept in a cache file next to the Control File (<Control File name>.cache), keyed by a hash of the Control File content -
+# so a run with an unchanged Control File does not parse it again.  (A changed Control File - or a different schema - is parsed or checked again, and the cache rewritten.)
 
 import shlex
+import hashlib
+import CacheFile
+
+cache_version = 1
+
+
+#   ControlSchema - The parameters a script needs in its Control File.
+#     required  - {parameter: minimum number of arguments}
+#     optional  - {parameter: minimum number of arguments} - checked only if the parameter is specified.
+#     one_of    - List of tuples of parameters - at least one of each tuple must be specified (with an argument).
+#     key_lists - {parameter: minimum number of arguments} - each argument of the parameter names another parameter, which must be specified with at least that number of
+#                 arguments ("droprows" conditions, "locompare" lists).
+class ControlSchema:
+
+    def __init__(self, required=None, optional=None, one_of=(), key_lists=None):
+        self.required = dict(required or {})
+        self.optional = dict(optional or {})
+        self.one_of = [tuple(parm_keys) for parm_keys in one_of]
+        self.key_lists = dict(key_lists or {})
+
+    #   key() - Identifies the schema in the cache file - a cached dictionary checked against a different schema is checked again.
+    def key(self):
+        return (sorted(self.required.items()), sorted(self.optional.items()), self.one_of, sorted(self.key_lists.items()))
+
+    #   check() - Returns the list of error messages (empty, if the parameters are as the schema needs).
+    def check(self, parms_dict, control_name="Control File"):
+        errors = []
+        for parm_key, min_args in self.required.items() :
+            if parm_key not in parms_dict :
+                errors.append(f"\"{parm_key}\" parameter not found in {control_name}.")
+            else :
+                errors += checkArguments(parms_dict, parm_key, min_args, control_name)
+        for parm_key, min_args in self.optional.items() :
+            if parm_key in parms_dict :
+                errors += checkArguments(parms_dict, parm_key, min_args, control_name)
+        for parm_keys in self.one_of :
+            if not any(argumentCount(parms_dict.get(parm_key)) > 0 for parm_key in parm_keys) :
+                parm_names = ", ".join('"' + parm_key + '"' for parm_key in parm_keys)
+                errors.append(f"One of the parameters {parm_names} should be specified in {control_name}.")
+        for list_key, min_args in self.key_lists.items() :
+            list_value = parms_dict.get(list_key)
+            for parm_key in (list_value if isinstance(list_value, list) else [] if list_value is None else [list_value]) :
+                if parm_key not in parms_dict :
+                    errors.append(f"\"{parm_key}\" parameter listed in \"{list_key}\" but is not specified in {control_name}.")
+                else :
+                    errors += checkArguments(parms_dict, parm_key, min_args, control_name)
+        return errors
+
+
+def argumentCount(parm_value) :
+    if isinstance(parm_value, list) :
+        return len(parm_value)
+    return 0 if parm_value is None else 1
+
+def checkArguments(parms_dict, parm_key, min_args, control_name) :
+    if argumentCount(parms_dict[parm_key]) < min_args :
+        return [f"\"{parm_key}\" parameter in {control_name} should have at least {min_args} argument{'' if min_args == 1 else 's'}."]
+    return []
+
+
+#   Control File parameters of each script - checked when the Control File is read.
+script_schemas = {
+    "MyLocation.py": ControlSchema(required={"messagdir": 1, "locatsheet": 1, "col_request": 1, "col_projlocat": 1, "col_location": 1, "locompare": 1},
+                                   optional={"col_reqoffice": 1, "skip_header": 1, "geotable": 1},
+                                   key_lists={"locompare": 2}),
+    "MySource.py":   ControlSchema(required={"messagdir": 1, "inputdir": 1, "droprows": 1, "col_request": 1, "col_my_act": 1, "col_my_filter": 1, "col_colocation": 1,
+                                             "col_mylocation": 1, "col_my_insert": 1, "col_act_rqust": 1, "col_action": 1, "col_action_dt": 1},
+                                   optional={"dropactual": 1, "filtersheet": 2, "skip_to_header": 0},
+                                   one_of=[("actionf", "actionstore")],
+                                   key_lists={"droprows": 2}),
+    "Apply.py":      ControlSchema(required={"messagdir": 1, "inputdir": 1, "targetsheet": 1, "copycols": 2},
+                                   optional={"skip_header": 1}),
+    "Mario.py":      ControlSchema(required={"messagdir": 1, "contrlsheet": 2, "inputdir": 1, "key_column": 1},
+                                   one_of=[("actionsheet", "actionstore")]),
+    "ActionSync.py": ControlSchema(required={"messagdir": 1, "actionstore": 1, "actionsheet": 1, "key_column": 1}),
+}
+
+
+class ReadControl:
+
+    def __init__(self, control_path, return_lists=False, schema=None, use_cache=True):
+        self.control_path = control_path
+        self.cache_path = control_path + ".cache"
+        self.return_lists = return_lists
+        self.schema = schema
+        self.use_cache = use_cache
+        self.parms_dict = None
+        self.errors = []
+        self.from_cache = False
+
+    #   load() - Read the Control File (or its cache file).  Returns True if successful, otherwise the messages are in self.errors.
+    def load(self):
+        try:
+            with open(self.control_path, 'r') as input_file :
+                control_text = input_file.read()
+        except FileNotFoundError:
+            self.errors.append(f"Control File \"{self.control_path}\" not found.")
+            return False
+        control_hash = hashlib.blake2b(control_text.encode(), digest_size=16).hexdigest()
+        schema_key = None if self.schema is None else self.schema.key()
+
+        cached = self.readCache(control_hash) if self.use_cache else None
+        if cached is not None :
+            self.parms_dict = cached['parms']
+            self.from_cache = True
+            if cached['schema'] == schema_key :
+                return True         # Parsed and checked against this schema before.
+        elif not self.parse(control_text) :
+            return False
+
+        if self.schema is not None :
+            self.errors = self.schema.check(self.parms_dict, f"Control File \"{self.control_path}\"")
+            if len(self.errors) > 0 :
+                return False
+        if self.use_cache :
+            self.writeCache(control_hash, schema_key)
+        return True
+
+    def parse(self, control_text):
+        parms_dict = {}
+        for line_number, line in enumerate(control_text.splitlines(), start=1) :
+            try:
+                parm_tokens = shlex.split(line.strip())
+            except ValueError as err:        # No closing quotation, for example.
+                self.errors.append(f"Line {line_number} of Control File \"{self.control_path}\" could not be read: {err}")
+                return False
+            if self.return_lists :
+                if len(parm_tokens) > 1:
+                    parms_dict[parm_tokens[0]] = parm_tokens[1:]
+                elif len(parm_tokens) == 1:
+                    parms_dict[parm_tokens[0]] = []
+            else :
+                if len(parm_tokens) > 1:
+                    parms_dict[parm_tokens[0]] = parm_tokens[1]
+                elif len(parm_tokens) == 1:
+                    parms_dict[parm_tokens[0]] = None
+
+        if len(parms_dict) < 1 :
+            self.errors.append(f"Did not find any parameters in Control File \"{self.control_path}\".")
+            return False
+        self.parms_dict = parms_dict
+        return True
+
+    #   readCache() - The cache content, if it is for this Control File content (and return_lists).  Otherwise None.
+    def readCache(self, control_hash):
+        return CacheFile.readPickle(self.cache_path, version=cache_version, hash=control_hash, return_lists=self.return_lists)
+
+    def writeCache(self, control_hash, schema_key):
+        CacheFile.writePickle(self.cache_path, {'version': cache_version, 'hash': control_hash, 'return_lists': self.return_lists, 'schema': schema_key, 'parms': self.parms_dict})
+
 
 def help() :
     print("ReadControl.py - Utility script for reading control file.")
@@ -12,42 +165,23 @@ def help() :
     print("   import ReadControl   # then, call individual functions (see below)")
     print("\nFunctions:")
     print("\n    ReadControl.help()            # displays information about ReadControl.py   No return values.")
-    print("\n    ReadControl.read(<path>, <return_lists>)")
+    print("\n    ReadControl.read(<path>, <return_lists>, <schema>)")
     print("       path = full path to control file")
     print("       return_lists (optional) = boolean - defaults to False: return maximum one value per key, as string object.  If True, will return Disctionary values as List objects.")
+    print("       schema (optional) = ControlSchema object (for example, ReadControl.script_schemas[\"Mario.py\"]) - required parameters and their number of arguments.")
     print("    Returns: <return_code> <dictionary>")
     print("       return_code: 0 = successful completion, any other value => error")
     print("       dictionary: dictionary object")
+    print("\nClasses:")
+    print("\n    ReadControl.ReadControl(<path>, <return_lists>, <schema>, <use_cache>)   # load() returns True if successful - then see parms_dict, otherwise errors.")
+    print("    ReadControl.ControlSchema(required, optional, one_of, key_lists)")
     print(" ")
     
-#   function ReadControl.read(<path>, <return_lists>) - Read Control File and load values into a dictionary object.
-def read(control_path, return_lists=False) :
-    try:
-        input_file = open(control_path, 'r')
-    except FileNotFoundError:
-        print(f"Control File \"{control_path}\" not found.")
-        return 1, None
-        
-    parms_dict = {}
-    for line in input_file:
-        parm_tokens = shlex.split(line.strip())     # Development note: need to catch ValueError: No closing quotation - in case the Control File has unbalanced quotation marks. 
-        if return_lists :
-            if len(parm_tokens) > 1:
-               return_list = parm_tokens[1:]
-               parms_dict[parm_tokens[0]] = return_list
-            elif len(parm_tokens) == 1:
-               return_list = []
-               parms_dict[parm_tokens[0]] = return_list
-        else :
-            if len(parm_tokens) > 1:
-                parms_dict[parm_tokens[0]] = parm_tokens[1]
-            elif len(parm_tokens) == 1:
-                parms_dict[parm_tokens[0]] = None
-            
-    if len(parms_dict) < 1 :
-        print(f"Did not find any parameters in Control File \"{control_path}\".")
+#   function ReadControl.read(<path>, <return_lists>, <schema>) - Read Control File and load values into a dictionary object.  Errors are printed.
+def read(control_path, return_lists=False, schema=None) :
+    control_reader = ReadControl(control_path, return_lists, schema)
+    if not control_reader.load() :
+        for error in control_reader.errors :
+            print(error)
         return 1, None
-            
-    input_file.close()
-    return 0, parms_dict
-    
\ No newline at end of file
+    return 0, control_reader.parms_dict
@@ -0,0 +1,465 @@
+# RoleReader.py - Read a role export (the Roles Worksheet downloaded from GPS or MySource) as columns of cell values - from an xlsx workbook, a CSV file, or a Parquet file.
+
+# readRoles(path) returns a RoleTable - the cell values of the (active) worksheet, by column.  The file type is taken from the file name extension:
+#   .xlsx     - Values-only parser (readXlsx) - the worksheet XML is read directly, without making openpyxl cell objects.  Returns the same values as openpyxl
+#               (numbers as int or float, dates as datetime, formulas as "=..." text).  Cell formatting is not read.
+#   .csv      - Read with the csv module.  Whole numbers are converted to int (so that Request IDs match the Action File), and mm/dd/yyyy or yyyy-mm-dd dates to datetime.
+#   .parquet  - Read with pyarrow (pip install pyarrow).  Each Parquet column is a worksheet column - the column names are the header row.
+#
+# A converted copy of each xlsx or CSV file is kept next to it, and read in its place as long as the file has not changed (modification time and size - as for the
+# Action File cache, see ActionStore.py):  <file>.parquet if pyarrow is installed, otherwise <file>.cache (pickle).  Either can be deleted at any time.
+#
+# streamRoles(path) returns a RoleRows instead - the same rows, read from the file as they are needed (streaming mode), so that the values of the whole worksheet are
+# never held in memory at once.  No cache file is read or written.
+#
+# Header detection - shared by MyLocation.py, MySource.py, Mario.py, and Apply.py.  Each takes lists of cell values:
+#   findHeaderRow() - "skip_to_header <column title> <column index>": the first of the first 12 rows with the title in that column.  (No title: the first row.)
+#   skipHeaderRow() - "skip_header <column title>": the second row if the title is in the first column of the first row (GPS Open Demands Report), otherwise the first row.
+#   headerIndex()   - Dictionary of column title (stripped): column index.
+
+import os
+import re
+import csv
+import json
+import zipfile
+import posixpath
+from datetime import datetime
+from xml.etree.ElementTree import iterparse, parse
+import CacheFile
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    have_pyarrow = True
+except ModuleNotFoundError:
+    have_pyarrow = False
+
+cache_version = 1   # Increment if the content of the cache files changes - older cache files are then ignored.
+header_search_rows = 12
+
+main_ns = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+rel_ns  = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+package_rel_ns = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+#   headerIndex() - Dictionary of column title: column index, for a row of header values.  (Where a title is repeated, the last column is used.)
+def headerIndex(header_values) :
+    role_headers = {}
+    for idx, header_value in enumerate(header_values) :
+        if isinstance(header_value, str) :
+            role_headers[header_value.strip()] = idx
+    return role_headers
+
+#   findHeaderRow() - Row number (1 = first row) of the header row, in the first rows of the worksheet (lists of values).  0 if not found.
+def findHeaderRow(first_rows, start_header_value="", start_header_index=0) :
+    for row_ix, row_values in enumerate(first_rows, start=1) :
+        if row_ix > header_search_rows :
+            break
+        if start_header_value == "" :
+            return row_ix
+        if start_header_index < len(row_values) and row_values[start_header_index] == start_header_value :
+            return row_ix
+    return 0
+
+#   skipHeaderRow() - Row number of the header row: 2 if skip_header is the title of the first column of the first row, otherwise 1.
+def skipHeaderRow(first_row, skip_header=None) :
+    if skip_header is not None and headerIndex(first_row).get(skip_header) == 0 :
+        return 2
+    return 1
+
+
+class RoleTable:
+
+    def __init__(self, title, columns, row_count):
+        self.title = title              # Worksheet title.
+        self.columns = columns          # List of columns - each a list of the cell values, one per row (None for an empty cell).
+        self.row_count = row_count
+        self.source = None              # "xlsx", "csv", "parquet", or "cache" - how the values were read.
+
+    #   rows() - The rows from min_row to max_row (1 = first row), as tuples of values - the same as openpyxl iter_rows(values_only=True).
+    #   With col_ixs (list of column indexes), each tuple holds only the values of those columns, in that order.
+    def rows(self, min_row=1, max_row=None, col_ixs=None):
+        if max_row is None or max_row > self.row_count :
+            max_row = self.row_count
+        columns = self.columns
+        if col_ixs is not None :
+            columns = [self.columns[col_ix] if col_ix < len(self.columns) else [None] * self.row_count for col_ix in col_ixs]
+        if len(columns) == 0 :
+            return iter([()] * max(0, max_row - min_row + 1))
+        return zip(*(column[min_row - 1:max_row] for column in columns))
+
+
+#   RoleRows - Same title, source, and rows() as RoleTable - but each call of rows() reads the file again, one row at a time.  (The number of rows is not known.)
+class RoleRows:
+
+    def __init__(self, title, width, row_source, source):
+        self.title = title              # Worksheet title.
+        self.width = width              # Number of columns - each row is padded with None to this width (as openpyxl does in read-only mode), or to the widest row before it.
+        self.row_source = row_source    # Function that returns an iterator of the rows of the file - lists of values (an empty list for a missing row).
+        self.source = source            # "xlsx", "csv", or "parquet".
+
+    #   rows() - The rows from min_row to max_row (1 = first row), as tuples of values - the same as openpyxl iter_rows(values_only=True).
+    def rows(self, min_row=1, max_row=None):
+        for row_number, row_values in enumerate(self.row_source(), start=1) :
+            if max_row is not None and row_number > max_row :
+                break
+            if len(row_values) > self.width :
+                self.width = len(row_values)
+            if row_number < min_row :
+                continue
+            if len(row_values) < self.width :
+                row_values.extend([None] * (self.width - len(row_values)))
+            yield tuple(row_values)
+
+
+#   readRoles() - Read the file (or its cache file).  Returns a RoleTable.  Raises OSError (or ValueError, for a file that cannot be read as the type given by its extension).
+def readRoles(file_path, use_cache=True) :
+    file_type = os.path.splitext(file_path)[1].lower()
+    if file_type == ".parquet" :
+        return readParquet(file_path)
+    if file_type not in (".xlsx", ".xlsm", ".csv") :
+        raise ValueError(f"Cannot read {file_path} - expected an .xlsx, .csv, or .parquet file.")
+
+    file_stamp = list(CacheFile.fileStamp(file_path))     # A list - as it comes back from the JSON metadata of the Parquet cache file.
+    if use_cache :
+        role_table = readCache(file_path, file_stamp)
+        if role_table is not None :
+            return role_table
+
+    if file_type == ".csv" :
+        role_table = readCsv(file_path)
+    else :
+        role_table = readXlsx(file_path)
+    if use_cache :
+        writeCache(file_path, file_stamp, role_table)
+    return role_table
+
+
+#   streamRoles() - RoleRows for the file (or, for a Parquet file written by writeCache(), its RoleTable).  Raises OSError (or ValueError, for a file that cannot be read
+#   as the type given by its extension).
+def streamRoles(file_path) :
+    file_type = os.path.splitext(file_path)[1].lower()
+    if file_type == ".parquet" :
+        return parquetRows(file_path)
+    if file_type == ".csv" :
+        return csvRows(file_path)
+    if file_type in (".xlsx", ".xlsm") :
+        sheet_title, sheet_width, sheetRows = xlsxRows(file_path)
+        return RoleRows(sheet_title, sheet_width, sheetRows, "xlsx")
+    raise ValueError(f"Cannot read {file_path} - expected an .xlsx, .csv, or .parquet file.")
+
+
+#   readXlsx() - Values-only read of the active worksheet of an xlsx workbook.
+def readXlsx(file_path) :
+    sheet_title, sheet_width, sheetRows = xlsxRows(file_path)
+    return columnTable(sheet_title, list(sheetRows()), "xlsx")
+
+#   xlsxRows() - The worksheet title, the number of columns (from the worksheet <dimension> - 0 if there is none), and a function that reads the rows of the active worksheet - each a list
+#   of values.  The workbook, shared strings, and styles are read here, once; the worksheet is read each time the function is called.
+def xlsxRows(file_path) :
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+    from openpyxl.utils.datetime import from_excel, from_ISO8601, WINDOWS_EPOCH, MAC_EPOCH
+
+    with zipfile.ZipFile(file_path) as archive :
+        archive_names = set(archive.namelist())
+
+        # Worksheet title and path, from the workbook and its relationships.
+        workbook_root = parse(archive.open("xl/workbook.xml")).getroot()
+        epoch = WINDOWS_EPOCH
+        workbook_pr = workbook_root.find(main_ns + "workbookPr")
+        if workbook_pr is not None and workbook_pr.get("date1904") in ("1", "true") :
+            epoch = MAC_EPOCH
+        active_tab = 0
+        workbook_view = workbook_root.find(main_ns + "bookViews/" + main_ns + "workbookView")
+        if workbook_view is not None :
+            active_tab = int(workbook_view.get("activeTab", 0))
+        rel_targets = {}
+        for relationship in parse(archive.open("xl/_rels/workbook.xml.rels")).getroot().iter(package_rel_ns + "Relationship") :
+            target = relationship.get("Target")
+            rel_targets[relationship.get("Id")] = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        sheets = [(sheet.get("name"), rel_targets.get(sheet.get(rel_ns + "id"))) for sheet in workbook_root.iter(main_ns + "sheet")]
+        sheets = [(sheet_title, sheet_path) for sheet_title, sheet_path in sheets if sheet_path in archive_names and "worksheets/" in sheet_path]
+        if len(sheets) == 0 :
+            raise ValueError(f"No worksheet found in {file_path}.")
+        sheet_title, sheet_path = sheets[min(active_tab, len(sheets) - 1)]
+
+        # Shared strings - the text of each <si>, without phonetic runs (as openpyxl).
+        shared_strings = []
+        if "xl/sharedStrings.xml" in archive_names :
+            for event, element in iterparse(archive.open("xl/sharedStrings.xml")) :
+                if element.tag == main_ns + "si" :
+                    shared_strings.append(stringText(element).replace('x005F_', ''))
+                    element.clear()
+
+        # Styles that format numbers as dates (or times).
+        date_styles = set()
+        timedelta_styles = set()
+        if "xl/styles.xml" in archive_names :
+            styles_root = parse(archive.open("xl/styles.xml")).getroot()
+            custom_formats = {}
+            for num_fmt in styles_root.iter(main_ns + "numFmt") :
+                custom_formats[int(num_fmt.get("numFmtId"))] = num_fmt.get("formatCode")
+            cell_xfs = styles_root.find(main_ns + "cellXfs")
+            if cell_xfs is not None :
+                for style_ix, xf in enumerate(cell_xfs.iter(main_ns + "xf")) :
+                    num_fmt_id = int(xf.get("numFmtId", 0))
+                    format_code = custom_formats.get(num_fmt_id, BUILTIN_FORMATS.get(num_fmt_id))
+                    if format_code is None :
+                        continue
+                    if is_date_format(format_code) :
+                        date_styles.add(str(style_ix))
+                    if is_timedelta_format(format_code) :
+                        timedelta_styles.add(str(style_ix))
+
+        # Number of columns - from the <dimension> element, before the rows.  (A workbook written in write-only mode has none.)
+        sheet_width = 0
+        for event, element in iterparse(archive.open(sheet_path), events=("start",)) :
+            if element.tag == main_ns + "dimension" :
+                last_reference = element.get("ref", "").split(":")[-1]
+                if last_reference != "" :
+                    sheet_width = columnIndex(last_reference) + 1
+                break
+            if element.tag == main_ns + "sheetData" :
+                break
+
+    row_tag, cell_tag, value_tag, formula_tag, inline_tag = main_ns + "row", main_ns + "c", main_ns + "v", main_ns + "f", main_ns + "is"
+
+    #   cellValues() - The values of the cells of a <row> element.
+    def cellValues(element) :
+        row_values = []
+        for cell in element.iter(cell_tag) :
+            reference = cell.get("r")
+            if reference is not None :
+                col_ix = columnIndex(reference)
+                if col_ix > len(row_values) :
+                    row_values.extend([None] * (col_ix - len(row_values)))
+            data_type = cell.get("t", "n")
+            formula = cell.find(formula_tag)
+            if formula is not None :
+                value = "=" + (formula.text or "")
+            elif data_type == "inlineStr" :
+                inline = cell.find(inline_tag)
+                value = None if inline is None else stringText(inline)
+            else :
+                value = cell.findtext(value_tag) or None
+                if value is not None :
+                    if data_type == "n" :
+                        value = float(value) if ("." in value or "E" in value or "e" in value) else int(value)
+                        style_id = cell.get("s")
+                        if style_id in date_styles :
+                            try:
+                                value = from_excel(value, epoch, timedelta=style_id in timedelta_styles)
+                            except (OverflowError, ValueError):
+                                value = "#VALUE!"
+                    elif data_type == "s" :
+                        value = shared_strings[int(value)]
+                    elif data_type == "b" :
+                        value = bool(int(value))
+                    elif data_type == "d" :
+                        value = from_ISO8601(value)
+            row_values.append(value)
+        return row_values
+
+    #   sheetRows() - The rows of the worksheet, parsed one at a time.
+    def sheetRows() :
+        with zipfile.ZipFile(file_path) as archive :
+            row_count = 0
+            sheet_data = None
+            for event, element in iterparse(archive.open(sheet_path), events=("start", "end")) :
+                if event == "start" :
+                    if element.tag == main_ns + "sheetData" :
+                        sheet_data = element
+                    continue
+                if element.tag != row_tag :
+                    continue
+                row_number = element.get("r")
+                if row_number is not None :
+                    while row_count < int(row_number) - 1 :
+                        row_count += 1
+                        yield []     # Missing (empty) row.
+                row_count += 1
+                yield cellValues(element)
+                if sheet_data is not None :
+                    sheet_data.clear()      # Rows already read - so that the parsed worksheet does not grow with each row.
+
+    return sheet_title, sheet_width, sheetRows
+
+
+#   stringText() - Text of a shared string (<si>) or inline string (<is>) element: the <t> text, and the text of each run (<r>).
+def stringText(element) :
+    snippets = []
+    plain = element.find(main_ns + "t")
+    if plain is not None and plain.text is not None :
+        snippets.append(plain.text)
+    for run in element.findall(main_ns + "r") :
+        run_text = run.findtext(main_ns + "t")
+        if run_text is not None :
+            snippets.append(run_text)
+    return "".join(snippets)
+
+column_ixs = {}
+def columnIndex(reference) :
+    col_letters = reference.rstrip("0123456789")
+    if col_letters not in column_ixs :
+        col_ix = 0
+        for col_letter in col_letters :
+            col_ix = col_ix * 26 + ord(col_letter) - 64
+        column_ixs[col_letters] = col_ix - 1
+    return column_ixs[col_letters]
+
+#   columnTable() - RoleTable from a list of rows (lists of values, possibly of different lengths).
+def columnTable(title, rows, source) :
+    width = max((len(row_values) for row_values in rows), default=0)
+    for row_values in rows :
+        if len(row_values) < width :
+            row_values.extend([None] * (width - len(row_values)))
+    role_table = RoleTable(title, [list(column) for column in zip(*rows)], len(rows))
+    role_table.source = source
+    return role_table
+
+
+int_pattern  = re.compile(r"-?(0|[1-9][0-9]*)$")
+date_formats = ["%m/%d/%Y", "%Y-%m-%d", "%m/%d/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M", "%Y-%m-%dT%H:%M:%S"]
+
+def csvValue(text) :
+    if text == "" :
+        return None
+    if int_pattern.match(text) and len(text) < 19 :
+        return int(text)
+    if text[0].isdigit() and ("/" in text or "-" in text) :
+        for date_format in date_formats :
+            try:
+                return datetime.strptime(text, date_format)
+            except ValueError:
+                pass
+    return text
+
+def readCsv(file_path) :
+    with open(file_path, newline="", encoding="utf-8-sig") as csv_file :
+        rows = [[csvValue(text) for text in csv_row] for csv_row in csv.reader(csv_file)]
+    return columnTable(fileTitle(file_path), rows, "csv")
+
+def csvRows(file_path) :
+    def sheetRows() :
+        with open(file_path, newline="", encoding="utf-8-sig") as csv_file :
+            for csv_row in csv.reader(csv_file) :
+                yield [csvValue(text) for text in csv_row]
+    return RoleRows(fileTitle(file_path), 0, sheetRows, "csv")
+
+#   fileTitle() - Worksheet title for a CSV or Parquet file: the file name, without the characters that Excel does not allow in a worksheet title.
+title_pattern = re.compile(r"[\\/?*:\[\]]")
+def fileTitle(file_path) :
+    title = os.path.splitext(re.split(r"[\\/]", file_path)[-1])[0]
+    return title_pattern.sub("_", title)[:31] or "Roles"
+
+
+#   readParquet() - A Parquet file written by writeCache() (the RoleTable is read back as it was), or any other Parquet file (the column names are the header row).
+def readParquet(file_path) :
+    if not have_pyarrow :
+        raise ValueError(f"Cannot read {file_path} - pyarrow is not installed.  (pip install pyarrow)")
+    parquet_table = pyarrow.parquet.read_table(file_path)
+    table_info = tableInfo(parquet_table)
+    if table_info is not None :
+        return parquetRoleTable(parquet_table, table_info)
+    columns = [[column_name] + parquet_table.column(column_name).to_pylist() for column_name in parquet_table.column_names]
+    role_table = RoleTable(fileTitle(file_path), columns, parquet_table.num_rows + 1)
+    role_table.source = "parquet"
+    return role_table
+
+#   parquetRows() - RoleRows for a Parquet file, read a batch of rows at a time.  (A Parquet file written by writeCache() is read by readParquet().)
+def parquetRows(file_path) :
+    if not have_pyarrow :
+        raise ValueError(f"Cannot read {file_path} - pyarrow is not installed.  (pip install pyarrow)")
+    schema = pyarrow.parquet.read_schema(file_path)
+    if b"role_table" in (schema.metadata or {}) :
+        return readParquet(file_path)
+    def sheetRows() :
+        yield list(schema.names)
+        for record_batch in pyarrow.parquet.ParquetFile(file_path).iter_batches() :
+            for row_values in zip(*(batch_column.to_pylist() for batch_column in record_batch.columns)) :
+                yield list(row_values)
+    return RoleRows(fileTitle(file_path), len(schema.names), sheetRows, "parquet")
+
+def tableInfo(parquet_table) :
+    schema_metadata = parquet_table.schema.metadata or {}
+    if b"role_table" not in schema_metadata :
+        return None
+    return json.loads(schema_metadata[b"role_table"])
+
+
+#   Cache files.  In the Parquet cache file, each column of the RoleTable is stored as one Parquet column per type of value in it ("<column index>:<type>") - so that a
+#   column with both int and str values (as Request ID often has) comes back with the same values.  The title and the row and column layout are kept in the file metadata.
+def cachePath(file_path) :
+    return file_path + (".parquet" if have_pyarrow else ".cache")
+
+def readCache(file_path, file_stamp) :
+    cache_path = cachePath(file_path)
+    try:
+        if have_pyarrow :
+            parquet_table = pyarrow.parquet.read_table(cache_path)
+            table_info = tableInfo(parquet_table)
+            if table_info is None or table_info.get('version') != cache_version or table_info.get('stamp') != file_stamp :
+                return None
+            role_table = parquetRoleTable(parquet_table, table_info)
+        else :
+            cache_content = CacheFile.readPickle(cache_path, version=cache_version, stamp=file_stamp)
+            if cache_content is None :
+                return None
+            role_table = RoleTable(cache_content['title'], cache_content['columns'], cache_content['row_count'])
+    except (OSError, ValueError, KeyError, pyarrow.ArrowException if have_pyarrow else OSError):
+        return None
+    role_table.source = "cache"
+    return role_table
+
+def parquetRoleTable(parquet_table, table_info) :
+    columns = []
+    for column_parts in table_info['columns'] :
+        column = None
+        for part_name in column_parts :
+            part_values = parquet_table.column(part_name).to_pylist()
+            if column is None :
+                column = part_values
+            else :
+                for row_ix, cell_value in enumerate(part_values) :
+                    if cell_value is not None :
+                        column[row_ix] = cell_value
+        if column is None :
+            column = [None] * table_info['row_count']
+        columns.append(column)
+    role_table = RoleTable(table_info['title'], columns, table_info['row_count'])
+    role_table.source = "parquet"
+    return role_table
+
+#   writeCache() - Written through a temporary file (see CacheFile.writeReplace).  A cache file that cannot be written is not an error.
+def writeCache(file_path, file_stamp, role_table) :
+    cache_path = cachePath(file_path)
+    if not have_pyarrow :
+        CacheFile.writePickle(cache_path, {'version': cache_version, 'stamp': file_stamp, 'title': role_table.title, 'row_count': role_table.row_count, 'columns': role_table.columns})
+        return
+
+    def writeParquet(temp_path) :
+        part_arrays = {}
+        column_parts = []
+        for col_ix, column in enumerate(role_table.columns) :
+            value_types = []
+            for cell_value in column :
+                if cell_value is not None and type(cell_value) not in value_types :
+                    value_types.append(type(cell_value))
+            part_names = []
+            for value_type in value_types :
+                part_name = f"{col_ix}:{value_type.__name__}"
+                if len(value_types) == 1 :
+                    part_arrays[part_name] = pyarrow.array(column)
+                else :
+                    part_arrays[part_name] = pyarrow.array([cell_value if type(cell_value) is value_type else None for cell_value in column])
+                part_names.append(part_name)
+            column_parts.append(part_names)
+        table_info = {'version': cache_version, 'stamp': file_stamp, 'title': role_table.title, 'row_count': role_table.row_count, 'columns': column_parts}
+        parquet_table = pyarrow.table(part_arrays) if len(part_arrays) > 0 else pyarrow.table({})
+        parquet_table = parquet_table.replace_schema_metadata({b"role_table": json.dumps(table_info).encode()})
+        pyarrow.parquet.write_table(parquet_table, temp_path)
+
+    try:
+        CacheFile.writeReplace(cache_path, writeParquet)
+    except (OSError, ValueError, TypeError, OverflowError, pyarrow.ArrowException):
+        pass
@@ -0,0 +1,51 @@
+# RowWorkers.py - Decide the rows of the Roles Worksheet in a pool of worker processes.  Used by MySource.py with the "--workers N" command line option.
+
+# Each row is decided independently, once the compiled "droprows" plan and Action File entries exist (see DropRules.RowDecider).
+# The rows are split into chunks, decided in the worker processes, and the results are returned in the original row order - along with the per-condition tallies, which are merged into the main process RowDecider.
+#
+# Note: The scripts in this repository are not guarded by  if __name__ == "__main__":  - so the worker processes must not re-run the calling script.  See startPool().
+
+import sys
+import multiprocessing
+
+worker_decider = None   # RowDecider - set in each worker process by initWorker().
+
+def initWorker(decider) :
+    global worker_decider
+    worker_decider = decider
+
+#   decideChunk() - Runs in the worker process.  Returns the decisions for the chunk of rows, and the tallies for this chunk only.
+def decideChunk(row_chunk) :
+    global worker_decider
+    worker_decider.resetCounts()
+    decisions = [worker_decider.decideRow(row_values) for row_values in row_chunk]
+    return decisions, worker_decider.takeCounts()
+
+#   startPool() - Start the worker processes, each with its own copy of the RowDecider.
+#   The worker processes are started with the "spawn" method (the only method on Windows).  A spawned process normally re-runs the main script, to find the functions it was asked to run.
+#   The main script's path is hidden while the pool starts its processes, so that they import RowWorkers.py and DropRules.py only.
+def startPool(worker_count, decider) :
+    spawn_context = multiprocessing.get_context("spawn")
+    main_module = sys.modules['__main__']
+    main_path = getattr(main_module, '__file__', None)
+    if main_path is not None :
+        del main_module.__file__
+    try :
+        worker_pool = spawn_context.Pool(processes=worker_count, initializer=initWorker, initargs=(decider,))
+    finally :
+        if main_path is not None :
+            main_module.__file__ = main_path
+    return worker_pool
+
+#   decideAll() - Decide the rows in the worker pool.  Returns the list of decisions, in row order, and merges the tallies into decider.
+def decideAll(worker_pool, worker_count, rows, decider) :
+    if len(rows) == 0 :
+        return []
+    chunk_size = max(1, -(-len(rows) // (worker_count * 4)))    # About four chunks per worker - to even out the load.
+    row_chunks = [rows[chunk_start:chunk_start + chunk_size] for chunk_start in range(0, len(rows), chunk_size)]
+
+    decisions = []
+    for chunk_decisions, chunk_counts in worker_pool.map(decideChunk, row_chunks) :
+        decisions.extend(chunk_decisions)
+        decider.addCounts(chunk_counts)
+    return decisions
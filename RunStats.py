@@ -0,0 +1,143 @@
+# RunStats.py - Phase timing and counters for a run of one of the scripts.  Written as a JSON lines section at the end of the output message file.
+
+# The script calls phase("<name>") as it moves on to each part of the run (load, header scan, filter, save, ...).  The previous phase ends at that point.
+# Counters are set with count().  For MySource.py, the "droprows" conditions are added with addConditions() - see DropRules.DropPlan.timed.
+#
+# The section is written between the "--- run stats (JSON lines) ---" and "--- end run stats ---" lines.  Each line is one JSON object, with a "record" key:
+#   {"record": "run", "script": ..., "started": ..., "seconds": ..., "rows": ..., "rows_per_sec": ..., "peak_rss_mb": ...}
+#   {"record": "phase", "phase": ..., "seconds": ...}
+#   {"record": "counter", "name": ..., "value": ...}
+#   {"record": "condition", "key": ..., "column": ..., "type": ..., "tested": ..., "dropped": ..., "seconds": ..., "us_per_test": ...}
+# Use readSection() to load the records back from a message file - for example, to compare runs (see bench/RunBench.py).
+#
+# "runstats False" in the Control File leaves the section out.
+
+import sys
+import json
+import time
+from datetime import datetime
+
+section_start = "--- run stats (JSON lines) ---"
+section_end   = "--- end run stats ---"
+
+#   peakRssMb() - Peak resident memory of this process, in MB.  None if not available.
+def peakRssMb() :
+    try:
+        import resource
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin" :
+            return peak_rss / (1024 * 1024)     # Bytes on macOS, KB elsewhere.
+        return peak_rss / 1024
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD), ("PeakWorkingSetSize", ctypes.c_size_t),
+                        ("WorkingSetSize", ctypes.c_size_t), ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        memory_counters = ProcessMemoryCounters()
+        memory_counters.cb = ctypes.sizeof(memory_counters)
+        process_handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process_handle, ctypes.byref(memory_counters), memory_counters.cb) :
+            return memory_counters.PeakWorkingSetSize / (1024 * 1024)
+    except (ImportError, AttributeError, OSError):
+        pass
+    return None
+
+
+class RunStats:
+
+    def __init__(self, script_name):
+        self.script_name = script_name
+        self.enabled = True
+        self.started = datetime.now()
+        self.start_time = time.perf_counter()
+        self.phases = []            # [phase name, seconds] - in the order run.  A phase entered more than once is added up.
+        self.current_phase = None
+        self.phase_start = None
+        self.counters = {}
+        self.conditions = []
+        self.rows = None            # Rows processed - for rows/sec.
+
+    #   phase() - End the current phase (if any), and start the named phase.
+    def phase(self, phase_name):
+        self.endPhase()
+        self.current_phase = phase_name
+        self.phase_start = time.perf_counter()
+
+    def endPhase(self):
+        if self.current_phase is None :
+            return
+        elapsed = time.perf_counter() - self.phase_start
+        for phase_entry in self.phases :
+            if phase_entry[0] == self.current_phase :
+                phase_entry[1] += elapsed
+                break
+        else :
+            self.phases.append([self.current_phase, elapsed])
+        self.current_phase = None
+
+    def count(self, counter_name, value):
+        self.counters[counter_name] = value
+
+    def setRows(self, row_count):
+        self.rows = row_count
+
+    #   addConditions() - Hit counts and evaluation time of the "droprows" conditions (DropRules.DropRule objects).
+    def addConditions(self, rules):
+        for rule in rules :
+            us_per_test = None
+            if rule.tested > 0 :
+                us_per_test = round(rule.seconds * 1e6 / rule.tested, 3)
+            self.conditions.append({"record": "condition", "key": rule.drop_key, "column": rule.col_header, "type": rule.drop_type,
+                                    "tested": rule.tested, "dropped": rule.count, "seconds": round(rule.seconds, 4), "us_per_test": us_per_test})
+
+    def jsonLines(self):
+        self.endPhase()
+        total_seconds = time.perf_counter() - self.start_time
+        peak_rss = peakRssMb()
+        run_record = {"record": "run", "script": self.script_name, "started": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+                      "seconds": round(total_seconds, 3), "rows": self.rows, "rows_per_sec": None,
+                      "peak_rss_mb": None if peak_rss is None else round(peak_rss, 1)}
+        if self.rows is not None and total_seconds > 0 :
+            run_record["rows_per_sec"] = round(self.rows / total_seconds, 1)
+
+        json_lines = [json.dumps(run_record)]
+        for phase_name, phase_seconds in self.phases :
+            json_lines.append(json.dumps({"record": "phase", "phase": phase_name, "seconds": round(phase_seconds, 4)}))
+        for counter_name, value in self.counters.items() :
+            json_lines.append(json.dumps({"record": "counter", "name": counter_name, "value": value}))
+        for condition in self.conditions :
+            json_lines.append(json.dumps(condition))
+        return json_lines
+
+    #   writeSection() - Write the section through the script's MessageOut() function.
+    def writeSection(self, message_out):
+        if not self.enabled :
+            return
+        message_out(" ")
+        message_out(section_start)
+        for json_line in self.jsonLines() :
+            message_out(json_line)
+        message_out(section_end)
+
+
+#   readSection() - Read the run stats records from an output message file.  Returns a list of dictionaries (empty if the file has no run stats section).
+def readSection(mssg_path):
+    records = []
+    in_section = False
+    with open(mssg_path) as mssg_file :
+        for mssg_line in mssg_file :
+            mssg_line = mssg_line.strip()
+            if mssg_line == section_start :
+                in_section = True
+            elif mssg_line == section_end :
+                in_section = False
+            elif in_section and mssg_line.startswith("{") :
+                records.append(json.loads(mssg_line))
+    return records
@@ -0,0 +1,99 @@
+# SearchIndex.py - Full-text search over the open roles, by words in the role title, skills, location, ... columns.  Used by Apply.py ("/search <terms>" at the Request ID prompt).
+
+# The index is an inverted index: for each word, the Request IDs of the roles that contain it, with the number of times it appears.  Words are lower case runs of
+# letters and digits (and "+" and "#" - so "C++" and "C#" are words).  Each search term matches the words that start with it ("pyth" matches "python").
+#
+# The roles are ranked by the number of search terms matched, then by score:  for each term, (1 + log(count)) * log(1 + roles / roles with the word) - so a word
+# found in few roles counts for more than a common one.  A word that only starts with the term counts for half.
+#
+# The index is kept in a cache file next to the workbook (<workbook>.search, in pickle form), and read in its place until the workbook (or the list of columns) changes.
+
+import re
+import math
+import bisect
+import CacheFile
+
+cache_version = 1   # Increment if the content of the cache file changes - older cache files are then ignored.
+word_pattern = re.compile(r"[0-9a-z+#]+")
+prefix_weight = 0.5
+
+
+def searchWords(cell_value) :
+    if cell_value is None :
+        return []
+    return word_pattern.findall(str(cell_value).lower())
+
+
+class SearchIndex:
+
+    def __init__(self, workbook_path, column_titles):
+        self.workbook_path = workbook_path
+        self.cache_path = workbook_path + ".search"
+        self.column_titles = list(column_titles)
+        self.role_words = {}        # Request ID: {word: count}  - while the index is built.
+        self.postings = {}          # Word: {Request ID: count}
+        self.vocabulary = []        # Sorted words - for the prefix matches.
+        self.role_count = 0
+        self.from_cache = False
+
+    #   addRole() - Add the cell values (of the indexed columns) for a role.  A Request ID added again replaces the earlier one.
+    def addRole(self, request_id, cell_values):
+        word_counts = {}
+        for cell_value in cell_values :
+            for word in searchWords(cell_value) :
+                word_counts[word] = word_counts.get(word, 0) + 1
+        self.role_words[request_id] = word_counts
+
+    #   finish() - Build the inverted index from the roles added.
+    def finish(self):
+        self.postings = {}
+        for request_id, word_counts in self.role_words.items() :
+            for word, word_count in word_counts.items() :
+                self.postings.setdefault(word, {})[request_id] = word_count
+        self.vocabulary = sorted(self.postings)
+        self.role_count = len(self.role_words)
+        self.role_words = {}
+
+    #   search() - Ranked list of (Request ID, terms matched, score) for the roles that contain any of the search terms.
+    def search(self, search_text):
+        role_scores = {}        # Request ID: [terms matched, score]
+        for term in dict.fromkeys(searchWords(search_text)) :
+            term_scores = {}
+            word_ix = bisect.bisect_left(self.vocabulary, term)
+            while word_ix < len(self.vocabulary) and self.vocabulary[word_ix].startswith(term) :
+                word = self.vocabulary[word_ix]
+                word_postings = self.postings[word]
+                word_weight = math.log(1 + self.role_count / len(word_postings)) * (1.0 if word == term else prefix_weight)
+                for request_id, word_count in word_postings.items() :
+                    word_score = (1 + math.log(word_count)) * word_weight
+                    if word_score > term_scores.get(request_id, 0) :
+                        term_scores[request_id] = word_score
+                word_ix += 1
+            for request_id, term_score in term_scores.items() :
+                role_score = role_scores.setdefault(request_id, [0, 0.0])
+                role_score[0] += 1
+                role_score[1] += term_score
+        ranked = sorted(role_scores.items(), key=lambda role_item : (-role_item[1][0], -role_item[1][1], role_item[0]))
+        return [(request_id, terms_matched, round(score, 2)) for request_id, (terms_matched, score) in ranked]
+
+    #   readCache() - Read the index from the cache file, if it is current.  Returns True if successful.
+    def readCache(self):
+        try:
+            file_stamp = CacheFile.fileStamp(self.workbook_path)
+        except OSError:
+            return False
+        cache_content = CacheFile.readPickle(self.cache_path, version=cache_version, stamp=file_stamp, columns=self.column_titles)
+        if cache_content is None :
+            return False
+        self.postings = cache_content['postings']
+        self.role_count = cache_content['role_count']
+        self.vocabulary = sorted(self.postings)
+        self.from_cache = True
+        return True
+
+    def writeCache(self):
+        try:
+            file_stamp = CacheFile.fileStamp(self.workbook_path)
+        except OSError:
+            return
+        CacheFile.writePickle(self.cache_path, {'version': cache_version, 'stamp': file_stamp, 'columns': self.column_titles, 'postings': self.postings, 'role_count': self.role_count})
@@ -0,0 +1,67 @@
+# BenchMultiMatch.py - Compare MultiMatch (see MultiMatch.py) against the original per-pattern loop of the "filter" and "dropincl" conditions.
+
+# Usage: python bench/BenchMultiMatch.py [<number of cells>] [<number of patterns>]
+
+import sys
+import random
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))    # Scripts and modules live in the repository root.
+import MultiMatch
+
+skill_words = ["Python", "Java", "SQL", "Excel", "SAP", "Salesforce", "AWS", "Azure", "ServiceNow", "Tableau", "COBOL", "Power BI",
+               "Oracle", "PeopleSoft", "Workday", "Dynamics", "SharePoint", "MuleSoft", "Kubernetes", "Docker", "Terraform", "Spark",
+               "Hadoop", "Snowflake", "Databricks", "Informatica", "Pega", "Appian", "Guidewire", "TIBCO", "Alteryx", "Qlik",
+               "UiPath", "Blue Prism", "Angular", "React", "Node.js", "Golang", "Scala", "Ruby"]
+filler_text = "Candidate should have strong communication skills and experience with enterprise delivery and agile ceremonies. "
+
+#   Original loop from MySource.matchDrop() - the cell value is lowered again for each pattern.
+def originalFirst(patterns, cell_value) :
+    for pattern in patterns :
+        if pattern.lower() in cell_value.lower() :
+            return pattern
+    return None
+
+def buildCells(cell_count, seed=42) :
+    random.seed(seed)
+    cells = []
+    for cell_ix in range(cell_count) :
+        words = random.sample(skill_words + ["Communication", "Leadership", "Presentation", "Teamwork"], 3)
+        cells.append(filler_text * random.randint(2, 15) + ", ".join(words))
+    return cells
+
+def timeIt(label, function, cells, repeat=3) :
+    elapsed = min(timeit.repeat(lambda: [function(cell) for cell in cells], number=1, repeat=repeat))
+    print(f"{label:<40} {elapsed * 1000:9.1f} ms   {elapsed * 1e6 / len(cells):8.2f} us/cell")
+    return elapsed
+
+def main() :
+    cell_count    = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    pattern_count = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    patterns = skill_words[:pattern_count]
+    cells = buildCells(cell_count)
+    print(f"{cell_count} cells, {len(patterns)} patterns, pyahocorasick installed: {MultiMatch.have_ahocorasick}")
+
+    loop_match = MultiMatch.MultiMatch(patterns, use_automaton=False)
+    expected = [originalFirst(patterns, cell) for cell in cells]
+    found = [loop_match.firstListed(cell.lower()) for cell in cells]
+    if [patterns[ix] if ix > -1 else None for ix in found] != expected :
+        print("MultiMatch (loop) results differ from the original loop!")
+        sys.exit(1)
+
+    timeIt("original loop (filter)", lambda cell: originalFirst(patterns, cell), cells)
+    timeIt("MultiMatch loop, firstListed()", lambda cell: loop_match.firstListed(cell.lower()), cells)
+    timeIt("MultiMatch loop, anyFound()", lambda cell: loop_match.anyFound(cell.lower()), cells)
+
+    if MultiMatch.have_ahocorasick :
+        auto_match = MultiMatch.MultiMatch(patterns, use_automaton=True)
+        found = [auto_match.firstListed(cell.lower()) for cell in cells]
+        if [patterns[ix] if ix > -1 else None for ix in found] != expected :
+            print("MultiMatch (automaton) results differ from the original loop!")
+            sys.exit(1)
+        timeIt("MultiMatch automaton, firstListed()", lambda cell: auto_match.firstListed(cell.lower()), cells)
+        timeIt("MultiMatch automaton, anyFound()", lambda cell: auto_match.anyFound(cell.lower()), cells)
+
+if __name__ == "__main__" :
+    main()
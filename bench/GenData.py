@@ -0,0 +1,277 @@
+# GenData.py - Generate synthetic role workbooks, with matching control files, location worksheet, filter worksheet, control worksheets, and Action File - for benchmarking the scripts without real downloads.
+
+# Usage: python bench/GenData.py <output directory> [<number of rows>] [gps | mysource]
+#
+# "gps" workbooks have the two-row GPS Open Demands Report header (title row, then column headers - see the "skip_to_header" and "skip_header" parameters).
+# "mysource" workbooks have a single header row, and use "Deloitte Office" as Project Location - to be replaced by the Requesting Office (see MyLocation.py).
+# Request IDs are written as a mix of int and str values.  Project Locations are "|" delimited lists for some roles.  Mandatory Skills is free text.
+#
+# Note: The scripts build file paths as <directory> + "\\" + <file name> (see the "inputdir" and "messagdir" parameters).  scriptPath() builds paths the same way,
+# so that the generated files are found on any platform.  (On Windows, this is the usual path.  Elsewhere, the backslash is part of the file name.)
+
+import os
+import sys
+import shutil
+import random
+from datetime import datetime, timedelta
+
+workbook_title   = "GPS Open Demands Report"
+role_sheet_name  = "Open Roles"
+action_sheet_name = "Actions"
+role_headers = ["Request ID", "Role Title", "Request Practice", "Security Clearance Required", "Start Date", "Co-Location",
+                "Project Location", "Mandatory Skills", "Requesting Office"]
+action_headers = ["Request ID", "Action", "Action Date", "Role"]
+
+role_titles = ["Developer", "Senior Developer", "Solution Architect", "Data Engineer", "Business Analyst", "Junior Analyst", "Intern Developer",
+               "Project Manager", "Scrum Master", "Cloud Architect", "Tester", "Technical Writer"]
+practices = ["GPS Consulting", "GPS Technology", "GPS Strategy", "USI Consulting", "USI Audit", "Commercial Consulting"]
+clearances = ["NA", "NA", "NA", "Public Trust", "Secret", "Top Secret"]
+co_locations = ["Remote", "Hybrid", "Onsite", "Client Site", None]
+skill_words = ["Python", "Java", "SQL", "Excel", "SAP", "Salesforce", "AWS", "Azure", "ServiceNow", "Tableau", "COBOL", "Power BI",
+               "Oracle", "PeopleSoft", "Workday", "SharePoint", "Kubernetes", "Terraform", "Spark", "Snowflake", "Pega", "Appian"]
+skill_sentences = ["Candidate should have strong communication skills and experience with enterprise delivery.",
+                   "Experience supporting federal clients through agile ceremonies is preferred.",
+                   "Must be comfortable presenting to senior client stakeholders.",
+                   "Prior experience in a regulated environment is a plus.",
+                   "Will work closely with the client product owner to refine the backlog."]
+offices = ["McLean, VA", "Arlington, VA", "Austin, TX", "Chicago, IL", "Atlanta, GA", "Boston, MA"]
+
+# (Project Location, My Location) - the location worksheet lists these.  Ranked closest first in the "locompare" parameter: Local, Commute, Travel, Far.
+known_locations = [("Arlington, VA", "Local"), ("Rosslyn, VA", "Local"), ("McLean, VA", "Local"), ("Washington, DC", "Commute"),
+                   ("Reston, VA", "Commute"), ("Baltimore, MD", "Travel"), ("Richmond, VA", "Travel"), ("Austin, TX", "Far"),
+                   ("Chicago, IL", "Far"), ("Atlanta, GA", "Far"), ("Boston, MA", "Far"), ("Remote", "Local")]
+unknown_locations = ["Fort Meade, MD", "Quantico, VA", "Huntsville, AL", "San Antonio, TX"]
+
+
+#   scriptPath() - Build a path the way the scripts do (see note above).
+def scriptPath(directory, file_name) :
+    return directory + "\\" + file_name
+
+#   placeInput() - Apply.py and Mario.py test that the workbook named on the command line exists (in the current directory) before reading it from "inputdir".
+#   Where the two paths differ, make both available.
+def placeInput(directory, file_name) :
+    script_path = scriptPath(directory, file_name)
+    local_path = os.path.join(directory, file_name)
+    if os.path.abspath(script_path) != os.path.abspath(local_path) :
+        shutil.copyfile(script_path, local_path)
+    return local_path
+
+def requestId(row_ix) :
+    return 100000 + row_ix
+
+def projectLocation(rng, style) :
+    roll = rng.random()
+    if style == "mysource" and roll < 0.25 :
+        return "Deloitte Office"
+    if roll < 0.35 :
+        return "|".join(rng.sample([location for location, my_location in known_locations], rng.randint(2, 3)))
+    if roll < 0.40 :
+        return rng.choice(unknown_locations)
+    if roll < 0.42 :
+        return None
+    return rng.choice(known_locations)[0]
+
+def skillsText(rng) :
+    if rng.random() < 0.1 :
+        return None
+    sentences = [rng.choice(skill_sentences) for sentence_ix in range(rng.randint(2, 8))]
+    return " ".join(sentences) + " Required: " + ", ".join(rng.sample(skill_words, rng.randint(1, 4))) + "."
+
+#   roleRows() - Generate the data rows of a role workbook.  Every third Request ID is a str value.
+def roleRows(row_count, style="gps", seed=1) :
+    rng = random.Random(seed)
+    start_date = datetime(2026, 1, 1)
+    for row_ix in range(row_count) :
+        request_id = requestId(row_ix)
+        yield [str(request_id) if row_ix % 3 == 0 else request_id,
+               rng.choice(role_titles),
+               rng.choice(practices),
+               rng.choice(clearances),
+               start_date + timedelta(days=rng.randint(0, 700)),
+               rng.choice(co_locations),
+               projectLocation(rng, style),
+               skillsText(rng),
+               rng.choice(offices)]
+
+def writeRoles(workbook_path, row_count, style="gps", seed=1) :
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    rolebook = Workbook(write_only=True)
+    rolesheet = rolebook.create_sheet(role_sheet_name)
+    if style == "gps" :
+        rolesheet.append([workbook_title])
+    rolesheet.append(role_headers)
+    for row_values in roleRows(row_count, style, seed) :
+        date_cell = WriteOnlyCell(rolesheet, value=row_values[4])
+        date_cell.number_format = 'mm/dd/yyyy'
+        row_values[4] = date_cell
+        rolesheet.append(row_values)
+    rolebook.save(workbook_path)
+
+#   writeActions() - Action File with an action for every fifth Request ID.
+def writeActions(workbook_path, row_count, seed=1) :
+    from openpyxl import Workbook
+    rng = random.Random(seed)
+    actbook = Workbook()
+    actsheet = actbook.active
+    actsheet.title = action_sheet_name
+    actsheet.append(action_headers)
+    for row_ix in range(0, row_count, 5) :
+        actsheet.append([requestId(row_ix), rng.choice(["Applied", "Pass"]), datetime(2025, 5, 1) + timedelta(days=row_ix % 300), rng.choice(role_titles)])
+        actsheet.cell(row=actsheet.max_row, column=3).number_format = 'mm/dd/yyyy'
+    actbook.save(workbook_path)
+
+def writeLocations(workbook_path) :
+    from openpyxl import Workbook
+    locbook = Workbook()
+    locsheet = locbook.active
+    locsheet.append(["Project Location", "My Location"])
+    for location, my_location in known_locations :
+        locsheet.append([location, my_location])
+    for office in offices :
+        if office not in [location for location, my_location in known_locations] :
+            locsheet.append([office, "Far"])
+    locbook.save(workbook_path)
+
+def writeFilters(workbook_path) :
+    from openpyxl import Workbook
+    filterbook = Workbook()
+    filtersheet = filterbook.active
+    filtersheet.title = "Filters"
+    filtersheet.append(["Filter"])
+    filterbook.save(workbook_path)
+
+#   writeControlSheets() - Control worksheets for Apply.py ("copycols" parameter) and Mario.py ("contrlsheet" parameter), in one workbook.
+def writeControlSheets(workbook_path) :
+    from openpyxl import Workbook
+    controlbook = Workbook()
+    applysheet = controlbook.active
+    applysheet.title = "Apply"
+    applysheet.append(['ID', 'Source', 'Target', 'Type', 'Display', 'Apply', 'Pass', 'Query', 'Prompt'])
+    applysheet.append(['req',  'Request ID', 'Request ID', 'int', 'x', 'x', 'x', None, None])
+    applysheet.append(['role', 'Role Title', 'Role', 'str', 'x', 'x', 'x', None, None])
+    applysheet.append([None, 'Co-Location', 'Co-Location', 'str', 'x', None, None, None, None])
+    applysheet.append([None, 'Project Location', 'Project Location', 'str', 'x', None, None, None, None])
+    applysheet.append([None, '?', 'Action', 'str', None, 'x', 'x', 'action', None])
+    applysheet.append([None, '?', 'Action Date', 'date', None, 'x', 'x', 'today', None])
+
+    mariosheet = controlbook.create_sheet("Mario")
+    mariosheet.append(['Source', 'Target', 'Type', 'Process'])
+    mariosheet.append(['Request ID', 'Request ID', 'int', 'copy'])
+    mariosheet.append(['My Action', 'Action', 'str', 'split'])
+    mariosheet.append(['My Action', 'Action Date', 'date', 'split'])
+    mariosheet.append(['Role Title', 'Role', 'str', 'copy'])
+    controlbook.save(workbook_path)
+
+#   writeControlFiles() - Control files for each of the scripts.  Returns a dictionary of control file paths, by script name.
+def writeControlFiles(directory, style="gps") :
+    control_text = {}
+    header_lines = []
+    if style == "gps" :
+        header_lines = [f'skip_to_header "Request ID" 0', f'skip_header "{workbook_title}"']
+
+    control_text['MyLocation.py'] = [
+        f'messagdir "{directory}"',
+        f'locatsheet "{os.path.join(directory, "locations.xlsx")}"',
+        'col_projlocat "Project Location"',
+        'col_request "Request ID"',
+        'col_location "My Location"',
+        'col_reqoffice "Requesting Office"',
+        'locompare lc1 lc2 lc3 lc4',
+        'lc1 1 Local',
+        'lc2 2 Commute',
+        'lc3 3 Travel',
+        'lc4 4 Far Unknown',
+        ] + header_lines
+
+    control_text['MySource.py'] = [
+        f'messagdir "{directory}"',
+        f'inputdir "{directory}"',
+        'actionf actions.xlsx',
+        'col_act_rqust "Request ID"',
+        'col_action "Action"',
+        'col_action_dt "Action Date"',
+        f'filtersheet "{os.path.join(directory, "filters.xlsx")}" Filters',
+        'dropactual True',
+        'droprows c_clear c_prac c_start c_coloc c_skill c_title c_excl c_nofilt',
+        'c_clear "Security Clearance Required" keep NA "Public Trust"',
+        'c_prac "Request Practice" drop "USI Consulting" "USI Audit"',
+        'c_start "Start Date" before 20270601',
+        'c_coloc "Co-Location" location colocs mylocs',
+        'colocs cl1 cl2 cl3 cl4',
+        'cl1 0 Remote',
+        'cl2 40 Hybrid',
+        'cl3 100 Onsite',
+        'cl4 100 "Client Site"',
+        'mylocs ml1 ml2 ml3 ml4 ml5',
+        'ml1 100 Local',
+        'ml2 60 Commute',
+        'ml3 20 Travel',
+        'ml4 0 Far',
+        'ml5 0 Unknown Non',
+        'c_skill "Mandatory Skills" filter Python Java SQL AWS Azure',
+        'c_title "Role Title" filter Architect Engineer',
+        'c_excl "Role Title" dropincl Intern Junior',
+        'c_nofilt "Mandatory Skills" nofilter',
+        'col_request "Request ID"',
+        'col_my_act "My Action"',
+        'col_my_filter "My Filter"',
+        'col_colocation "Co-Location"',
+        'col_mylocation "My Location"',
+        'col_my_insert "Mandatory Skills"',
+        'format_cols "Mandatory Skills"',
+        ] + header_lines[:1]
+
+    control_text['Mario.py'] = [
+        f'messagdir "{directory}"',
+        f'inputdir "{directory}"',
+        f'contrlsheet "{os.path.join(directory, "controls.xlsx")}" Mario',
+        f'actionsheet "{os.path.join(directory, "mario_actions.xlsx")}"',
+        'key_column "Request ID"',
+        ] + header_lines[:1]
+
+    control_text['Apply.py'] = [
+        f'messagdir "{directory}"',
+        f'inputdir "{directory}"',
+        f'targetsheet "{os.path.join(directory, "apply_actions.xlsx")}"',
+        f'copycols "{os.path.join(directory, "controls.xlsx")}" Apply',
+        'col_request req',
+        'col_role role',
+        ] + header_lines[1:]
+
+    control_paths = {}
+    for script_name, control_lines in control_text.items() :
+        control_path = os.path.join(directory, script_name.replace(".py", "_control.txt"))
+        with open(control_path, "w") as control_file :
+            control_file.write("\n".join(control_lines) + "\n")
+        control_paths[script_name] = control_path
+    return control_paths
+
+#   generate() - Write the complete set of benchmark inputs into the directory.  Returns (role workbook name, dictionary of control file paths).
+#   The role workbook is written where the scripts look for it (see scriptPath()).  The Action File for Mario.py and Apply.py are copies of the MySource.py Action File.
+def generate(directory, row_count, style="gps", seed=1) :
+    os.makedirs(directory, exist_ok=True)
+    roles_name = f"roles_{style}_{row_count}.xlsx"
+    writeRoles(scriptPath(directory, roles_name), row_count, style, seed)
+    writeActions(scriptPath(directory, "actions.xlsx"), row_count, seed)
+    shutil.copyfile(scriptPath(directory, "actions.xlsx"), os.path.join(directory, "mario_actions.xlsx"))
+    shutil.copyfile(scriptPath(directory, "actions.xlsx"), os.path.join(directory, "apply_actions.xlsx"))
+    writeLocations(os.path.join(directory, "locations.xlsx"))
+    writeFilters(os.path.join(directory, "filters.xlsx"))
+    writeControlSheets(os.path.join(directory, "controls.xlsx"))
+    return roles_name, writeControlFiles(directory, style)
+
+def main() :
+    if len(sys.argv) < 2 :
+        print(f"Usage: python {sys.argv[0]} <output directory> [<number of rows>] [gps | mysource]")
+        sys.exit(1)
+    directory = os.path.abspath(sys.argv[1])
+    row_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    style     = sys.argv[3] if len(sys.argv) > 3 else "gps"
+    roles_name, control_paths = generate(directory, row_count, style)
+    print(f"Wrote {row_count} rows to {scriptPath(directory, roles_name)}")
+    for script_name, control_path in control_paths.items() :
+        print(f"   {script_name:<14} {control_path}")
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,207 @@
+# RunBench.py - Time MyLocation.py, MySource.py, Mario.py, and Apply.py on synthetic role workbooks (see GenData.py).
+
+# Usage: python bench/RunBench.py [--rows 1000 10000 100000] [--style gps|mysource] [--repeat N] [--phases] [--pipeline] [--dir <directory>] [--save <results.json>] [--baseline <results.json>]
+#
+# For each number of rows, the inputs are generated, and the scripts are run in order - as in a normal cycle:
+#   MyLocation.py fills "My Location", MySource.py filters the roles (and drops rows), Mario.py adds the prior actions to a copy of the Action File,
+#   and Apply.py records an action for a few of the remaining roles.  (Mario.py and Apply.py are given their prompt responses on standard input.)
+#
+# Each script runs in its own process.  Wall time includes Python start-up and imports (pandas, openpyxl) - as for a real run.
+# Peak RSS is taken from the process resource usage, where the platform provides it (not on Windows).
+# The phase times, counters, and "droprows" condition costs are read from the run stats section of each script's output message file (see RunStats.py),
+# and are kept in the results.
+#
+# --phases  Also show the phase times and condition costs.
+# --pipeline  Run Pipeline.py (MyLocation.py and MySource.py as stages of one process) in place of the two scripts.  Phase names are prefixed with the stage.
+# --save / --baseline  Write the results as JSON, or compare against a previous results file - any time more than --tolerance slower is reported as a regression (exit code 1).
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+bench_dir = Path(__file__).resolve().parent
+repo_dir  = bench_dir.parent
+sys.path.insert(0, str(bench_dir))
+sys.path.insert(1, str(repo_dir))
+import GenData
+import RunStats
+
+script_order = ["MyLocation.py", "MySource.py", "Mario.py", "Apply.py"]
+pipeline_order = ["Pipeline.py", "Mario.py", "Apply.py"]
+pipeline_stages = ["MyLocation.py", "MySource.py"]
+
+#   runScript() - Run one script in its own process.  Returns (return code, elapsed seconds, peak RSS in MB or None).
+def runScript(command, directory, stdin_text, log_path) :
+    with tempfile.TemporaryFile() as stdin_file, open(log_path, "w") as log_file :
+        stdin_file.write(stdin_text.encode())
+        stdin_file.seek(0)
+        start_time = time.perf_counter()
+        process = subprocess.Popen(command, cwd=directory, stdin=stdin_file, stdout=log_file, stderr=subprocess.STDOUT)
+        peak_rss = None
+        if hasattr(os, "wait4") :
+            wait_pid, wait_status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(wait_status)
+            peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        else :
+            process.wait()
+        elapsed = time.perf_counter() - start_time
+    return process.returncode, elapsed, peak_rss
+
+#   runRecords() - Phase times, counters, and condition records from the run stats section of the script's output message file.
+def runRecords(mssg_path) :
+    run_records = {"phases": {}, "counters": {}, "conditions": []}
+    if not os.path.isfile(mssg_path) :
+        return run_records
+    for record in RunStats.readSection(mssg_path) :
+        if record["record"] == "phase" :
+            run_records["phases"][record["phase"]] = record["seconds"]
+        elif record["record"] == "counter" :
+            run_records["counters"][record["name"]] = record["value"]
+        elif record["record"] == "condition" :
+            run_records["conditions"].append(record)
+    return run_records
+
+#   scriptRecords() - runRecords() for a script - or, for Pipeline.py, for each of its stages, with the stage name before each phase and counter name.
+def scriptRecords(directory, script_name) :
+    if script_name != "Pipeline.py" :
+        return runRecords(GenData.scriptPath(directory, script_name.replace(".py", ".mssg")))
+    pipeline_records = {"phases": {}, "counters": {}, "conditions": []}
+    for stage_name in pipeline_stages :
+        stage_records = runRecords(GenData.scriptPath(directory, stage_name.replace(".py", ".mssg")))
+        stage_prefix = stage_name.replace(".py", "") + " "
+        pipeline_records["phases"].update({stage_prefix + phase_name: phase_time for phase_name, phase_time in stage_records["phases"].items()})
+        pipeline_records["counters"].update({stage_prefix + counter_name: value for counter_name, value in stage_records["counters"].items()})
+        pipeline_records["conditions"] += stage_records["conditions"]
+    return pipeline_records
+
+#   applyInput() - Prompt responses for Apply.py: an action for each of the first few Request IDs remaining in the MySource.py output, then a blank Request ID to end.
+def applyInput(workbook_path, request_count=5) :
+    from openpyxl import load_workbook
+    rolebook = load_workbook(workbook_path, read_only=True)
+    request_ids = []
+    for row_values in rolebook.active.iter_rows(min_row=1, values_only=True) :
+        if len(row_values) > 0 and isinstance(row_values[0], (int, str)) and str(row_values[0]).isdigit() :
+            request_ids.append(int(row_values[0]))
+        if len(request_ids) >= request_count :
+            break
+    rolebook.close()
+    responses = []
+    for response_ix, request_id in enumerate(request_ids) :
+        responses += [str(request_id), "A" if response_ix % 2 == 0 else "P"]
+    return "\n".join(responses + ["", "", ""]) + "\n"
+
+#   benchRows() - Generate the inputs for one number of rows, and time each of the scripts.  Returns a list of result dictionaries.
+def benchRows(work_dir, row_count, style, repeat, show_phases, use_pipeline=False) :
+    directory = str(work_dir / f"{style}_{row_count}")
+    print(f"Generating {row_count} {style} rows in {directory} ...")
+    roles_name, control_paths = GenData.generate(directory, row_count, style)
+    roles_path = GenData.scriptPath(directory, roles_name)
+    roles_out_name = roles_name.replace(".xlsx", "_out.xlsx")
+    pristine_path = os.path.join(directory, "pristine_" + roles_name)
+    shutil.copyfile(roles_path, pristine_path)
+
+    def prepare(script_name) :
+        if script_name in ("MyLocation.py", "Pipeline.py") :
+            shutil.copyfile(pristine_path, roles_path)      # MyLocation.py updates the workbook in place.
+        elif script_name == "Mario.py" :
+            shutil.copyfile(GenData.scriptPath(directory, "actions.xlsx"), os.path.join(directory, "mario_actions.xlsx"))
+            GenData.placeInput(directory, roles_out_name)
+        elif script_name == "Apply.py" :
+            shutil.copyfile(GenData.scriptPath(directory, "actions.xlsx"), os.path.join(directory, "apply_actions.xlsx"))
+            GenData.placeInput(directory, roles_out_name)
+
+    def scriptInput(script_name) :
+        if script_name == "Mario.py" :
+            return "Applied\n01/02/2026\n\n"     # Default action, default date, and <Enter> at the "workbook closed?" prompt.
+        if script_name == "Apply.py" :
+            return applyInput(GenData.scriptPath(directory, roles_out_name))
+        return ""
+
+    script_args = {"MyLocation.py": [control_paths["MyLocation.py"], roles_path], "MySource.py": [control_paths["MySource.py"], roles_name],
+                   "Mario.py": [control_paths["Mario.py"], roles_out_name], "Apply.py": [control_paths["Apply.py"], roles_out_name],
+                   "Pipeline.py": [control_paths["MyLocation.py"], control_paths["MySource.py"], roles_name]}
+    results = []
+    for script_name in (pipeline_order if use_pipeline else script_order) :
+        script_path = str(repo_dir / script_name)
+        best = None
+        for repeat_ix in range(repeat) :
+            prepare(script_name)
+            stdin_text = scriptInput(script_name)
+            log_path = os.path.join(directory, script_name.replace(".py", ".log"))
+            return_code, elapsed, peak_rss = runScript([sys.executable, script_path] + script_args[script_name], directory, stdin_text, log_path)
+            if return_code != 0 :
+                print(f"   {script_name} ended with return code {return_code} - see {log_path}")
+            if best is None or elapsed < best[1] :
+                best = (return_code, elapsed, peak_rss, scriptRecords(directory, script_name))
+
+        result = {"script": script_name, "style": style, "rows": row_count, "seconds": round(best[1], 3),
+                  "rows_per_sec": round(row_count / best[1], 1), "peak_rss_mb": None if best[2] is None else round(best[2], 1),
+                  "return_code": best[0]}
+        result.update(best[3])
+        results.append(result)
+        showResult(result, show_phases)
+    return results
+
+def showResult(result, show_phases) :
+    peak_rss = "n/a" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.0f} MB"
+    print(f"   {result['script']:<14} {result['rows']:>7} rows  {result['seconds']:8.2f} s  {result['rows_per_sec']:10.0f} rows/s  peak RSS {peak_rss}")
+    if not show_phases :
+        return
+    for phase_name, phase_time in result["phases"].items() :
+        print(f"      {phase_name:<24} {phase_time:8.3f} s")
+    for condition in result["conditions"] :
+        print(f"      condition {condition['key']:<12} {condition['type']:<9} tested {condition['tested']:>7}  dropped {condition['dropped']:>7}  {condition['seconds']:8.4f} s")
+
+#   compareResults() - Report the results that are more than the tolerance slower than the baseline.  Returns the number of regressions.
+def compareResults(results, baseline_results, tolerance) :
+    baseline_index = {(result["script"], result["style"], result["rows"]): result for result in baseline_results}
+    regressions = 0
+    for result in results :
+        baseline = baseline_index.get((result["script"], result["style"], result["rows"]))
+        if baseline is None :
+            continue
+        timings = [("total", result["seconds"], baseline["seconds"])]
+        timings += [(phase_name, phase_time, baseline.get("phases", {}).get(phase_name)) for phase_name, phase_time in result["phases"].items()]
+        for timing_name, new_time, old_time in timings :
+            if old_time and new_time > old_time * (1 + tolerance) and new_time - old_time > 0.05 :
+                print(f"REGRESSION {result['script']} {result['rows']} rows, {timing_name}: {old_time:.2f} s -> {new_time:.2f} s")
+                regressions += 1
+    return regressions
+
+def main() :
+    parser = argparse.ArgumentParser(description="Time the scripts on synthetic role workbooks.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000], help="numbers of rows to generate (default: 1000 10000)")
+    parser.add_argument("--style", choices=["gps", "mysource"], default="gps", help="role workbook layout (default: gps)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per script - the fastest is reported (default: 1)")
+    parser.add_argument("--phases", action="store_true", help="also show the time per phase, and the cost of each \"droprows\" condition")
+    parser.add_argument("--pipeline", action="store_true", help="run Pipeline.py in place of MyLocation.py and MySource.py")
+    parser.add_argument("--dir", help="directory for the generated inputs (default: a new temporary directory)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown reported as a regression (default: 0.2 = 20%%)")
+    options = parser.parse_args()
+
+    work_dir = Path(options.dir).resolve() if options.dir else Path(tempfile.mkdtemp(prefix="bench_"))
+    results = []
+    for row_count in options.rows :
+        results += benchRows(work_dir, row_count, options.style, max(1, options.repeat), options.phases, options.pipeline)
+
+    if options.save :
+        with open(options.save, "w") as results_file :
+            json.dump(results, results_file, indent=1)
+        print(f"Results saved to {options.save}")
+    if options.baseline :
+        with open(options.baseline) as baseline_file :
+            regressions = compareResults(results, json.load(baseline_file), options.tolerance)
+        print(f"{regressions} regressions against {options.baseline}")
+        if regressions > 0 :
+            sys.exit(1)
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1 @@
+# bench - Benchmarks and synthetic test data for the scripts.  See RunBench.py (timing of each script), GenData.py (synthetic workbooks), and BenchMultiMatch.py.